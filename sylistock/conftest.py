@@ -1,5 +1,12 @@
 import os
 import django
+import pytest
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sylistock.settings')
 django.setup()
+
+
+@pytest.fixture(autouse=True)
+def inline_background_tasks(settings):
+    """Run background tasks synchronously so tests can assert on them"""
+    settings.BACKGROUND_TASKS_MODE = 'inline'
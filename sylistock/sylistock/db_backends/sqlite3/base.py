@@ -0,0 +1,38 @@
+"""
+SQLite backend that can open write transactions with BEGIN IMMEDIATE.
+
+Django 4.2 always starts atomic blocks with a deferred BEGIN. Two
+scanner requests can then both read, both try to upgrade to a write
+lock and deadlock; SQLite reports that straight away as "database is
+locked" without waiting on busy_timeout. Taking the write lock when the
+transaction starts makes writers queue on busy_timeout instead.
+
+Configure with ``OPTIONS['transaction_mode']`` (DEFERRED, IMMEDIATE or
+EXCLUSIVE), the same option Django 5.1+ supports natively.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        mode = (mode or 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode must be one of {TRANSACTION_MODES}'
+            )
+        return mode
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Not a sqlite3.connect() argument on Django < 5.1.
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -48,11 +48,48 @@ if DEBUG:
 if 'RAILWAY_ENVIRONMENT' in os.environ or 'RAILWAY_SERVICE_NAME' in os.environ:
     ALLOWED_HOSTS.append('.railway.app')
 
+# Database connection reuse. Opening a PostgreSQL connection on
+# Railway/Render costs more than most queries, so each worker keeps its
+# connection for DB_CONN_MAX_AGE seconds (0 = reconnect per request) and
+# pings it before reuse. Under ASGI prefer DB_POOL, since persistent
+# connections are per-thread and async requests do not reuse them.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+
+# Django's native psycopg pool (Django 5.1+ with psycopg 3 only).
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '2'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+
+
+def _supports_native_pool(db_config):
+    """The pool needs Django 5.1+, PostgreSQL and psycopg 3"""
+    import django
+    from importlib.util import find_spec
+    return (
+        django.VERSION >= (5, 1)
+        and db_config['ENGINE'] == 'django.db.backends.postgresql'
+        and find_spec('psycopg') is not None
+    )
+
+
 # Database configuration for production
 if 'DATABASE_URL' in os.environ:
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        'default': dj_database_url.parse(
+            os.environ.get('DATABASE_URL'),
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        )
     }
+    if DB_POOL and _supports_native_pool(DATABASES['default']):
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+        }
+        # Pooled connections are returned after every request; Django
+        # rejects a pool combined with persistent connections.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
 else:
     DATABASES = {
         'default': {
@@ -61,6 +98,44 @@ else:
         }
     }
 
+# Optional read replica for reporting/KYC/insurance reads (see
+# sylistockapp.db_router). Any dj-database-url works, so two SQLite
+# files are enough to try it locally:
+#   DATABASE_URL=sqlite:///primary.sqlite3
+#   DATABASE_REPLICA_URL=sqlite:///replica.sqlite3
+REPLICA_DATABASE_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
+if os.getenv('DATABASE_REPLICA_URL'):
+    DATABASES[REPLICA_DATABASE_ALIAS] = dj_database_url.parse(
+        os.environ['DATABASE_REPLICA_URL'],
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        # Tests read the replica through the default test database.
+        test_options={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['sylistockapp.db_router.ReplicaRouter']
+
+# SQLite (single-node shops): use the project backend so write
+# transactions start with BEGIN IMMEDIATE, and tune every connection
+# via sylistockapp.sqlite_tuning.
+for _db in DATABASES.values():
+    if _db['ENGINE'] == 'django.db.backends.sqlite3':
+        _db['ENGINE'] = 'sylistock.db_backends.sqlite3'
+        _db.setdefault('OPTIONS', {}).setdefault(
+            'transaction_mode',
+            os.getenv('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+        )
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 ** 2))),
+    # Negative values are KiB rather than pages.
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-20000')),
+}
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -101,6 +176,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'sylistockapp.db_router.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -123,6 +199,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'sylistock.wsgi.application'
+ASGI_APPLICATION = 'sylistock.asgi.application'
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -171,6 +248,13 @@ USE_TZ = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hash uploads while they stream in so KYC files can be deduplicated
+# by content without a second read.
+FILE_UPLOAD_HANDLERS = [
+    'sylistockapp.upload_handlers.HashingMemoryFileUploadHandler',
+    'sylistockapp.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
@@ -245,3 +329,36 @@ CORS_ALLOW_METHODS = [
 ]
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# In-process background tasks (sylistockapp.background): 'thread' runs
+# them on a per-worker pool, 'inline' runs them synchronously.
+BACKGROUND_TASKS_MODE = os.getenv('BACKGROUND_TASKS_MODE', 'thread')
+BACKGROUND_TASK_WORKERS = int(os.getenv('BACKGROUND_TASK_WORKERS', '4'))
+
+# Processes used for KYC image quality analysis (0 = in-process).
+IMAGE_ANALYSIS_WORKERS = int(os.getenv('IMAGE_ANALYSIS_WORKERS', '2'))
+
+# Policy/claim numbers reserved per worker and database round trip.
+NUMBER_SEQUENCE_BLOCK_SIZE = int(
+    os.getenv('NUMBER_SEQUENCE_BLOCK_SIZE', '20')
+)
+
+# Leave scans flagged by the anomaly detector out of bankability scores.
+SCAN_ANOMALY_DISCOUNT = os.getenv('SCAN_ANOMALY_DISCOUNT', 'True') == 'True'
+
+# Seconds a merchant's product analytics report is served from cache.
+PRODUCT_ANALYTICS_CACHE_SECONDS = int(
+    os.getenv('PRODUCT_ANALYTICS_CACHE_SECONDS', '300')
+)
+
+# Seconds a merchant's reorder levels are cached between requests (they
+# only change once a day, with the nightly forecast_demand run).
+REORDER_FORECAST_CACHE_SECONDS = int(
+    os.getenv('REORDER_FORECAST_CACHE_SECONDS', '3600')
+)
+
+# Minutes a KYC document may sit queued or processing before the
+# requeue_kyc_documents sweep assumes its background task died.
+KYC_PROCESSING_TIMEOUT_MINUTES = int(
+    os.getenv('KYC_PROCESSING_TIMEOUT_MINUTES', '30')
+)
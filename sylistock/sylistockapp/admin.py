@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import MerchantProfile, Product, StockItem, InventoryLog, Category
 from .models_kyc import (
-    KYCDocument, KYCVerification, BankAccount, ComplianceCheck
+    KYCBlob, KYCDocument, KYCVerification, BankAccount, ComplianceCheck
 )
 from .models_insurance import (
     InsurancePolicy, InsuranceClaim, InsuranceRiskAssessment,
@@ -43,11 +43,22 @@ class InventoryLogAdmin(admin.ModelAdmin):
     list_display = [
         'product', 'merchant', 'action',
         'quantity_changed', 'source', 'device_id', 'timestamp',
+        'is_suspicious',
     ]
-    list_filter = ['action', 'source', 'timestamp']
+    list_filter = ['action', 'source', 'is_suspicious', 'timestamp']
     search_fields = ['product__name', 'merchant__business_name']
 
 
+@admin.register(KYCBlob)
+class KYCBlobAdmin(admin.ModelAdmin):
+    list_display = [
+        'sha256', 'mime_type', 'size', 'ref_count',
+        'validation_score', 'created_at',
+    ]
+    search_fields = ['sha256']
+    readonly_fields = ['sha256', 'ref_count']
+
+
 @admin.register(KYCDocument)
 class KYCDocumentAdmin(admin.ModelAdmin):
     list_display = [
@@ -1,5 +1,34 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class SylistockappConfig(AppConfig):
     name = 'sylistockapp'
+
+    def ready(self):
+        from .metrics import record_connection_created
+        from .sqlite_tuning import configure_sqlite_connection
+        from .models import StockItem
+        from .models_kyc import KYCDocument, release_document_blob
+        from .valuation import track_stock_item_delete, track_stock_item_save
+        connection_created.connect(
+            record_connection_created,
+            dispatch_uid='sylistockapp.metrics.connections',
+        )
+        connection_created.connect(
+            configure_sqlite_connection,
+            dispatch_uid='sylistockapp.sqlite_tuning',
+        )
+        post_delete.connect(
+            release_document_blob, sender=KYCDocument,
+            dispatch_uid='sylistockapp.kyc.release_blob',
+        )
+        post_save.connect(
+            track_stock_item_save, sender=StockItem,
+            dispatch_uid='sylistockapp.valuation.save',
+        )
+        post_delete.connect(
+            track_stock_item_delete, sender=StockItem,
+            dispatch_uid='sylistockapp.valuation.delete',
+        )
@@ -0,0 +1,56 @@
+"""
+Minimal in-process background task runner.
+
+Slow follow-up work (document validation, score recomputation) runs on
+a small thread pool inside each web worker so requests can return
+straight away. ``settings.BACKGROUND_TASKS_MODE = 'inline'`` runs tasks
+synchronously instead, which is what the test suite uses.
+
+Tasks must take primitive arguments (ids, not model instances) and
+reload what they need: they run on another thread with their own
+database connection.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 4),
+                thread_name_prefix='sylistock-bg',
+            )
+        return _executor
+
+
+def _run(task, args, kwargs):
+    try:
+        return task(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', task.__name__)
+    finally:
+        # Pool threads are long-lived; do not leak their connections.
+        connections.close_all()
+
+
+def submit(task, *args, **kwargs):
+    """Run ``task`` in the background (or inline, per settings)"""
+    if getattr(settings, 'BACKGROUND_TASKS_MODE', 'thread') == 'inline':
+        return task(*args, **kwargs)
+    return _get_executor().submit(_run, task, args, kwargs)
+
+
+def submit_on_commit(task, *args, **kwargs):
+    """Submit ``task`` once the current transaction commits"""
+    transaction.on_commit(lambda: submit(task, *args, **kwargs))
@@ -0,0 +1,140 @@
+"""
+Read-replica routing for read-only views.
+
+Views opt in with ``@read_from_replica``; while such a view runs,
+``ReplicaRouter`` sends ORM reads to ``settings.REPLICA_DATABASE_ALIAS``.
+Everything else, and every write, stays on ``default``.
+
+Replicas lag, so a user who just wrote something is pinned to the
+primary for ``settings.REPLICA_STICKY_SECONDS`` by
+``ReplicaStickinessMiddleware`` and reads their own writes back. Pins
+live in the Django cache; with several worker processes configure a
+shared cache backend so every worker sees them.
+"""
+from asyncio import iscoroutinefunction
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+_read_alias = ContextVar('sylistock_read_alias', default=None)
+
+PIN_KEY = 'db-router:primary-pin:{}'
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica"""
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def pin_to_primary(user_id):
+    """Route ``user_id``'s replica-enabled reads to the primary for now"""
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+    if seconds > 0:
+        cache.set(PIN_KEY.format(user_id), True, timeout=seconds)
+
+
+def is_pinned(user_id):
+    return bool(cache.get(PIN_KEY.format(user_id)))
+
+
+def current_read_alias():
+    """
+    The alias reads are routed to right now: the replica inside a
+    ``read_from_replica`` view (unless its user is pinned), else
+    ``default``. For work that outlives the view, such as a streamed
+    response, pass it to ``.using()``.
+    """
+    return _read_alias.get() or 'default'
+
+
+def read_from_replica(view):
+    """
+    Let ``view`` read from the replica unless its user recently wrote.
+
+    Apply it below ``@api_view``/``@permission_classes`` (or
+    ``@async_api_view``) so ``request.user`` is already authenticated.
+    Async views keep the routing across their awaits: the async ORM
+    runs queries with the caller's context.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            alias = replica_alias()
+            user = getattr(request, 'user', None)
+            if alias is None or (
+                user is not None and user.is_authenticated
+                and await cache.aget(PIN_KEY.format(user.pk))
+            ):
+                return await view(request, *args, **kwargs)
+
+            token = _read_alias.set(alias)
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _read_alias.reset(token)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        alias = replica_alias()
+        user = getattr(request, 'user', None)
+        if alias is None or (
+            user is not None and user.is_authenticated
+            and is_pinned(user.pk)
+        ):
+            return view(request, *args, **kwargs)
+
+        token = _read_alias.set(alias)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Route reads inside ``read_from_replica`` views to the replica"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        aliases = {'default', replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """Pin users to the primary after a successful write request"""
+
+    UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF copies the token-authenticated user back onto the Django
+        # request, so this also sees API clients.
+        user = getattr(request, 'user', None)
+        if (
+            replica_alias() is not None
+            and request.method in self.UNSAFE_METHODS
+            and response.status_code < 400
+            and user is not None and user.is_authenticated
+        ):
+            pin_to_primary(user.pk)
+        return response
@@ -0,0 +1,58 @@
+"""
+Mark overdue premiums, refresh next_premium_due and print the aging
+report, e.g. daily from cron and for the monthly reconciliation.
+
+    python manage.py age_premiums
+    python manage.py age_premiums --report-only --group-by policy_type
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.insurance_service import InsuranceService
+
+
+class Command(BaseCommand):
+    help = 'Age unpaid insurance premiums and report overdue buckets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--report-only', action='store_true',
+            help='Only print the aging report',
+        )
+        parser.add_argument(
+            '--group-by', choices=['policy_type', 'merchant'],
+        )
+
+    def handle(self, *args, **options):
+        service = InsuranceService()
+        if not options['report_only']:
+            started = time.monotonic()
+            result = service.age_premiums()
+            self.stdout.write(
+                f"Marked {result['marked_overdue']} premiums overdue and "
+                f"refreshed {result['policies_refreshed']} policies in "
+                f"{time.monotonic() - started:.2f}s"
+            )
+
+        try:
+            report = service.premium_aging_report(
+                group_by=options['group_by']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Aging as of {report['as_of']}:")
+        for group in report['groups']:
+            if 'group' in group:
+                self.stdout.write(f"{options['group_by']} {group['group']}:")
+            for bucket in group['buckets']:
+                self.stdout.write(
+                    f"  {bucket['bucket']:>6} days: {bucket['count']:>7} "
+                    f"premiums {bucket['amount']:>14,.2f}"
+                )
+            self.stdout.write(
+                f"  {'total':>11}: {group['total_count']:>7} "
+                f"premiums {group['total_amount']:>14,.2f} "
+                f"across {group['policies']} policies"
+            )
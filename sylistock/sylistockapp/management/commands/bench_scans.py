@@ -0,0 +1,138 @@
+"""
+Concurrency benchmark for the scan endpoint on SQLite.
+
+Starts several scanner threads that each post scans to ProcessScanView
+as fast as they can and reports throughput and "database is locked"
+failures. With ``--compare`` it first runs with SQLite's defaults
+(rollback journal, full fsync, no busy timeout, deferred BEGIN) and then
+with the tuned settings, so the gain is visible on the same machine.
+
+    python manage.py bench_scans --threads 8 --scans 100 --compare
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ...models import MerchantProfile, Product, StockItem
+from ...views import ProcessScanView
+
+BASELINE_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': 0,
+    'mmap_size': 0,
+    'cache_size': -2000,
+}
+
+
+class Command(BaseCommand):
+    help = 'Hammer ProcessScanView from several threads on SQLite'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--scans', type=int, default=100,
+            help='Scans posted by each thread',
+        )
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Run untuned SQLite defaults first for comparison',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('bench_scans only targets SQLite databases')
+
+        user, product = self._fixtures()
+        tuned = (
+            dict(settings.SQLITE_PRAGMAS),
+            connection.settings_dict['OPTIONS'].get('transaction_mode'),
+        )
+        runs = [('tuned', *tuned)]
+        if options['compare']:
+            runs.insert(0, ('sqlite defaults', BASELINE_PRAGMAS, 'DEFERRED'))
+
+        try:
+            for label, pragmas, mode in runs:
+                self._configure(pragmas, mode)
+                outcome, elapsed = self._run(
+                    user, product, options['threads'], options['scans']
+                )
+                self.stdout.write(
+                    f'{label:>16}: {outcome["ok"]:6d} ok, '
+                    f'{outcome["locked"]:5d} locked, '
+                    f'{outcome["error"]:5d} other errors, '
+                    f'{outcome["ok"] / elapsed:8.1f} successful scans/s'
+                )
+        finally:
+            self._configure(*tuned)
+
+    def _fixtures(self):
+        User = get_user_model()
+        user, _ = User.objects.get_or_create(username='bench-scanner')
+        merchant, _ = MerchantProfile.objects.get_or_create(
+            user=user,
+            defaults={
+                'business_name': 'Bench Shop',
+                'location': 'Benchmark',
+            },
+        )
+        product, _ = Product.objects.get_or_create(
+            barcode='BENCH-0001', defaults={'name': 'Bench Product'}
+        )
+        StockItem.objects.get_or_create(merchant=merchant, product=product)
+        return user, product
+
+    def _configure(self, pragmas, transaction_mode):
+        """Apply settings to connections opened from here on"""
+        connections.close_all()
+        settings.SQLITE_PRAGMAS = pragmas
+        connection.settings_dict['OPTIONS']['transaction_mode'] = (
+            transaction_mode
+        )
+
+    def _run(self, user, product, threads, scans):
+        view = ProcessScanView.as_view()
+        factory = APIRequestFactory()
+        outcome = Counter(ok=0, locked=0, error=0)
+        lock = threading.Lock()
+
+        def scanner(device):
+            local = Counter()
+            try:
+                for _ in range(scans):
+                    request = factory.post('/inventory/scan/', {
+                        'barcode': product.barcode,
+                        'action': 'IN',
+                        'source': 'ZEBRA',
+                        'device_id': device,
+                    }, format='json')
+                    force_authenticate(request, user=user)
+                    response = view(request)
+                    if response.status_code == 200:
+                        local['ok'] += 1
+                    elif 'locked' in str(response.data.get('error', '')):
+                        local['locked'] += 1
+                    else:
+                        local['error'] += 1
+            finally:
+                connection.close()
+                with lock:
+                    outcome.update(local)
+
+        workers = [
+            threading.Thread(target=scanner, args=(f'bench-{n}',))
+            for n in range(threads)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return outcome, time.perf_counter() - started
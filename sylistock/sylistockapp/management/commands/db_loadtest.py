@@ -0,0 +1,79 @@
+"""
+Measure per-request database connection overhead.
+
+Replays the request lifecycle Django runs for every HTTP request
+(request_started -> query -> request_finished) against the configured
+database, first reconnecting on every request (CONN_MAX_AGE=0) and then
+with persistent connections, and reports connects and latency for both.
+
+    python manage.py db_loadtest --requests 500
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_started, request_finished
+from django.db import connections
+
+from ...metrics import connections_opened
+from ...models import MerchantProfile
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request connects against persistent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--conn-max-age', type=int, default=600,
+            help='CONN_MAX_AGE used for the persistent run',
+        )
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        requests = options['requests']
+        conn = connections[alias]
+        original = conn.settings_dict['CONN_MAX_AGE']
+
+        self.stdout.write(
+            f'{conn.vendor} database "{alias}", {requests} requests'
+        )
+        try:
+            results = [
+                ('per-request', self._run(alias, requests, 0)),
+                ('persistent', self._run(
+                    alias, requests, options['conn_max_age']
+                )),
+            ]
+        finally:
+            conn.close()
+            conn.settings_dict['CONN_MAX_AGE'] = original
+
+        for label, (connects, elapsed) in results:
+            self.stdout.write(
+                f'{label:>12}: {connects:5d} connects, '
+                f'{elapsed * 1000:9.1f} ms total, '
+                f'{elapsed * 1000 / requests:7.3f} ms/request'
+            )
+
+        saved = results[0][1][1] - results[1][1][1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Connection reuse saved {saved * 1000:.1f} ms '
+            f'({saved * 1000 / requests:.3f} ms/request)'
+        ))
+
+    def _run(self, alias, requests, conn_max_age):
+        conn = connections[alias]
+        conn.close()
+        conn.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        queryset = MerchantProfile.objects.using(alias)
+
+        opened_before = connections_opened(alias)
+        started = time.perf_counter()
+        for _ in range(requests):
+            request_started.send(sender=self.__class__)
+            queryset.exists()
+            request_finished.send(sender=self.__class__)
+        elapsed = time.perf_counter() - started
+
+        return connections_opened(alias) - opened_before, elapsed
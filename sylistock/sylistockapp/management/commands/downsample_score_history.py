@@ -0,0 +1,41 @@
+"""
+Thin old bankability score history, e.g. nightly from cron.
+
+    python manage.py downsample_score_history
+    python manage.py downsample_score_history --raw-days 14 --daily-days 60
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.score_history import ScoreHistoryService
+
+
+class Command(BaseCommand):
+    help = 'Downsample score history to daily, weekly and monthly points'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--raw-days', type=int, default=7,
+            help='Keep every point this many days (default 7)',
+        )
+        parser.add_argument(
+            '--daily-days', type=int, default=90,
+            help='Then one point per day up to this age (default 90)',
+        )
+        parser.add_argument(
+            '--weekly-days', type=int, default=365,
+            help='Then one per week up to this age (default 365)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        deleted = ScoreHistoryService(
+            raw_days=options['raw_days'],
+            daily_days=options['daily_days'],
+            weekly_days=options['weekly_days'],
+        ).downsample()
+        self.stdout.write(
+            f'Removed {deleted} score points in '
+            f'{time.monotonic() - started:.2f}s'
+        )
@@ -0,0 +1,68 @@
+"""
+Write the lender export (gzip-compressed NDJSON) to a file or stdout.
+
+    python manage.py export_lender_data --output export.ndjson.gz
+    python manage.py export_lender_data --merchant 12 --start 2025-01-01
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.export_service import (
+    LenderExportService, parse_export_date,
+)
+
+
+class Command(BaseCommand):
+    help = 'Export inventory logs, stock and bankability for lenders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Destination file, or - for stdout (default)',
+        )
+        parser.add_argument(
+            '--merchant', type=int, action='append', dest='merchant_ids',
+            help='Merchant id to export (repeatable; default: all)',
+        )
+        parser.add_argument('--start', help='First day, YYYY-MM-DD')
+        parser.add_argument('--end', help='Last day, YYYY-MM-DD')
+        parser.add_argument('--chunk-days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_export_date(options['start'])
+            end = parse_export_date(options['end'], end_of_day=True)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['chunk_days'] <= 0:
+            raise CommandError('--chunk-days must be positive')
+
+        service = LenderExportService(
+            chunk_days=options['chunk_days'],
+            batch_size=options['batch_size'],
+            using=options['database'],
+        )
+        chunks = service.iter_ndjson_gzip(
+            service.iter_records(options['merchant_ids'], start, end)
+        )
+
+        if options['output'] == '-':
+            self._write(chunks, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as out:
+                written = self._write(chunks, out)
+            self.stderr.write(
+                f'Wrote {written} compressed bytes to {options["output"]}'
+            )
+
+    @staticmethod
+    def _write(chunks, out):
+        written = 0
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+        out.flush()
+        return written
@@ -0,0 +1,68 @@
+"""
+Forecast every merchant's product demand and store reorder levels,
+e.g. nightly from cron.
+
+    python manage.py forecast_demand
+    python manage.py forecast_demand --date 2024-06-30
+    python manage.py forecast_demand --merchant 12 --lead-time 14 --dry-run
+
+Defaults to sales up to yesterday. Each run replaces the merchant's
+previous suggestions.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from ...services.demand_forecast import (
+    HISTORY_DAYS, LEAD_TIME_DAYS, REVIEW_DAYS, DemandForecaster,
+)
+
+
+class Command(BaseCommand):
+    help = 'Forecast product demand and reorder levels from sales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Last day of sales to use, YYYY-MM-DD (default: yesterday)',
+        )
+        parser.add_argument(
+            '--merchant', type=int, action='append', dest='merchant_ids',
+            help='Merchant id to forecast (repeatable; default: all)',
+        )
+        parser.add_argument('--history-days', type=int,
+                            default=HISTORY_DAYS)
+        parser.add_argument('--lead-time', type=int, default=LEAD_TIME_DAYS,
+                            help='Days from order to delivery')
+        parser.add_argument('--review-days', type=int, default=REVIEW_DAYS,
+                            help='Days between orders')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Forecast and summarize without writing',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['date']:
+            as_of = parse_date(options['date'])
+            if as_of is None:
+                raise CommandError('--date must be YYYY-MM-DD')
+
+        started = time.monotonic()
+        summary = DemandForecaster(
+            as_of=as_of,
+            history_days=options['history_days'],
+            lead_time_days=options['lead_time'],
+            review_days=options['review_days'],
+            batch_size=options['batch_size'],
+        ).run(options['merchant_ids'], dry_run=options['dry_run'])
+        elapsed = time.monotonic() - started
+
+        verb = 'Forecast' if summary['dry_run'] else 'Forecast and stored'
+        self.stdout.write(
+            f"{verb} {summary['products']} products of "
+            f"{summary['merchants']} merchants as of {summary['as_of']} "
+            f"({summary['intermittent']} intermittent) in {elapsed:.2f}s"
+        )
@@ -0,0 +1,29 @@
+"""
+Normalize merchant locations into markets and recompute peer ranks,
+e.g. nightly from cron.
+
+    python manage.py rank_merchants
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.peer_ranking import PeerRankingService
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-market percentile ranks for all merchants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        summary = PeerRankingService(
+            batch_size=options['batch_size'],
+        ).run()
+        self.stdout.write(
+            f"Ranked {summary['merchants_ranked']} merchants in "
+            f"{summary['markets']} markets ({summary['unplaced']} without "
+            f"a usable location) in {time.monotonic() - started:.2f}s"
+        )
@@ -0,0 +1,44 @@
+"""
+Re-run KYC compliance checks in batches, e.g. nightly from cron.
+
+    python manage.py recheck_compliance
+    python manage.py recheck_compliance --status approved --batch-size 200
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...models_kyc import KYCVerification
+from ...services.kyc_service import KYCService
+
+
+class Command(BaseCommand):
+    help = 'Re-evaluate compliance for KYC verifications in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status', action='append', dest='statuses',
+            help='Only verifications in this status (repeatable; '
+                 'default: all but expired and suspended)',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        queryset = None
+        if options['statuses']:
+            queryset = KYCVerification.objects.filter(
+                status__in=options['statuses']
+            )
+
+        started = time.monotonic()
+        summary = KYCService().run_compliance_checks(
+            queryset, batch_size=options['batch_size']
+        )
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            f"Checked {summary['checked']} verifications in "
+            f"{elapsed:.1f}s: {summary['approved']} approved, "
+            f"{summary['rejected']} rejected, "
+            f"{summary['status_changed']} changed status"
+        )
@@ -0,0 +1,50 @@
+"""
+Verify incrementally maintained stock valuations against SQL totals.
+
+    python manage.py reconcile_valuations
+    python manage.py reconcile_valuations --fix
+    python manage.py reconcile_valuations --merchant 12 --merchant 40
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...valuation import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Compare merchant valuations with a full recomputation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--merchant', type=int, action='append', dest='merchant_ids',
+            help='Merchant id to check (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Rewrite drifted valuations from the recomputation',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        checked, drifted = reconcile(options['merchant_ids'],
+                                     fix=options['fix'])
+
+        for merchant_id, stored, actual in drifted:
+            self.stdout.write(
+                f'Merchant {merchant_id}: stored '
+                f'{_format(stored) if stored else "missing"}, '
+                f'actual {_format(actual)}'
+            )
+        self.stdout.write(
+            f'Checked {checked} merchants, {len(drifted)} drifted'
+            f'{" (fixed)" if options["fix"] and drifted else ""} in '
+            f'{time.monotonic() - started:.2f}s'
+        )
+        if drifted and not options['fix']:
+            raise CommandError('Valuations drifted; rerun with --fix')
+
+
+def _format(totals):
+    units, cost, sale = totals
+    return f'{units} units / {cost} at cost / {sale} at sale'
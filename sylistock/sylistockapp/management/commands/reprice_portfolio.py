@@ -0,0 +1,77 @@
+"""
+Re-score every merchant and re-price every active insurance policy.
+
+    python manage.py reprice_portfolio --dry-run
+    python manage.py reprice_portfolio --base-rate 0.025
+    python manage.py reprice_portfolio --multiplier high=2.5
+
+Existing premium installments keep their amounts; new premium amounts
+apply to schedules generated from now on.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.portfolio_pricing import (
+    DEFAULT_BASE_RATE, DEFAULT_RISK_MULTIPLIERS, PortfolioRepricer,
+)
+
+
+class Command(BaseCommand):
+    help = 'Vectorized risk and premium recalculation for all merchants'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Show what would change without writing',
+        )
+        parser.add_argument(
+            '--base-rate', type=float, default=DEFAULT_BASE_RATE,
+            help='Premium as a fraction of coverage (default 0.02)',
+        )
+        parser.add_argument(
+            '--multiplier', action='append', default=[],
+            metavar='LEVEL=VALUE',
+            help='Override a risk-level multiplier (repeatable)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--show', type=int, default=20,
+            help='Policy changes to list (default 20)',
+        )
+
+    def handle(self, *args, **options):
+        multipliers = {}
+        for item in options['multiplier']:
+            level, _sep, value = item.partition('=')
+            if level not in DEFAULT_RISK_MULTIPLIERS:
+                raise CommandError(f'Unknown risk level: {level}')
+            try:
+                multipliers[level] = float(value)
+            except ValueError:
+                raise CommandError(f'Invalid multiplier: {item}')
+
+        started = time.monotonic()
+        summary = PortfolioRepricer(
+            base_rate=options['base_rate'],
+            multipliers=multipliers,
+            batch_size=options['batch_size'],
+        ).run(dry_run=options['dry_run'])
+        elapsed = time.monotonic() - started
+
+        verb = 'Would reprice' if summary['dry_run'] else 'Repriced'
+        self.stdout.write(
+            f"{verb} {summary['policies_repriced']} policies "
+            f"(premium delta {summary['premium_delta']:+.2f}) across "
+            f"{summary['merchants']} merchants in {elapsed:.2f}s"
+        )
+        self.stdout.write('Risk levels: ' + ', '.join(
+            f'{level}={count}'
+            for level, count in summary['risk_level_counts'].items()
+        ))
+        self.stdout.write(
+            f"Assessments: {summary['assessments_updated']} updated, "
+            f"{summary['assessments_created']} created"
+        )
+        for number, old, new in summary['policy_changes'][:options['show']]:
+            self.stdout.write(f'  {number}: {old} -> {new}')
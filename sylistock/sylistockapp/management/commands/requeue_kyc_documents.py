@@ -0,0 +1,42 @@
+"""
+Re-queue KYC documents whose background validation died with its
+worker, e.g. every few minutes from cron.
+
+    python manage.py requeue_kyc_documents
+    python manage.py requeue_kyc_documents --timeout-minutes 10
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...services.kyc_service import KYCService
+
+
+class Command(BaseCommand):
+    help = 'Re-queue KYC documents stuck queued or processing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout-minutes', type=int, default=None,
+            help='Default: settings.KYC_PROCESSING_TIMEOUT_MINUTES',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        timeout = options['timeout_minutes']
+        if timeout is not None and timeout <= 0:
+            raise CommandError('--timeout-minutes must be positive')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        started = time.monotonic()
+        summary = KYCService().requeue_stuck_documents(
+            timeout_minutes=timeout, batch_size=options['batch_size'],
+        )
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            f"Re-queued {summary['requeued']} documents and failed "
+            f"{summary['failed']} after repeated attempts in "
+            f"{elapsed:.2f}s"
+        )
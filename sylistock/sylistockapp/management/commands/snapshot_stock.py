@@ -0,0 +1,60 @@
+"""
+Snapshot every merchant's stock for as-of queries, e.g. daily from cron.
+
+    python manage.py snapshot_stock
+    python manage.py snapshot_stock --compact
+    python manage.py snapshot_stock --compact-only --daily-days 60
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...services.stock_history import StockHistoryService
+
+
+class Command(BaseCommand):
+    help = 'Record stock snapshots and optionally compact old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--merchant', type=int, action='append', dest='merchant_ids',
+            help='Merchant id to snapshot (repeatable; default: all)',
+        )
+        parser.add_argument(
+            '--compact', action='store_true',
+            help='Thin old snapshots after taking new ones',
+        )
+        parser.add_argument(
+            '--compact-only', action='store_true',
+            help='Only thin old snapshots',
+        )
+        parser.add_argument(
+            '--daily-days', type=int, default=35,
+            help='Keep every snapshot this many days (default 35)',
+        )
+        parser.add_argument(
+            '--weekly-days', type=int, default=365,
+            help='Then keep one per week up to this age (default 365)',
+        )
+
+    def handle(self, *args, **options):
+        service = StockHistoryService(
+            daily_days=options['daily_days'],
+            weekly_days=options['weekly_days'],
+        )
+
+        if not options['compact_only']:
+            started = time.monotonic()
+            written = service.take_snapshots(options['merchant_ids'])
+            self.stdout.write(
+                f'Wrote {written} snapshots in '
+                f'{time.monotonic() - started:.2f}s'
+            )
+
+        if options['compact'] or options['compact_only']:
+            started = time.monotonic()
+            deleted = service.compact()
+            self.stdout.write(
+                f'Compacted {deleted} snapshots in '
+                f'{time.monotonic() - started:.2f}s'
+            )
@@ -0,0 +1,44 @@
+"""
+Process-level runtime metrics exposed through the metrics endpoint.
+"""
+import threading
+from collections import Counter
+
+from django.db import connections
+
+_lock = threading.Lock()
+_connections_opened = Counter()
+
+
+def record_connection_created(sender, connection, **kwargs):
+    """connection_created receiver counting new physical connections"""
+    with _lock:
+        _connections_opened[connection.alias] += 1
+
+
+def connections_opened(alias='default'):
+    """Number of connections this process has opened for ``alias``"""
+    with _lock:
+        return _connections_opened[alias]
+
+
+def database_stats():
+    """Connection settings, churn and pool stats for every alias"""
+    stats = {}
+    for alias in connections:
+        conn = connections[alias]
+        entry = {
+            'vendor': conn.vendor,
+            'conn_max_age': conn.settings_dict.get('CONN_MAX_AGE'),
+            'health_checks': conn.settings_dict.get(
+                'CONN_HEALTH_CHECKS', False
+            ),
+            'connected': conn.connection is not None,
+            'connections_opened': connections_opened(alias),
+        }
+        # Only PostgreSQL on Django 5.1+ exposes a pool.
+        pool = getattr(conn, 'pool', None)
+        if pool is not None:
+            entry['pool'] = pool.get_stats()
+        stats[alias] = entry
+    return stats
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import sylistockapp.models_kyc
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0002_kycdocument_processing_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KYCBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(upload_to=sylistockapp.models_kyc.kyc_blob_path)),
+                ('size', models.BigIntegerField(default=0)),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('validation_score', models.IntegerField(blank=True, null=True)),
+                ('validation_notes', models.TextField(blank=True)),
+                ('validated_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'KYC Blob',
+                'verbose_name_plural': 'KYC Blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='kycdocument',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='documents', to='sylistockapp.kycblob'),
+        ),
+    ]
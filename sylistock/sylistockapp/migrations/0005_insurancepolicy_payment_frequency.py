@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0004_numbersequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insurancepolicy',
+            name='payment_frequency',
+            field=models.CharField(choices=[('weekly', 'Weekly'), ('monthly', 'Monthly'), ('quarterly', 'Quarterly')], default='monthly', max_length=20),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0005_insurancepolicy_payment_frequency'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='insurancepremium',
+            index=models.Index(fields=['payment_status', 'due_date'], name='premium_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0006_premium_status_due_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('items', models.JSONField(default=dict)),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['merchant', 'timestamp'], name='invlog_merchant_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='merchant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='sylistockapp.merchantprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['merchant', 'taken_at'], name='snapshot_merchant_taken_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0007_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insuranceclaim',
+            name='assessed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='insuranceclaim',
+            name='assessed_stock_value',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Stock value at cost when the incident happened', max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='insuranceclaim',
+            name='exceeds_stock_value',
+            field=models.BooleanField(default=False),
+        ),
+    ]
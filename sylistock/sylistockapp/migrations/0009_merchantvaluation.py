@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_valuations(apps, schema_editor):
+    StockItem = apps.get_model('sylistockapp', 'StockItem')
+    MerchantValuation = apps.get_model('sylistockapp', 'MerchantValuation')
+    rows = StockItem.objects.values_list('merchant_id').annotate(
+        units=models.Sum('quantity'),
+        cost=models.Sum(models.F('quantity') * models.F('cost_price')),
+        sale=models.Sum(models.F('quantity') * models.F('sale_price')),
+    ).order_by()
+    MerchantValuation.objects.bulk_create([
+        MerchantValuation(
+            merchant_id=merchant_id, total_quantity=units or 0,
+            value_at_cost=round(cost or 0, 2),
+            value_at_sale=round(sale or 0, 2),
+        )
+        for merchant_id, units, cost, sale in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0008_insuranceclaim_assessment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MerchantValuation',
+            fields=[
+                ('merchant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='valuation', serialize=False, to='sylistockapp.merchantprofile')),
+                ('total_quantity', models.BigIntegerField(default=0)),
+                ('value_at_cost', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('value_at_sale', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_valuations, migrations.RunPython.noop),
+    ]
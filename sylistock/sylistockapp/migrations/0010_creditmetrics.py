@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0009_merchantvaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('engine_version', models.CharField(max_length=20)),
+                ('as_of', models.DateField()),
+                ('sales_velocity', models.FloatField(default=0)),
+                ('inventory_turnover', models.FloatField(default=0)),
+                ('consistency', models.FloatField(default=0)),
+                ('diversity', models.FloatField(default=0)),
+                ('seasonality', models.FloatField(default=0)),
+                ('features', models.JSONField(default=dict)),
+                ('credit_score', models.PositiveSmallIntegerField()),
+                ('credit_tier', models.CharField(choices=[('very_poor', 'Very poor'), ('poor', 'Poor'), ('fair', 'Fair'), ('good', 'Good'), ('very_good', 'Very good'), ('excellent', 'Excellent')], max_length=10)),
+                ('recommended_loan', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('computed_at', models.DateTimeField()),
+                ('merchant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credit_metrics', to='sylistockapp.merchantprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Credit Metrics',
+                'indexes': [models.Index(fields=['merchant', '-as_of'], name='credit_merchant_asof_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='creditmetrics',
+            constraint=models.UniqueConstraint(fields=('merchant', 'engine_version', 'as_of'), name='credit_metrics_unique_day'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def seed_current_scores(apps, schema_editor):
+    MerchantProfile = apps.get_model('sylistockapp', 'MerchantProfile')
+    BankabilityScorePoint = apps.get_model('sylistockapp',
+                                           'BankabilityScorePoint')
+    BankabilityScorePoint.objects.bulk_create([
+        BankabilityScorePoint(merchant_id=merchant_id, score=score,
+                              recorded_at=updated_at)
+        for merchant_id, score, updated_at in
+        MerchantProfile.objects.values_list(
+            'id', 'bankability_score', 'updated_at'
+        ).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0010_creditmetrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankabilityScorePoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('score', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('merchant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_history', to='sylistockapp.merchantprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['merchant', 'recorded_at'], name='score_merchant_recorded_idx')],
+            },
+        ),
+        migrations.RunPython(seed_current_scores,
+                             migrations.RunPython.noop),
+    ]
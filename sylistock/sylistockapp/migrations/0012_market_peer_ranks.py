@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0011_bankabilityscorepoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Market',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('merchant_count', models.PositiveIntegerField(default=0)),
+                ('distribution', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MerchantPeerRank',
+            fields=[
+                ('merchant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='peer_rank', serialize=False, to='sylistockapp.merchantprofile')),
+                ('as_of', models.DateField()),
+                ('market_size', models.PositiveIntegerField()),
+                ('bankability_score', models.FloatField()),
+                ('bankability_percentile', models.FloatField()),
+                ('sales_velocity', models.FloatField(help_text='Units sold per day')),
+                ('sales_velocity_percentile', models.FloatField()),
+                ('stock_value', models.FloatField(help_text='Stock value at cost')),
+                ('stock_value_percentile', models.FloatField()),
+                ('market', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='peer_ranks', to='sylistockapp.market')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='merchantprofile',
+            name='market',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='merchants', to='sylistockapp.market'),
+        ),
+    ]
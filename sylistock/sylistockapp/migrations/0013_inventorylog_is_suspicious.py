@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0012_market_peer_ranks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorylog',
+            name='is_suspicious',
+            field=models.BooleanField(default=False),
+        ),
+    ]
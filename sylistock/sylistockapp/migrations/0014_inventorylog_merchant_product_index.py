@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0013_inventorylog_is_suspicious'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorylog',
+            index=models.Index(fields=['merchant', 'product', 'timestamp'], name='invlog_merchant_product_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:03
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_movement(apps, schema_editor):
+    StockItem = apps.get_model('sylistockapp', 'StockItem')
+    InventoryLog = apps.get_model('sylistockapp', 'InventoryLog')
+    logs = InventoryLog.objects.filter(
+        merchant_id=models.OuterRef('merchant_id'),
+        product_id=models.OuterRef('product_id'),
+    ).order_by('-timestamp').values('timestamp')
+    StockItem.objects.update(
+        last_sold_at=models.Subquery(logs.filter(action='OUT')[:1]),
+        last_movement_at=Coalesce(
+            models.Subquery(logs[:1]), models.F('created_at')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0014_inventorylog_merchant_product_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockitem',
+            name='last_movement_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockitem',
+            name='last_sold_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stockitem',
+            index=models.Index(fields=['merchant', 'last_sold_at'], name='stockitem_merchant_sold_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockitem',
+            index=models.Index(fields=['merchant', 'last_movement_at'], name='stockitem_merchant_moved_idx'),
+        ),
+        migrations.RunPython(backfill_last_movement,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0015_stockitem_last_movement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField(help_text='Last day of sales history used')),
+                ('method', models.CharField(choices=[('ses', 'Simple exponential smoothing'), ('croston', 'Croston (intermittent demand)')], max_length=10)),
+                ('daily_demand', models.FloatField()),
+                ('demand_std', models.FloatField()),
+                ('reorder_point', models.PositiveIntegerField()),
+                ('order_up_to', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('merchant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_suggestions', to='sylistockapp.merchantprofile')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='sylistockapp.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='reordersuggestion',
+            constraint=models.UniqueConstraint(fields=('merchant', 'product'), name='reorder_suggestion_unique_product'),
+        ),
+    ]
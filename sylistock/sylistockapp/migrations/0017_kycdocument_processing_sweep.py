@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:32
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sylistockapp', '0016_reordersuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kycdocument',
+            name='processing_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='kycdocument',
+            name='processing_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='kycdocument',
+            index=models.Index(fields=['processing_status', 'processing_updated_at'], name='kycdoc_processing_idx'),
+        ),
+    ]
@@ -1,6 +1,10 @@
 # Django models
+from decimal import Decimal
+
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -18,6 +22,11 @@ class MerchantProfile(models.Model):
     alert_threshold = models.PositiveIntegerField(
         default=5, help_text="Low stock alert threshold"
     )
+    # Normalized from location by the nightly peer ranking
+    market = models.ForeignKey(
+        'Market', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='merchants'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -42,12 +51,14 @@ class MerchantProfile(models.Model):
             pass
 
         # Inventory activity (up to 30 points)
-        from django.utils import timezone
         from datetime import timedelta
         recent_logs = InventoryLog.objects.filter(
             merchant=self,
             timestamp__gte=timezone.now() - timedelta(days=30)
-        ).count()
+        )
+        if getattr(settings, 'SCAN_ANOMALY_DISCOUNT', True):
+            recent_logs = recent_logs.filter(is_suspicious=False)
+        recent_logs = recent_logs.count()
         if recent_logs >= 100:
             score += Decimal('30')
         elif recent_logs >= 50:
@@ -72,8 +83,13 @@ class MerchantProfile(models.Model):
             health_ratio = 1 - (low_stock / total_items)
             score += Decimal(str(round(health_ratio * 20, 2)))
 
-        self.bankability_score = min(score, Decimal('100'))
+        score = min(score, Decimal('100'))
+        if score == self.bankability_score:
+            return
+        self.bankability_score = score
         self.save(update_fields=['bankability_score'])
+        # History only grows when the score moves
+        BankabilityScorePoint.objects.create(merchant=self, score=score)
 
 
 class Product(models.Model):
@@ -114,6 +130,9 @@ class Category(models.Model):
         return self.name
 
 
+VALUATION_FIELDS = {'quantity', 'cost_price', 'sale_price'}
+
+
 class StockItem(models.Model):
     """Physical inventory in a specific shop."""
     merchant = models.ForeignKey(MerchantProfile, on_delete=models.CASCADE)
@@ -125,9 +144,74 @@ class StockItem(models.Model):
     sale_price = models.DecimalField(
         max_digits=12, decimal_places=2, default=0
     )  # Tag price
+    # Denormalized from the write paths so dead stock needs no log scan
+    last_sold_at = models.DateTimeField(null=True, blank=True)
+    last_movement_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['merchant', 'last_sold_at'],
+                         name='stockitem_merchant_sold_idx'),
+            models.Index(fields=['merchant', 'last_movement_at'],
+                         name='stockitem_merchant_moved_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What the merchant's valuation currently counts for this row
+        instance._valuation_basis = instance.valuation_basis()
+        instance._loaded_quantity = instance.stored_quantity()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        # Re-stamp what was just read; with a partial refresh the other
+        # valued fields may hold unsaved edits, so the basis is unknown
+        refreshed = VALUATION_FIELDS if fields is None else set(fields)
+        if VALUATION_FIELDS <= refreshed:
+            self._valuation_basis = self.valuation_basis()
+        elif VALUATION_FIELDS & refreshed:
+            self._valuation_basis = None
+        if 'quantity' in refreshed:
+            self._loaded_quantity = self.stored_quantity()
+
+    def valuation_basis(self):
+        """(quantity, cost, sale) as stored, or None if any is deferred"""
+        if self.get_deferred_fields() & VALUATION_FIELDS:
+            return None
+        cent = Decimal('0.01')
+        return (
+            int(self.quantity),
+            Decimal(str(self.cost_price)).quantize(cent),
+            Decimal(str(self.sale_price)).quantize(cent),
+        )
+
+    def stored_quantity(self):
+        """The quantity as last read or written, None if deferred"""
+        if 'quantity' in self.get_deferred_fields():
+            return None
+        return int(self.quantity)
+
+    def save(self, *args, **kwargs):
+        # Any quantity change is a movement, whichever path saves it;
+        # sale paths set last_sold_at themselves
+        loaded = getattr(self, '_loaded_quantity', None)
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (
+            loaded is not None and loaded != self.quantity
+        ):
+            self.last_movement_at = timezone.now()
+            if update_fields is not None and 'quantity' in update_fields:
+                kwargs['update_fields'] = {
+                    *update_fields, 'last_movement_at',
+                }
+        super().save(*args, **kwargs)
+        if update_fields is None or 'quantity' in update_fields:
+            self._loaded_quantity = self.stored_quantity()
+
 
 class InventoryLog(models.Model):
     """The Audit Trail for Bankability."""
@@ -155,7 +239,198 @@ class InventoryLog(models.Model):
         max_length=255,
         help_text="Serial or UUID",
     )
+    # Flagged by the scan anomaly detector (services/scan_anomaly.py)
+    is_suspicious = models.BooleanField(default=False)
     timestamp = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name_plural = "Inventory Logs"
+        indexes = [
+            # Per-merchant time ranges (as-of stock, reports, exports)
+            models.Index(fields=['merchant', 'timestamp'],
+                         name='invlog_merchant_ts_idx'),
+            # Per-product history of one merchant (product analytics)
+            models.Index(fields=['merchant', 'product', 'timestamp'],
+                         name='invlog_merchant_product_ts_idx'),
+        ]
+
+
+class NumberSequence(models.Model):
+    """Named counter handing out blocks of ids (see sequences.py)."""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} @ {self.next_value}"
+
+
+class StockSnapshot(models.Model):
+    """A merchant's full stock at one moment, for as-of queries."""
+    merchant = models.ForeignKey(MerchantProfile, on_delete=models.CASCADE,
+                                 related_name='stock_snapshots')
+    taken_at = models.DateTimeField()
+    # {product_id: [quantity, cost_price, sale_price]}
+    items = models.JSONField(default=dict)
+    total_quantity = models.BigIntegerField(default=0)
+    total_value = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0
+    )  # At cost price
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['merchant', 'taken_at'],
+                         name='snapshot_merchant_taken_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.merchant} @ {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class MerchantValuation(models.Model):
+    """Running stock totals per merchant, kept current by valuation.py."""
+    merchant = models.OneToOneField(
+        MerchantProfile, on_delete=models.CASCADE, primary_key=True,
+        related_name='valuation'
+    )
+    total_quantity = models.BigIntegerField(default=0)
+    value_at_cost = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0
+    )
+    value_at_sale = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.merchant}: {self.value_at_cost} at cost"
+
+
+class CreditMetrics(models.Model):
+    """A merchant's credit features and score for one day, per engine
+    version (see services/credit_metrics.py)."""
+    CREDIT_TIERS = (
+        ('very_poor', 'Very poor'),
+        ('poor', 'Poor'),
+        ('fair', 'Fair'),
+        ('good', 'Good'),
+        ('very_good', 'Very good'),
+        ('excellent', 'Excellent'),
+    )
+
+    merchant = models.ForeignKey(MerchantProfile, on_delete=models.CASCADE,
+                                 related_name='credit_metrics')
+    engine_version = models.CharField(max_length=20)
+    as_of = models.DateField()
+    # Component points, on the mobile engine's scales
+    sales_velocity = models.FloatField(default=0)      # 0-200
+    inventory_turnover = models.FloatField(default=0)  # 0-150
+    consistency = models.FloatField(default=0)         # 0-100
+    diversity = models.FloatField(default=0)           # 0-50
+    seasonality = models.FloatField(default=0)         # 0-50
+    # Raw inputs the components were computed from
+    features = models.JSONField(default=dict)
+    credit_score = models.PositiveSmallIntegerField()  # 300-850
+    credit_tier = models.CharField(max_length=10, choices=CREDIT_TIERS)
+    recommended_loan = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Credit Metrics"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['merchant', 'engine_version', 'as_of'],
+                name='credit_metrics_unique_day',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['merchant', '-as_of'],
+                         name='credit_merchant_asof_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.merchant} {self.as_of}: {self.credit_score}"
+
+
+class BankabilityScorePoint(models.Model):
+    """A bankability score change (see services/score_history.py)."""
+    merchant = models.ForeignKey(MerchantProfile, on_delete=models.CASCADE,
+                                 related_name='score_history')
+    recorded_at = models.DateTimeField(default=timezone.now)
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['merchant', 'recorded_at'],
+                         name='score_merchant_recorded_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.merchant} {self.recorded_at:%Y-%m-%d}: {self.score}"
+
+
+class Market(models.Model):
+    """A marketplace merchants are grouped by for peer comparison."""
+    slug = models.SlugField(max_length=100, unique=True)
+    name = models.CharField(max_length=255)
+    merchant_count = models.PositiveIntegerField(default=0)
+    # {metric: {"p10": ..., "p25": ..., "p50": ..., "p75": ..., "p90": ...}}
+    distribution = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class MerchantPeerRank(models.Model):
+    """A merchant's percentile ranks within their market (0-100)."""
+    merchant = models.OneToOneField(
+        MerchantProfile, on_delete=models.CASCADE, primary_key=True,
+        related_name='peer_rank'
+    )
+    market = models.ForeignKey(Market, on_delete=models.CASCADE,
+                               related_name='peer_ranks')
+    as_of = models.DateField()
+    market_size = models.PositiveIntegerField()
+    bankability_score = models.FloatField()
+    bankability_percentile = models.FloatField()
+    sales_velocity = models.FloatField(help_text="Units sold per day")
+    sales_velocity_percentile = models.FloatField()
+    stock_value = models.FloatField(help_text="Stock value at cost")
+    stock_value_percentile = models.FloatField()
+
+    def __str__(self):
+        return f"{self.merchant} in {self.market}"
+
+
+class ReorderSuggestion(models.Model):
+    """A product's demand forecast and reorder levels for a merchant
+    (see services/demand_forecast.py). Order quantities are derived
+    from the current stock when read."""
+    METHODS = (
+        ('ses', 'Simple exponential smoothing'),
+        ('croston', 'Croston (intermittent demand)'),
+    )
+
+    merchant = models.ForeignKey(MerchantProfile, on_delete=models.CASCADE,
+                                 related_name='reorder_suggestions')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    as_of = models.DateField(help_text="Last day of sales history used")
+    method = models.CharField(max_length=10, choices=METHODS)
+    daily_demand = models.FloatField()
+    demand_std = models.FloatField()
+    reorder_point = models.PositiveIntegerField()
+    order_up_to = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['merchant', 'product'],
+                name='reorder_suggestion_unique_product',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.merchant} {self.product}: {self.reorder_point}"
@@ -48,6 +48,14 @@ class InsurancePolicy(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     # Payment information
+    PAYMENT_FREQUENCIES = [
+        ('weekly', _('Weekly')),
+        ('monthly', _('Monthly')),
+        ('quarterly', _('Quarterly')),
+    ]
+    payment_frequency = models.CharField(max_length=20,
+                                         choices=PAYMENT_FREQUENCIES,
+                                         default='monthly')
     premium_paid = models.BooleanField(default=False)
     premium_paid_date = models.DateTimeField(null=True, blank=True)
     next_premium_due = models.DateField(null=True, blank=True)
@@ -130,6 +138,14 @@ class InsuranceClaim(models.Model):
     reviewed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
                                     blank=True)
 
+    # Automated assessment against inventory history
+    assessed_stock_value = models.DecimalField(
+        max_digits=14, decimal_places=2, null=True, blank=True,
+        help_text="Stock value at cost when the incident happened"
+    )
+    exceeds_stock_value = models.BooleanField(default=False)
+    assessed_at = models.DateTimeField(null=True, blank=True)
+
     # Settlement details
     settlement_notes = models.TextField(blank=True)
     payment_reference = models.CharField(max_length=100, blank=True)
@@ -251,6 +267,11 @@ class InsurancePremium(models.Model):
         verbose_name = _("Insurance Premium")
         verbose_name_plural = _("Insurance Premiums")
         ordering = ['due_date']
+        indexes = [
+            # Overdue sweeps and the aging report scan unpaid by due date
+            models.Index(fields=['payment_status', 'due_date'],
+                         name='premium_status_due_idx'),
+        ]
 
     def __str__(self):
         return f"Premium {self.premium_number} - {self.policy.policy_number}"
@@ -1,13 +1,68 @@
 """
 KYC (Know Your Customer) models for bank compliance
 """
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 import uuid
 
 
+def kyc_blob_path(instance, filename):
+    """Store blobs by content hash, fanned out by its first byte"""
+    return f'kyc_blobs/{instance.sha256[:2]}/{instance.sha256}'
+
+
+class KYCBlob(models.Model):
+    """
+    Content-addressed KYC file shared by every document with the same bytes
+
+    Renewals re-upload identical ID cards and bills; they now reference
+    the existing blob and reuse its validation result.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=kyc_blob_path)
+    size = models.BigIntegerField(default=0)
+    mime_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    validation_score = models.IntegerField(null=True, blank=True)
+    validation_notes = models.TextField(blank=True)
+    validated_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("KYC Blob")
+        verbose_name_plural = _("KYC Blobs")
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+    def is_validated(self):
+        return self.validated_at is not None
+
+    @classmethod
+    def release(cls, blob_id):
+        """Drop one reference; delete the blob and its file at zero"""
+        cls.objects.filter(pk=blob_id, ref_count__gt=0).update(
+            ref_count=F('ref_count') - 1
+        )
+        orphan = cls.objects.filter(pk=blob_id, ref_count=0).first()
+        if orphan is None:
+            return
+        # Conditional delete: a concurrent upload may have just reused it.
+        name, storage = orphan.file.name, orphan.file.storage
+        deleted = cls.objects.filter(pk=blob_id, ref_count=0).delete()[0]
+        if deleted:
+            transaction.on_commit(lambda: storage.delete(name))
+
+
+def release_document_blob(sender, instance, **kwargs):
+    """post_delete receiver releasing a document's blob reference"""
+    if instance.blob_id:
+        KYCBlob.release(instance.blob_id)
+
+
 class KYCDocument(models.Model):
     """KYC document types and verification status"""
     DOCUMENT_TYPES = [
@@ -27,6 +82,13 @@ class KYCDocument(models.Model):
         ('expired', _('Expired')),
     ]
 
+    PROCESSING_STATUS = [
+        ('queued', _('Queued')),
+        ('processing', _('Processing')),
+        ('completed', _('Completed')),
+        ('failed', _('Failed')),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4,
                           editable=False)
     verification = models.ForeignKey(
@@ -36,6 +98,10 @@ class KYCDocument(models.Model):
     document_type = models.CharField(max_length=30, choices=DOCUMENT_TYPES)
     file_name = models.CharField(max_length=255)
     file = models.FileField(upload_to='kyc_documents/')
+    blob = models.ForeignKey(
+        KYCBlob, on_delete=models.PROTECT, null=True, blank=True,
+        related_name='documents'
+    )
     file_size = models.IntegerField(default=0)
     mime_type = models.CharField(max_length=100)
     upload_date = models.DateTimeField(auto_now_add=True)
@@ -45,11 +111,23 @@ class KYCDocument(models.Model):
     verification_score = models.IntegerField(default=0)
     verification_notes = models.TextField(blank=True)
     expiry_date = models.DateField(null=True, blank=True)
+    processing_status = models.CharField(max_length=20,
+                                         choices=PROCESSING_STATUS,
+                                         default='completed')
+    # When the document was last queued or picked up, and how often it
+    # was picked up: the sweeper re-queues documents left behind
+    processing_updated_at = models.DateTimeField(default=timezone.now)
+    processing_attempts = models.PositiveSmallIntegerField(default=0)
 
     class Meta:
         verbose_name = _("KYC Document")
         verbose_name_plural = _("KYC Documents")
         ordering = ['-upload_date']
+        indexes = [
+            models.Index(fields=['processing_status',
+                                 'processing_updated_at'],
+                         name='kycdoc_processing_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_document_type_display()} - {self.verification}"
@@ -137,13 +215,15 @@ class KYCVerification(models.Model):
     def get_completion_percentage(self):
         """Calculate completion percentage based on uploaded documents"""
         required_docs = self.get_required_documents()
-        uploaded_docs = self.documents.filter(
-            verification_status='verified'
-        ).values_list('document_type', flat=True)
-
         if not required_docs:
             return 0
 
+        # Iterate in Python so a prefetched documents cache is reused
+        uploaded_docs = {
+            doc.document_type for doc in self.documents.all()
+            if doc.verification_status == 'verified'
+        }
+
         completed = sum(1 for doc in required_docs if doc in uploaded_docs)
         return int((completed / len(required_docs)) * 100)
 
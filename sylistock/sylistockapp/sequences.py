@@ -0,0 +1,123 @@
+"""
+Collision-free, human-facing document numbers (policies, claims).
+
+Numbers come from a ``NumberSequence`` row per name. Each worker
+reserves ``settings.NUMBER_SEQUENCE_BLOCK_SIZE`` values with one UPDATE
+and hands them out from memory, so most calls cost no query at all.
+
+A reserved block only enters the in-process cache once the reserving
+transaction commits: if it rolls back, the counter rolls back with it
+and the block must not be reused. Values cached but never used (worker
+restarts, rolled-back callers) leave gaps, never duplicates.
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import NumberSequence
+
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def luhn_check_digit(digits):
+    """Luhn (mod 10) check digit for a string of digits"""
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if i % 2 == 0:  # Doubled: rightmost digit before the check digit
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def is_valid_number(number, prefix):
+    """Check the prefix and check digit of a generated number"""
+    digits = number[len(prefix):]
+    return (
+        number.startswith(prefix) and digits.isdigit() and len(digits) > 1
+        and luhn_check_digit(digits[:-1]) == digits[-1]
+    )
+
+
+def next_value(name):
+    """Next unused value of sequence ``name``"""
+    with _blocks_lock:
+        block = _blocks.get(name)
+        if block:
+            return block.popleft()
+
+    block_size = getattr(settings, 'NUMBER_SEQUENCE_BLOCK_SIZE', 20)
+    with transaction.atomic():
+        NumberSequence.objects.get_or_create(name=name)
+        # The UPDATE row-locks the counter until commit, so concurrent
+        # workers always reserve disjoint blocks.
+        NumberSequence.objects.filter(name=name).update(
+            next_value=F('next_value') + block_size
+        )
+        end = NumberSequence.objects.get(name=name).next_value
+        start = end - block_size
+        transaction.on_commit(
+            lambda: _cache_block(name, range(start + 1, end))
+        )
+    return start
+
+
+def next_values(name, count):
+    """
+    ``count`` unused values of sequence ``name`` for batch inserts.
+
+    Takes what the cached block holds and reserves the rest with one
+    UPDATE, so the cost does not grow with ``count``.
+    """
+    values = []
+    with _blocks_lock:
+        block = _blocks.get(name)
+        while block and len(values) < count:
+            values.append(block.popleft())
+
+    needed = count - len(values)
+    if needed > 0:
+        counter = NumberSequence.objects.filter(name=name)
+        with transaction.atomic():
+            if not counter.update(next_value=F('next_value') + needed):
+                NumberSequence.objects.get_or_create(name=name)
+                counter.update(next_value=F('next_value') + needed)
+            end = counter.get().next_value
+        values.extend(range(end - needed, end))
+    return values
+
+
+def format_number(value, prefix, width=8):
+    """``prefix`` + zero-padded ``value`` + Luhn check digit"""
+    digits = f'{value:0{width}d}'
+    return f'{prefix}{digits}{luhn_check_digit(digits)}'
+
+
+def next_number(name, prefix, width=8):
+    """Next document number of sequence ``name`` (see format_number)"""
+    return format_number(next_value(name), prefix, width)
+
+
+def next_numbers(name, prefix, count, width=8):
+    """``count`` document numbers of sequence ``name`` at once"""
+    return [
+        format_number(value, prefix, width)
+        for value in next_values(name, count)
+    ]
+
+
+def reset_cache():
+    """Forget cached blocks (tests, or after restoring the database)"""
+    with _blocks_lock:
+        _blocks.clear()
+
+
+def _cache_block(name, values):
+    with _blocks_lock:
+        _blocks.setdefault(name, deque()).extend(values)
@@ -25,10 +25,11 @@ class KYCDocumentSerializer(serializers.ModelSerializer):
             'file_name', 'file', 'file_size', 'mime_type', 'upload_date',
             'verification_status', 'verification_status_display',
             'verification_score', 'verification_notes', 'expiry_date',
-            'is_expired', 'is_valid'
+            'processing_status', 'is_expired', 'is_valid'
         ]
         read_only_fields = [
-            'id', 'upload_date', 'verification_score', 'is_expired', 'is_valid'
+            'id', 'upload_date', 'verification_score', 'processing_status',
+            'is_expired', 'is_valid'
         ]
 
     def validate_file_size(self, value):
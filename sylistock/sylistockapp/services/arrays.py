@@ -0,0 +1,27 @@
+"""
+NumPy helpers shared by the batch services.
+
+The batch engines (credit metrics, peer ranking, portfolio repricing)
+hold one array entry per merchant, in ascending merchant id order, and
+fill them from GROUP BY rows of ``(merchant_id, value)``.
+"""
+import numpy as np
+
+
+def scatter(ids, rows, dtype=np.float64):
+    """
+    Scatter ``(id, value)`` rows into an array aligned with ``ids``
+    (sorted ascending). Ids not in ``ids`` (merchants outside the run,
+    or created since it listed them) and None values are skipped;
+    missing entries are zero.
+    """
+    values = np.zeros(len(ids), dtype=dtype)
+    rows = [(key, value) for key, value in rows if value is not None]
+    if rows and len(ids):
+        keys = np.array([key for key, _v in rows], dtype=np.int64)
+        idx = np.minimum(np.searchsorted(ids, keys), len(ids) - 1)
+        known = ids[idx] == keys
+        values[idx[known]] = np.array(
+            [float(value) for _k, value in rows]
+        )[known]
+    return values
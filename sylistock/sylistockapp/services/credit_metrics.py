@@ -0,0 +1,356 @@
+"""
+Batch credit metrics: the server-side port of the mobile app's
+``BankabilityEngine`` (mobile_app/lib/services/bankability_engine.dart).
+
+The phone can only approximate its features from local Hive data; here
+they come from every merchant's ``InventoryLog`` with a few GROUP BY
+queries, and the scoring is NumPy arithmetic over one array entry per
+merchant, so the whole merchant base is scored in one pass.
+
+Components keep the phone's point scales and weights:
+
+- sales velocity (0-200): units sold per day over the window
+- inventory turnover (0-150): units sold over units on hand
+- consistency (0-100): share of recent days with any stock activity
+- diversity (0-50): 5 points per distinct product sold
+- seasonality (0-50): the month's factor for Guinea, as on the phone
+
+The phone adds the weighted points to 300 directly, which can never
+pass ~437; here they are scaled onto the full 300-850 range so the
+phone's tiers are reachable. Results are stored per ``as_of`` day and
+``ENGINE_VERSION``, so a new version never overwrites an old one's
+scores. Sales and activity come from logs before the end of ``as_of``;
+stock on hand comes from the latest ``StockSnapshot`` before it (see
+``_stock_at_cutoff``), so a re-run only reproduces a day exactly for
+merchants snapshotted by then.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import (
+    CreditMetrics, InventoryLog, MerchantProfile, MerchantValuation,
+    StockItem, StockSnapshot,
+)
+from .arrays import scatter
+
+ENGINE_VERSION = '1.1'  # 1.1: scans flagged as suspicious are ignored
+
+BASE_CREDIT_SCORE, MAX_CREDIT_SCORE = 300, 850
+WINDOW_DAYS = 30        # Sales, turnover and diversity window
+CONSISTENCY_DAYS = 28   # Four full weeks of daily activity
+VELOCITY_TARGET = 10.0  # Units sold per day earning full points
+TURNOVER_TARGET = 1.0   # Stock sold through once per window
+MAX_LOAN = 5000000
+
+COMPONENTS = ('sales_velocity', 'inventory_turnover', 'consistency',
+              'diversity', 'seasonality')
+MAX_POINTS = np.array([200.0, 150.0, 100.0, 50.0, 50.0])
+WEIGHTS = np.array([0.35, 0.25, 0.20, 0.10, 0.10])
+
+CREDIT_TIERS = np.array([tier for tier, _label in CreditMetrics.CREDIT_TIERS])
+CREDIT_TIER_BOUNDS = np.array([550, 600, 650, 700, 750])
+
+# Seasonal factors for Guinea, by month
+SEASONAL_FACTORS = {
+    1: 1.1,   # Post-holiday
+    2: 0.9,
+    3: 1.0,
+    4: 1.2,   # Rainy season preparation
+    5: 1.1,
+    6: 0.8,   # Rainy season
+    7: 0.7,   # Peak rains
+    8: 0.8,
+    9: 1.1,   # Harvest
+    10: 1.3,  # Peak harvest
+    11: 1.2,
+    12: 1.4,  # Holidays
+}
+
+
+def component_points(units_sold, units_on_hand, active_days,
+                     products_sold, active, month):
+    """
+    Component points for arrays of per-merchant features.
+
+    Returns an (n, 5) array in ``COMPONENTS`` order.
+    """
+    units_sold = np.asarray(units_sold, dtype=np.float64)
+    units_on_hand = np.asarray(units_on_hand, dtype=np.float64)
+    velocity = units_sold / WINDOW_DAYS / VELOCITY_TARGET
+    turnover = units_sold / np.maximum(units_on_hand, 1) / TURNOVER_TARGET
+    season = (SEASONAL_FACTORS[month] - 0.7) / 0.7
+    fractions = np.column_stack([
+        velocity,
+        turnover,
+        np.asarray(active_days, dtype=np.float64) / CONSISTENCY_DAYS,
+        np.asarray(products_sold, dtype=np.float64) * 5 / MAX_POINTS[3],
+        np.where(active, season, 0.0),
+    ])
+    return np.round(np.clip(fractions, 0, 1) * MAX_POINTS, 2)
+
+
+def credit_scores(points):
+    """300-850 credit scores from an (n, 5) array of component points"""
+    weighted = (points * WEIGHTS).sum(axis=1) / (MAX_POINTS @ WEIGHTS)
+    scores = BASE_CREDIT_SCORE + weighted * (
+        MAX_CREDIT_SCORE - BASE_CREDIT_SCORE
+    )
+    return np.clip(np.rint(scores), BASE_CREDIT_SCORE,
+                   MAX_CREDIT_SCORE).astype(np.int64)
+
+
+def credit_tiers(scores):
+    """Map credit scores to their tier names"""
+    return CREDIT_TIERS[
+        np.searchsorted(CREDIT_TIER_BOUNDS, scores, side='right')
+    ]
+
+
+def recommended_loans(scores, inventory_value, has_stock):
+    """Loan recommendation: per-point amount plus half the stock at cost"""
+    loans = (np.asarray(scores) - BASE_CREDIT_SCORE) * 1000.0 + (
+        np.asarray(inventory_value, dtype=np.float64) * 0.5
+    )
+    return np.round(np.where(has_stock, np.clip(loans, 0, MAX_LOAN), 0), 2)
+
+
+class CreditMetricsEngine:
+    """
+    Compute and store credit metrics for every merchant as of a day.
+
+    ``run(dry_run=True)`` returns the same summary without writing.
+    """
+
+    def __init__(self, as_of=None, batch_size=1000):
+        self.as_of = as_of or (timezone.localdate() - timedelta(days=1))
+        self.cutoff = timezone.make_aware(
+            datetime.combine(self.as_of + timedelta(days=1), time.min)
+        )
+        self.batch_size = batch_size
+
+    def run(self, merchant_ids=None, dry_run=False):
+        merchant_ids, features, points, scores, tiers, loans = (
+            self.compute(merchant_ids)
+        )
+        written = 0
+        if not dry_run and len(merchant_ids):
+            written = self._write(merchant_ids, features, points, scores,
+                                  tiers, loans)
+        return {
+            'dry_run': dry_run,
+            'engine_version': ENGINE_VERSION,
+            'as_of': self.as_of,
+            'merchants': len(merchant_ids),
+            'written': written,
+            'tier_counts': {
+                str(tier): int((tiers == tier).sum())
+                for tier in CREDIT_TIERS
+            },
+            'mean_score': (
+                round(float(scores.mean()), 1) if len(scores) else None
+            ),
+        }
+
+    def compute(self, merchant_ids=None):
+        """Features, points, scores, tiers and loans as parallel arrays"""
+        merchants = MerchantProfile.objects.filter(
+            created_at__lt=self.cutoff
+        )
+        if merchant_ids:
+            merchants = merchants.filter(pk__in=merchant_ids)
+        ids = np.fromiter(
+            merchants.order_by('id').values_list('id', flat=True),
+            dtype=np.int64,
+        )
+
+        window = InventoryLog.objects.filter(
+            timestamp__gte=self.cutoff - timedelta(days=WINDOW_DAYS),
+            timestamp__lt=self.cutoff,
+        )
+        if merchant_ids:
+            window = window.filter(merchant_id__in=merchant_ids)
+        if getattr(settings, 'SCAN_ANOMALY_DISCOUNT', True):
+            window = window.filter(is_suspicious=False)
+        sales = list(window.filter(action='OUT').values_list(
+            'merchant_id'
+        ).annotate(
+            units=Sum('quantity_changed'),
+            products=Count('product_id', distinct=True),
+        ).order_by())
+        units_sold = -scatter(ids, [(m, u) for m, u, _p in sales])
+        products_sold = scatter(ids, [(m, p) for m, _u, p in sales])
+        active = scatter(ids, window.values_list('merchant_id').annotate(
+            n=Count('id')
+        ).order_by()) > 0
+        active_days = scatter(ids, window.filter(
+            timestamp__gte=self.cutoff - timedelta(days=CONSISTENCY_DAYS)
+        ).values_list('merchant_id').annotate(
+            days=Count(TruncDate('timestamp'), distinct=True)
+        ).order_by())
+
+        units_on_hand, inventory_value = self._stock_at_cutoff(
+            ids, merchant_ids
+        )
+        features = {
+            'units_sold': units_sold,
+            'units_on_hand': units_on_hand,
+            'inventory_value': inventory_value,
+            'active_days': active_days,
+            'products_sold': products_sold,
+        }
+        points = component_points(units_sold, units_on_hand, active_days,
+                                  products_sold, active, self.as_of.month)
+        scores = credit_scores(points)
+        loans = recommended_loans(scores, inventory_value,
+                                  (units_on_hand > 0) | active)
+        return ids, features, points, scores, credit_tiers(scores), loans
+
+    def _stock_at_cutoff(self, ids, merchant_ids=None):
+        """
+        Units and value at cost on hand at the cutoff, per merchant.
+
+        As in ``StockHistoryService``: the merchant's latest snapshot
+        before the cutoff, with the logs between the two replayed at
+        the snapshot's cost prices. Snapshots are immutable, so these
+        figures do not move when stock or prices are edited later.
+        Merchants with no earlier snapshot are rewound from their
+        current ``MerchantValuation`` instead, which edits made without
+        a log or at new prices can still shift.
+        """
+        snapshots = StockSnapshot.objects.filter(taken_at__lt=self.cutoff)
+        if merchant_ids:
+            snapshots = snapshots.filter(merchant_id__in=merchant_ids)
+        latest = snapshots.filter(
+            merchant_id=OuterRef('merchant_id')
+        ).order_by('-taken_at')
+        bases = list(snapshots.filter(
+            pk=Subquery(latest.values('pk')[:1])
+        ).values_list('merchant_id', 'total_quantity', 'total_value'))
+        snapshotted = {m for m, _q, _v in bases}
+
+        # Logs after each merchant's base: its snapshot, else the cutoff
+        after_base = InventoryLog.objects.filter(
+            timestamp__gt=Subquery(latest.values('taken_at')[:1]),
+            timestamp__lt=self.cutoff,
+        )
+        current = MerchantValuation.objects.exclude(
+            merchant_id__in=snapshotted
+        ).values_list('merchant_id', 'total_quantity', 'value_at_cost')
+        later = InventoryLog.objects.filter(
+            timestamp__gte=self.cutoff
+        ).exclude(merchant_id__in=snapshotted)
+        if merchant_ids:
+            after_base = after_base.filter(merchant_id__in=merchant_ids)
+            current = current.filter(merchant_id__in=merchant_ids)
+            later = later.filter(merchant_id__in=merchant_ids)
+        bases += list(current)
+        units = scatter(ids, [(m, q) for m, q, _v in bases])
+        value = scatter(ids, [(m, v) for m, _q, v in bases])
+
+        replayed = list(after_base.values_list(
+            'merchant_id', 'product_id'
+        ).annotate(change=Sum('quantity_changed')).order_by())
+        # Undo what has changed since (nothing, for a nightly run)
+        rewound = list(later.values_list('merchant_id', 'product_id').annotate(
+            change=Sum('quantity_changed')
+        ).order_by())
+        costs = self._costs(replayed, rewound)
+        for rows, sign in ((replayed, 1), (rewound, -1)):
+            if rows:
+                units += sign * scatter(ids, _sum_by_merchant(
+                    (m, change) for m, _p, change in rows
+                ))
+                value += sign * scatter(ids, _sum_by_merchant(
+                    (m, change * costs.get((m, p), 0.0))
+                    for m, p, change in rows
+                ))
+        return np.maximum(units, 0), np.maximum(value, 0)
+
+    def _costs(self, replayed, rewound):
+        """
+        ``{(merchant_id, product_id): cost}``: the base snapshot's cost
+        for replayed logs, falling back to the current cost price.
+        """
+        rows = replayed + rewound
+        if not rows:
+            return {}
+        costs = {
+            (m, p): float(cost)
+            for m, p, cost in StockItem.objects.filter(
+                merchant_id__in={m for m, _p, _c in rows},
+                product_id__in={p for _m, p, _c in rows},
+            ).values_list('merchant_id', 'product_id', 'cost_price')
+        }
+        if replayed:
+            latest = StockSnapshot.objects.filter(
+                merchant_id=OuterRef('merchant_id'),
+                taken_at__lt=self.cutoff,
+            ).order_by('-taken_at')
+            for merchant_id, items in StockSnapshot.objects.filter(
+                merchant_id__in={m for m, _p, _c in replayed},
+                pk=Subquery(latest.values('pk')[:1]),
+            ).values_list('merchant_id', 'items'):
+                for product_id, (_q, cost, _s) in items.items():
+                    costs[merchant_id, int(product_id)] = float(cost)
+        return costs
+
+    def _write(self, ids, features, points, scores, tiers, loans):
+        now = timezone.now()
+        rows = [
+            CreditMetrics(
+                merchant_id=int(merchant_id),
+                engine_version=ENGINE_VERSION,
+                as_of=self.as_of,
+                **dict(zip(COMPONENTS, points[i].tolist())),
+                features={
+                    name: round(float(values[i]), 2)
+                    for name, values in features.items()
+                },
+                credit_score=int(scores[i]),
+                credit_tier=str(tiers[i]),
+                recommended_loan=Decimal(f'{loans[i]:.2f}'),
+                computed_at=now,
+            )
+            for i, merchant_id in enumerate(ids)
+        ]
+        with transaction.atomic():
+            CreditMetrics.objects.bulk_create(
+                rows, batch_size=self.batch_size, update_conflicts=True,
+                unique_fields=['merchant', 'engine_version', 'as_of'],
+                update_fields=[
+                    *COMPONENTS, 'features', 'credit_score', 'credit_tier',
+                    'recommended_loan', 'computed_at',
+                ],
+            )
+        return len(rows)
+
+
+def _sum_by_merchant(rows):
+    totals = {}
+    for merchant_id, value in rows:
+        totals[merchant_id] = totals.get(merchant_id, 0) + value
+    return totals.items()
+
+
+def credit_metrics_dict(metrics):
+    """API representation of a CreditMetrics row"""
+    return {
+        'merchant_id': metrics.merchant_id,
+        'engine_version': metrics.engine_version,
+        'as_of': metrics.as_of,
+        'credit_score': metrics.credit_score,
+        'credit_tier': metrics.credit_tier,
+        'recommended_loan': float(metrics.recommended_loan),
+        'components': {
+            name: getattr(metrics, name) for name in COMPONENTS
+        },
+        'features': metrics.features,
+        'computed_at': metrics.computed_at,
+    }
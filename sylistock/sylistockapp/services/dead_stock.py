@@ -0,0 +1,132 @@
+"""
+Dead stock: items on hand that have not sold for a while.
+
+``StockItem.last_sold_at`` is stamped by the sale paths and
+``last_movement_at`` by any quantity change (``StockItem.save``), both
+indexed with the merchant, so "not sold in N days" is an index range on
+the merchant's stock items instead of an anti-join against
+``InventoryLog``. An item that never sold ages from its creation.
+
+Age buckets start at the requested threshold and split at
+``AGE_BUCKETS`` days; tied-up capital is quantity on hand at cost.
+"""
+from datetime import timedelta
+
+from django.db.models import (
+    Count, DecimalField, ExpressionWrapper, F, Q, Sum,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import StockItem
+
+AGE_BUCKETS = (30, 60, 90, 180)
+MAX_ITEMS = 500
+
+# get_stock_items ``sort`` values
+STOCK_ITEM_SORTS = {
+    'newest': ('-pk',),
+    'recently_sold': (F('last_sold_at').desc(nulls_last=True), '-pk'),
+    'slow_movers': (F('last_sold_at').asc(nulls_first=True), 'pk'),
+    'recently_moved': (F('last_movement_at').desc(nulls_last=True), '-pk'),
+    'idle': (F('last_movement_at').asc(nulls_first=True), 'pk'),
+}
+
+
+def order_stock_items(queryset, sort):
+    """Apply a ``STOCK_ITEM_SORTS`` ordering (ValueError if unknown)"""
+    if sort not in STOCK_ITEM_SORTS:
+        raise ValueError(
+            f'sort must be one of {", ".join(STOCK_ITEM_SORTS)}'
+        )
+    return queryset.order_by(*STOCK_ITEM_SORTS[sort])
+
+
+class DeadStockService:
+    """Unsold stock of one merchant, bucketed by age"""
+
+    def __init__(self, merchant_id, days=30, limit=100):
+        if days < 1:
+            raise ValueError('days must be positive')
+        if not 1 <= limit <= MAX_ITEMS:
+            raise ValueError(f'limit must be between 1 and {MAX_ITEMS}')
+        self.merchant_id = merchant_id
+        self.days = days
+        self.limit = limit
+
+    def queryset(self, now):
+        cutoff = now - timedelta(days=self.days)
+        return StockItem.objects.filter(
+            Q(last_sold_at__lt=cutoff)
+            | Q(last_sold_at__isnull=True, created_at__lt=cutoff),
+            merchant_id=self.merchant_id, quantity__gt=0,
+        ).alias(
+            idle_since=Coalesce('last_sold_at', 'created_at'),
+        ).annotate(
+            capital=ExpressionWrapper(
+                F('quantity') * F('cost_price'),
+                output_field=DecimalField(max_digits=18, decimal_places=2),
+            ),
+        )
+
+    def report(self, now=None):
+        now = now or timezone.now()
+        items = self.queryset(now)
+
+        bounds = [self.days] + [b for b in AGE_BUCKETS if b > self.days]
+        buckets = []
+        for lower, upper in zip(bounds, bounds[1:] + [None]):
+            in_bucket = Q(idle_since__lt=now - timedelta(days=lower))
+            if upper is not None:
+                in_bucket &= Q(idle_since__gte=now - timedelta(days=upper))
+            buckets.append((
+                f'{lower}-{upper - 1}' if upper else f'{lower}+',
+                in_bucket,
+            ))
+        totals = items.aggregate(**{
+            f'{field}_{index}': aggregate
+            for index, (_label, in_bucket) in enumerate(buckets)
+            for field, aggregate in (
+                ('items', Count('pk', filter=in_bucket)),
+                ('units', Sum('quantity', filter=in_bucket)),
+                ('capital', Sum('capital', filter=in_bucket)),
+            )
+        })
+
+        oldest = items.select_related('product').order_by(
+            'idle_since', 'pk'
+        )[:self.limit]
+        age_buckets = [
+            {
+                'age_days': label,
+                'items': totals[f'items_{index}'],
+                'units': totals[f'units_{index}'] or 0,
+                'tied_up_capital': float(totals[f'capital_{index}'] or 0),
+            }
+            for index, (label, _in_bucket) in enumerate(buckets)
+        ]
+        return {
+            'merchant_id': self.merchant_id,
+            'days': self.days,
+            'items_count': sum(b['items'] for b in age_buckets),
+            'tied_up_capital': round(
+                sum(b['tied_up_capital'] for b in age_buckets), 2
+            ),
+            'age_buckets': age_buckets,
+            'items': [_item_dict(item, now) for item in oldest],
+        }
+
+
+def _item_dict(item, now):
+    idle_since = item.last_sold_at or item.created_at
+    return {
+        'id': item.pk,
+        'barcode': item.product.barcode,
+        'name': item.product.name,
+        'quantity': item.quantity,
+        'cost_price': float(item.cost_price),
+        'tied_up_capital': float(item.capital),
+        'last_sold_at': item.last_sold_at,
+        'last_movement_at': item.last_movement_at,
+        'idle_days': (now - idle_since).days,
+    }
@@ -0,0 +1,295 @@
+"""
+Per-product demand forecasts and reorder levels.
+
+``low_stock_alerts`` applies one ``alert_threshold`` to every product,
+so fast sellers run out before they trip it. Here each product's daily
+sales over the last ``history_days`` come from one GROUP BY over the
+merchant's ``InventoryLog`` OUT rows, scattered into an (SKUs x days)
+NumPy matrix, and the models below run over all SKUs at once: the loop
+is over days, never products.
+
+- steady sellers: simple exponential smoothing (SES), with the spread
+  taken from its one-step errors
+- intermittent sellers (average gap between sales days above
+  ``INTERMITTENT_ADI``): Croston's method with the Syntetos-Boylan
+  bias correction
+
+For a lead time L and review period R, with z for the service level:
+
+- reorder point: d*L + z*s*sqrt(L)
+- order-up-to level: d*(L+R) + z*s*sqrt(L+R)
+
+and the suggested order is the order-up-to level less stock on hand,
+worked out when read so it follows today's stock. ``run()`` stores the
+levels in ``ReorderSuggestion`` nightly; ``suggestions()`` serves them
+from the Django cache, forecasting on demand when the night's run has
+not covered a merchant.
+"""
+import math
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import (
+    InventoryLog, MerchantProfile, ReorderSuggestion, StockItem,
+)
+
+HISTORY_DAYS = 90
+ALPHA = 0.2             # Smoothing weight of the newest day
+INTERMITTENT_ADI = 1.32  # Average inter-demand interval cut-off
+LEAD_TIME_DAYS = 7
+REVIEW_DAYS = 7
+SERVICE_Z = 1.65        # ~95% cycle service level
+CACHE_KEY = 'reorder-suggestions:{}:{}'
+
+
+def ses(demand, alpha=ALPHA):
+    """
+    SES over each row of ``demand``; returns the final level (the
+    forecast) and the root mean squared one-step error per row.
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    n, days = demand.shape
+    # Start from the first week's mean rather than a single day
+    level = demand[:, :7].mean(axis=1) if days else np.zeros(n)
+    squared = np.zeros(n)
+    for t in range(days):
+        error = demand[:, t] - level
+        squared += error * error
+        level = level + alpha * error
+    rmse = np.sqrt(squared / max(days, 1))
+    return level, rmse
+
+
+def croston(demand, alpha=ALPHA):
+    """
+    Croston's method (SBA variant) over each row of ``demand``: demand
+    sizes and the gaps between them are smoothed separately and only
+    on days with sales. Returns the daily demand rate per row.
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    n, days = demand.shape
+    sold = demand > 0
+    has_sales = sold.any(axis=1)
+    first = np.argmax(sold, axis=1)
+    rows = np.arange(n)
+
+    size = demand[rows, first] if days else np.zeros(n)
+    interval = first + 1.0
+    since = np.zeros(n)
+    for t in range(days):
+        since += 1
+        update = sold[:, t] & (t > first)
+        size = np.where(update, size + alpha * (demand[:, t] - size), size)
+        interval = np.where(
+            update, interval + alpha * (since - interval), interval
+        )
+        since = np.where(sold[:, t], 0, since)
+    return np.where(has_sales, (1 - alpha / 2) * size / interval, 0.0)
+
+
+def reorder_levels(daily_demand, demand_std, lead_time_days=LEAD_TIME_DAYS,
+                   review_days=REVIEW_DAYS, service_z=SERVICE_Z):
+    """Reorder points and order-up-to levels, rounded up to units"""
+    daily_demand = np.asarray(daily_demand, dtype=np.float64)
+    demand_std = np.asarray(demand_std, dtype=np.float64)
+
+    def cover(days):
+        return np.ceil(np.round(
+            daily_demand * days + service_z * demand_std * math.sqrt(days),
+            6,
+        )).astype(np.int64)
+
+    return cover(lead_time_days), cover(lead_time_days + review_days)
+
+
+class DemandForecaster:
+    """Forecast demand and reorder levels from sales up to ``as_of``"""
+
+    def __init__(self, as_of=None, history_days=HISTORY_DAYS,
+                 lead_time_days=LEAD_TIME_DAYS, review_days=REVIEW_DAYS,
+                 batch_size=1000):
+        self.as_of = as_of or (timezone.localdate() - timedelta(days=1))
+        self.cutoff = timezone.make_aware(
+            datetime.combine(self.as_of + timedelta(days=1), time.min)
+        )
+        self.history_days = history_days
+        self.lead_time_days = lead_time_days
+        self.review_days = review_days
+        self.batch_size = batch_size
+
+    def demand_matrix(self, merchant_id):
+        """Product ids and their (products x days) daily units sold"""
+        product_ids = np.fromiter(
+            StockItem.objects.filter(merchant_id=merchant_id).order_by(
+                'product_id'
+            ).values_list('product_id', flat=True),
+            dtype=np.int64,
+        )
+        demand = np.zeros((len(product_ids), self.history_days))
+        start = self.as_of - timedelta(days=self.history_days - 1)
+        daily = InventoryLog.objects.filter(
+            merchant_id=merchant_id, action='OUT',
+            timestamp__gte=self.cutoff - timedelta(days=self.history_days),
+            timestamp__lt=self.cutoff,
+        ).values_list('product_id', TruncDate('timestamp')).annotate(
+            units=Sum('quantity_changed')
+        ).order_by()
+        rows = [
+            (product_id, (day - start).days, -units)
+            for product_id, day, units in daily
+        ]
+        if rows and len(product_ids):
+            keys = np.array([p for p, _d, _u in rows], dtype=np.int64)
+            idx = np.minimum(np.searchsorted(product_ids, keys),
+                             len(product_ids) - 1)
+            days = np.array([d for _p, d, _u in rows], dtype=np.int64)
+            # Products no longer stocked, or days outside the window
+            known = (product_ids[idx] == keys) & (days >= 0) & (
+                days < self.history_days
+            )
+            np.add.at(demand, (idx[known], days[known]),
+                      np.array([u for _p, _d, u in rows])[known])
+        return product_ids, np.maximum(demand, 0)
+
+    def forecast(self, merchant_id):
+        """Per-product method, demand, spread and reorder levels"""
+        product_ids, demand = self.demand_matrix(merchant_id)
+        sale_days = (demand > 0).sum(axis=1)
+        intermittent = self.history_days > INTERMITTENT_ADI * np.maximum(
+            sale_days, 1
+        )
+
+        level, rmse = ses(demand)
+        daily_demand = np.where(intermittent, croston(demand), level)
+        demand_std = np.where(intermittent, demand.std(axis=1), rmse)
+        reorder_point, order_up_to = reorder_levels(
+            daily_demand, demand_std, self.lead_time_days, self.review_days,
+        )
+        return {
+            'product_ids': product_ids,
+            'method': np.where(intermittent, 'croston', 'ses'),
+            'daily_demand': np.round(daily_demand, 3),
+            'demand_std': np.round(demand_std, 3),
+            'reorder_point': reorder_point,
+            'order_up_to': order_up_to,
+        }
+
+    def run(self, merchant_ids=None, dry_run=False):
+        """Forecast every merchant (or ``merchant_ids``) and store it"""
+        merchants = MerchantProfile.objects.order_by('id')
+        if merchant_ids:
+            merchants = merchants.filter(pk__in=merchant_ids)
+
+        summary = {
+            'dry_run': dry_run, 'as_of': self.as_of, 'merchants': 0,
+            'products': 0, 'intermittent': 0, 'written': 0,
+        }
+        for merchant_id in merchants.values_list('id', flat=True):
+            forecast = self.forecast(merchant_id)
+            summary['merchants'] += 1
+            summary['products'] += len(forecast['product_ids'])
+            summary['intermittent'] += int(
+                (forecast['method'] == 'croston').sum()
+            )
+            if not dry_run:
+                summary['written'] += self._write(merchant_id, forecast)
+        return summary
+
+    def _write(self, merchant_id, forecast):
+        now = timezone.now()
+        rows = [
+            ReorderSuggestion(
+                merchant_id=merchant_id,
+                product_id=int(product_id),
+                as_of=self.as_of,
+                method=str(forecast['method'][i]),
+                daily_demand=float(forecast['daily_demand'][i]),
+                demand_std=float(forecast['demand_std'][i]),
+                reorder_point=int(forecast['reorder_point'][i]),
+                order_up_to=int(forecast['order_up_to'][i]),
+                computed_at=now,
+            )
+            for i, product_id in enumerate(forecast['product_ids'])
+        ]
+        with transaction.atomic():
+            ReorderSuggestion.objects.bulk_create(
+                rows, batch_size=self.batch_size, update_conflicts=True,
+                unique_fields=['merchant', 'product'],
+                update_fields=[
+                    'as_of', 'method', 'daily_demand', 'demand_std',
+                    'reorder_point', 'order_up_to', 'computed_at',
+                ],
+            )
+            # Products no longer stocked
+            ReorderSuggestion.objects.filter(
+                merchant_id=merchant_id, as_of__lt=self.as_of
+            ).delete()
+        cache.delete(CACHE_KEY.format(merchant_id, self.as_of))
+        return len(rows)
+
+    def levels(self, merchant_id):
+        """
+        ``{product_id: (method, daily_demand, reorder_point,
+        order_up_to)}``, cached; from the nightly run when it covered
+        this day, else forecast now.
+        """
+        key = CACHE_KEY.format(merchant_id, self.as_of)
+        levels = cache.get(key)
+        if levels is None:
+            levels = {
+                product_id: (method, demand, point, up_to)
+                for product_id, method, demand, point, up_to in
+                ReorderSuggestion.objects.filter(
+                    merchant_id=merchant_id, as_of=self.as_of
+                ).values_list('product_id', 'method', 'daily_demand',
+                              'reorder_point', 'order_up_to')
+            }
+            if not levels:
+                forecast = self.forecast(merchant_id)
+                levels = {
+                    int(product_id): (
+                        str(forecast['method'][i]),
+                        float(forecast['daily_demand'][i]),
+                        int(forecast['reorder_point'][i]),
+                        int(forecast['order_up_to'][i]),
+                    )
+                    for i, product_id in enumerate(forecast['product_ids'])
+                }
+            cache.set(key, levels, getattr(
+                settings, 'REORDER_FORECAST_CACHE_SECONDS', 3600
+            ))
+        return levels
+
+    def suggestions(self, merchant_id):
+        """Products at or below their reorder point, most urgent first"""
+        levels = self.levels(merchant_id)
+        suggestions = []
+        for product_id, name, barcode, quantity in StockItem.objects.filter(
+            merchant_id=merchant_id
+        ).values_list('product_id', 'product__name', 'product__barcode',
+                      'quantity'):
+            method, demand, point, up_to = levels.get(
+                product_id, ('ses', 0.0, 0, 0)
+            )
+            if demand <= 0 or quantity > point:
+                continue
+            suggestions.append({
+                'product_id': product_id,
+                'name': name,
+                'barcode': barcode,
+                'quantity': quantity,
+                'method': method,
+                'daily_demand': demand,
+                'days_of_cover': round(quantity / demand, 1),
+                'reorder_point': point,
+                'suggested_quantity': max(up_to - quantity, 0),
+            })
+        suggestions.sort(key=lambda s: (s['days_of_cover'], s['product_id']))
+        return suggestions
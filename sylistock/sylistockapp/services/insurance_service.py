@@ -1,27 +1,93 @@
 """
 Micro-Insurance Service for inventory protection
 """
+import calendar
 from datetime import timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Count, Min, OuterRef, Q, Subquery, Sum
 from ..models_insurance import (
     InsurancePolicy, InsuranceClaim, InsuranceRiskAssessment,
     InsurancePremium
 )
 from ..models import MerchantProfile
+from ..sequences import next_number, next_numbers
+from ..valuation import get_valuation
+from .stock_history import StockHistoryService, parse_as_of
+from .portfolio_pricing import (
+    DEFAULT_BASE_RATE, DEFAULT_RISK_MULTIPLIERS, risk_levels, risk_scores,
+)
+
+
+# Installments per year for each payment frequency. Policies are priced
+# with a monthly premium; other frequencies pay the same yearly total.
+PAYMENTS_PER_YEAR = {'weekly': 52, 'monthly': 12, 'quarterly': 4}
+MAX_BULK_POLICIES = 1000
+UNPAID_STATUSES = ['pending', 'overdue']
+# (label, min days past due, max days past due or None)
+AGING_BUCKETS = [
+    ('0-30', 1, 30),
+    ('31-60', 31, 60),
+    ('61-90', 61, 90),
+    ('90+', 91, None),
+]
+
+
+def add_months(day, months):
+    """``day`` moved by ``months``, clamped to the target month's end"""
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    return day.replace(
+        year=year, month=month,
+        day=min(day.day, calendar.monthrange(year, month)[1]),
+    )
+
+
+def build_premium_schedule(start_date, monthly_premium, term_months=12,
+                           frequency='monthly'):
+    """
+    Compute a policy's installments as ``(due_date, amount)`` pairs.
+
+    Pure function: due dates run from ``start_date`` up to (excluding)
+    the end of the term, weekly every 7 days and monthly/quarterly on
+    the start day clamped to short months.
+    """
+    if frequency not in PAYMENTS_PER_YEAR:
+        raise ValueError(f'Unsupported payment frequency: {frequency}')
+    if term_months <= 0:
+        raise ValueError('term_months must be positive')
+
+    try:
+        monthly_premium = Decimal(str(monthly_premium))
+    except InvalidOperation:
+        raise ValueError(f'Invalid premium amount: {monthly_premium}')
+
+    end_date = add_months(start_date, term_months)
+    amount = (
+        monthly_premium * 12 / PAYMENTS_PER_YEAR[frequency]
+    ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    if frequency == 'weekly':
+        count = -(-(end_date - start_date).days // 7)
+        due_dates = [start_date + timedelta(weeks=i) for i in range(count)]
+    else:
+        step = 12 // PAYMENTS_PER_YEAR[frequency]
+        due_dates = [
+            add_months(start_date, months)
+            for months in range(0, term_months, step)
+        ]
+    return [(due_date, amount) for due_date in due_dates]
 
 
 class InsuranceService:
     """Micro-Insurance service for inventory protection"""
 
     def __init__(self):
-        self.base_premium_rate = 0.02  # 2% of coverage amount
-        self.risk_multiplier = {
-            'low': 1.0,
-            'medium': 1.5,
-            'high': 2.0,
-            'very_high': 3.0,
-        }
+        self.base_premium_rate = DEFAULT_BASE_RATE  # 2% of coverage
+        self.risk_multiplier = dict(DEFAULT_RISK_MULTIPLIERS)
 
     def calculate_premium(self, merchant_id, policy_type, coverage_amount,
                           deductible_amount=0):
@@ -69,6 +135,9 @@ class InsuranceService:
         """Assess insurance risk for merchant"""
         try:
             merchant = MerchantProfile.objects.get(id=merchant_id)
+            inventory_value = Decimal(str(
+                get_valuation(merchant.id)['value_at_cost']
+            ))
 
             # Create or update risk assessment
             risk_assessment, created = (
@@ -78,7 +147,7 @@ class InsuranceService:
                         'risk_level': 'medium',
                         'risk_score': 50,
                         'location_risk': 50,
-                        'inventory_value': 0,
+                        'inventory_value': inventory_value,
                         'security_measures': {},
                         'previous_claims': 0,
                     }
@@ -90,12 +159,14 @@ class InsuranceService:
                 risk_score = self._calculate_risk_score(merchant)
                 risk_assessment.risk_score = risk_score
                 risk_assessment.risk_level = self._get_risk_level(risk_score)
+                risk_assessment.inventory_value = inventory_value
                 risk_assessment.save()
 
             return {
                 'success': True,
                 'risk_level': risk_assessment.risk_level,
                 'risk_score': risk_assessment.risk_score,
+                'inventory_value': float(risk_assessment.inventory_value),
                 'assessment_date': risk_assessment.assessment_date,
             }
 
@@ -106,33 +177,20 @@ class InsuranceService:
             }
 
     def create_policy(self, merchant_id, policy_type, coverage_amount,
-                      deductible_amount, premium_amount):
+                      deductible_amount, premium_amount, term_months=12,
+                      payment_frequency='monthly'):
         """Create new insurance policy"""
         try:
             with transaction.atomic():
                 merchant = MerchantProfile.objects.get(id=merchant_id)
 
-                # Generate policy number
-                policy_number = self._generate_policy_number()
-
-                # Create policy
-                policy = InsurancePolicy.objects.create(
-                    merchant=merchant,
-                    policy_number=policy_number,
-                    policy_type=policy_type,
-                    total_coverage_amount=coverage_amount,
-                    deductible_amount=deductible_amount,
-                    premium_amount=premium_amount,
-                    start_date=timezone.now().date(),
-                    end_date=timezone.now().date() + timedelta(days=365),
+                policy, premiums = self._build_policy(
+                    merchant, policy_type, coverage_amount,
+                    deductible_amount, premium_amount, term_months,
+                    payment_frequency,
                 )
-
-                # Create premium schedule
-                self._create_premium_schedule(policy)
-
-                # Activate the policy
-                policy.status = 'active'
-                policy.save()
+                policy.save(force_insert=True)
+                InsurancePremium.objects.bulk_create(premiums)
 
                 return {
                     'success': True,
@@ -141,6 +199,8 @@ class InsuranceService:
                     'status': policy.status,
                     'start_date': policy.start_date,
                     'end_date': policy.end_date,
+                    'payment_frequency': policy.payment_frequency,
+                    'installments': len(premiums),
                 }
 
         except MerchantProfile.DoesNotExist:
@@ -149,9 +209,269 @@ class InsuranceService:
                 'error': 'Merchant not found',
             }
 
+    def create_policies_bulk(self, enrollments, defaults=None):
+        """
+        Enroll many merchants at once (e.g. a traders' cooperative).
+
+        ``enrollments`` is a list of dicts with ``merchant_id`` and any
+        of the ``create_policy`` arguments, falling back to
+        ``defaults``. Invalid rows are reported and skipped; the rest
+        are created in one transaction with a handful of queries.
+        """
+        defaults = defaults or {}
+
+        policies, premiums, created, errors = [], [], [], []
+        checked = []
+        for index, enrollment in enumerate(enrollments):
+            if not isinstance(enrollment, dict):
+                errors.append({'index': index,
+                               'error': 'Enrollment must be an object'})
+                continue
+            row = {**defaults, **enrollment}
+            missing = [
+                field for field in (
+                    'merchant_id', 'policy_type', 'coverage_amount',
+                    'premium_amount',
+                ) if row.get(field) in (None, '')
+            ]
+            if missing:
+                errors.append({'index': index,
+                               'error': 'Missing required fields',
+                               'required': missing})
+                continue
+            try:
+                merchant_id = int(row['merchant_id'])
+            except (TypeError, ValueError):
+                errors.append({'index': index,
+                               'error': 'merchant_id must be an integer'})
+                continue
+            try:
+                row = dict(row, **self._bulk_amounts(row))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+                continue
+            checked.append((index, row, merchant_id))
+
+        merchants = MerchantProfile.objects.in_bulk(
+            {merchant_id for _index, _row, merchant_id in checked}
+        )
+        valid = []
+        for index, row, merchant_id in checked:
+            merchant = merchants.get(merchant_id)
+            if merchant is None:
+                errors.append({'index': index,
+                               'error': 'Merchant not found'})
+                continue
+            valid.append((index, row, merchant))
+
+        with transaction.atomic():
+            # One reservation for the whole batch; rows failing below
+            # leave gaps in the numbering, never duplicates
+            numbers = next_numbers('policy', 'POL', len(valid))
+            for (index, row, merchant), number in zip(valid, numbers):
+                try:
+                    policy, schedule = self._build_policy(
+                        merchant, row['policy_type'],
+                        row['coverage_amount'],
+                        row['deductible_amount'],
+                        row['premium_amount'],
+                        row['term_months'],
+                        row.get('payment_frequency') or 'monthly',
+                        policy_number=number,
+                    )
+                except ValueError as e:
+                    errors.append({'index': index, 'error': str(e)})
+                    continue
+                policies.append(policy)
+                premiums.extend(schedule)
+                created.append({
+                    'index': index,
+                    'merchant_id': merchant.id,
+                    'policy_id': str(policy.id),
+                    'policy_number': policy.policy_number,
+                    'installments': len(schedule),
+                })
+
+            InsurancePolicy.objects.bulk_create(policies, batch_size=500)
+            InsurancePremium.objects.bulk_create(premiums, batch_size=1000)
+
+        errors.sort(key=lambda error: error['index'])
+        return {
+            'success': not errors,
+            'created': created,
+            'errors': errors,
+        }
+
+    @staticmethod
+    def _bulk_amounts(row):
+        """A bulk row's amounts and term, parsed; ValueError if invalid"""
+        parsed = {}
+        for field, minimum in (('coverage_amount', 'positive'),
+                               ('premium_amount', 'positive'),
+                               ('deductible_amount', 'non-negative')):
+            value = row.get(field) or 0
+            try:
+                amount = Decimal(str(value))
+            except InvalidOperation:
+                raise ValueError(f'Invalid {field}: {value}')
+            if not amount.is_finite() or amount < 0 or (
+                minimum == 'positive' and amount == 0
+            ):
+                raise ValueError(f'{field} must be {minimum}')
+            parsed[field] = amount
+        try:
+            parsed['term_months'] = int(row.get('term_months') or 12)
+        except (TypeError, ValueError):
+            raise ValueError('term_months must be an integer')
+        return parsed
+
+    def age_premiums(self, today=None):
+        """
+        Mark unpaid premiums of active policies past their due date as
+        overdue and refresh those policies' ``next_premium_due``.
+        Cancelled and expired policies are left as they stand.
+
+        Two statements whatever the book size: a set-based UPDATE of
+        premiums, then one UPDATE of policies from a grouped MIN.
+        """
+        today = today or timezone.now().date()
+        with transaction.atomic():
+            marked = InsurancePremium.objects.filter(
+                policy__status='active', payment_status='pending',
+                due_date__lt=today,
+            ).update(payment_status='overdue', updated_at=timezone.now())
+
+            earliest_unpaid = InsurancePremium.objects.filter(
+                policy=OuterRef('pk'),
+                payment_status__in=UNPAID_STATUSES,
+            ).values('policy').annotate(
+                due=Min('due_date')
+            ).values('due')
+            refreshed = InsurancePolicy.objects.filter(
+                status='active'
+            ).update(
+                next_premium_due=Subquery(earliest_unpaid)
+            )
+        return {'marked_overdue': marked, 'policies_refreshed': refreshed}
+
+    def premium_aging_report(self, today=None, group_by=None):
+        """
+        Unpaid premiums of active policies past due, bucketed by days
+        overdue.
+
+        Every bucket is a filtered COUNT/SUM in a single aggregate
+        query; ``group_by`` ('policy_type' or 'merchant') splits the
+        totals per group, still in one query.
+        """
+        today = today or timezone.now().date()
+        aggregates = {}
+        for i, (_label, low, high) in enumerate(AGING_BUCKETS):
+            in_bucket = Q(due_date__lte=today - timedelta(days=low))
+            if high is not None:
+                in_bucket &= Q(due_date__gte=today - timedelta(days=high))
+            aggregates[f'bucket{i}_count'] = Count('id', filter=in_bucket)
+            aggregates[f'bucket{i}_amount'] = Sum('amount',
+                                                  filter=in_bucket)
+        aggregates['total_count'] = Count('id')
+        aggregates['total_amount'] = Sum('amount')
+        aggregates['policies'] = Count('policy', distinct=True)
+
+        overdue = InsurancePremium.objects.filter(
+            policy__status='active', payment_status__in=UNPAID_STATUSES,
+            due_date__lt=today,
+        )
+        group_fields = {
+            'policy_type': 'policy__policy_type',
+            'merchant': 'policy__merchant_id',
+        }
+        if group_by is None:
+            groups = [(None, overdue.aggregate(**aggregates))]
+        elif group_by in group_fields:
+            field = group_fields[group_by]
+            groups = [
+                (row.pop(field), row)
+                for row in overdue.values(field).annotate(
+                    **aggregates
+                ).order_by(field)
+            ]
+        else:
+            raise ValueError(f'Unsupported group_by: {group_by}')
+
+        return {
+            'success': True,
+            'as_of': today,
+            'group_by': group_by,
+            'groups': [
+                dict(self._aging_row(values),
+                     **({'group': key} if group_by else {}))
+                for key, values in groups
+            ],
+        }
+
+    @staticmethod
+    def _aging_row(values):
+        return {
+            'buckets': [
+                {
+                    'bucket': label,
+                    'count': values[f'bucket{i}_count'],
+                    'amount': float(values[f'bucket{i}_amount'] or 0),
+                }
+                for i, (label, _low, _high) in enumerate(AGING_BUCKETS)
+            ],
+            'total_count': values['total_count'],
+            'total_amount': float(values['total_amount'] or 0),
+            'policies': values['policies'],
+        }
+
+    def _build_policy(self, merchant, policy_type, coverage_amount,
+                      deductible_amount, premium_amount, term_months,
+                      payment_frequency, policy_number=None):
+        """Unsaved active policy and its premium installments"""
+        start_date = timezone.now().date()
+        schedule = build_premium_schedule(
+            start_date, premium_amount, term_months, payment_frequency
+        )
+        policy = InsurancePolicy(
+            merchant=merchant,
+            policy_number=policy_number or self._generate_policy_number(),
+            policy_type=policy_type,
+            status='active',
+            total_coverage_amount=coverage_amount,
+            deductible_amount=deductible_amount or 0,
+            premium_amount=premium_amount,
+            payment_frequency=payment_frequency,
+            start_date=start_date,
+            end_date=add_months(start_date, term_months),
+            next_premium_due=schedule[0][0],
+        )
+        premiums = [
+            InsurancePremium(
+                policy=policy,
+                premium_number=(
+                    f"{policy.policy_number}-PREM-{number:02d}"
+                ),
+                amount=amount,
+                due_date=due_date,
+                payment_status='pending',
+            )
+            for number, (due_date, amount) in enumerate(schedule, 1)
+        ]
+        return policy, premiums
+
     def submit_claim(self, policy_id, claim_type, description, estimated_loss,
                      incident_date=None, incident_location=None):
         """Submit insurance claim"""
+        try:
+            estimated_loss = Decimal(str(estimated_loss))
+        except InvalidOperation:
+            raise ValueError(f'Invalid estimated loss: {estimated_loss}')
+        if not estimated_loss.is_finite() or estimated_loss <= 0:
+            raise ValueError('estimated_loss must be a positive amount')
+        if isinstance(incident_date, str):
+            incident_date = parse_as_of(incident_date, end_of_day=False,
+                                        name='incident_date')
+
         try:
             with transaction.atomic():
                 policy = InsurancePolicy.objects.get(id=policy_id)
@@ -167,7 +487,7 @@ class InsuranceService:
                 claim_number = self._generate_claim_number()
 
                 # Create claim
-                claim = InsuranceClaim.objects.create(
+                claim = InsuranceClaim(
                     policy=policy,
                     claim_number=claim_number,
                     claim_type=claim_type,
@@ -176,12 +496,18 @@ class InsuranceService:
                     incident_date=incident_date or timezone.now(),
                     incident_location=incident_location or '',
                 )
+                self._assess_claim(claim)
+                claim.save(force_insert=True)
 
                 return {
                     'success': True,
                     'claim_id': str(claim.id),
                     'claim_number': claim.claim_number,
                     'status': claim.status,
+                    'assessed_stock_value': float(
+                        claim.assessed_stock_value
+                    ),
+                    'exceeds_stock_value': claim.exceeds_stock_value,
                 }
 
         except InsurancePolicy.DoesNotExist:
@@ -190,6 +516,30 @@ class InsuranceService:
                 'error': 'Policy not found',
             }
 
+    def _assess_claim(self, claim):
+        """
+        Value the merchant's stock at the incident and flag losses
+        above it for manual review.
+
+        Uses the snapshot-based as-of query: a few indexed queries
+        however long the merchant's history, so it runs inline.
+        """
+        stock = StockHistoryService().stock_as_of(
+            claim.policy.merchant_id, claim.incident_date
+        )
+        claim.assessed_stock_value = Decimal(str(stock['total_value']))
+        claim.exceeds_stock_value = (
+            claim.estimated_loss > claim.assessed_stock_value
+        )
+        claim.assessed_at = timezone.now()
+        if claim.exceeds_stock_value:
+            claim.status = 'under_review'
+            claim.settlement_notes = (
+                f'Estimated loss {claim.estimated_loss} exceeds stock '
+                f'value {claim.assessed_stock_value} at the incident'
+            )
+        return stock
+
     def process_claim(self, claim_id, action, notes=''):
         """Process insurance claim"""
         try:
@@ -197,9 +547,13 @@ class InsuranceService:
                 claim = InsuranceClaim.objects.get(id=claim_id)
 
                 if action == 'approve':
-                    # Auto-approve based on estimated loss and policy limits
+                    # Auto-approve based on estimated loss and policy
+                    # limits, never above the stock actually on hand
                     approved_amount = min(claim.estimated_loss,
                                           claim.policy.total_coverage_amount)
+                    if claim.assessed_stock_value is not None:
+                        approved_amount = min(approved_amount,
+                                              claim.assessed_stock_value)
                     claim.approved_amount = approved_amount
                     claim.status = 'approved'
                     claim.approved_at = timezone.now()
@@ -324,6 +678,12 @@ class InsuranceService:
                                             if claim.approved_amount else 0),
                         'submitted_at': claim.submitted_at,
                         'incident_date': claim.incident_date,
+                        'assessed_stock_value': (
+                            float(claim.assessed_stock_value)
+                            if claim.assessed_stock_value is not None
+                            else None
+                        ),
+                        'exceeds_stock_value': claim.exceeds_stock_value,
                     }
                     for claim in claims_page
                 ],
@@ -415,88 +775,23 @@ class InsuranceService:
 
     def _calculate_risk_score(self, merchant):
         """Calculate risk score based on merchant profile"""
-        score = 50  # Base score
-
-        # Business age factor
-        days_since_creation = (
+        # Same model as the portfolio repricer, for a single merchant
+        age_days = (
             timezone.now().date() - merchant.created_at.date()
         ).days
-        if days_since_creation > 365:
-            score -= 10
-        elif days_since_creation < 30:
-            score += 20
-
-        # Location risk (simplified)
-        score += 10  # Default location risk for Guinea
-
-        return max(0, min(100, score))
+        previous_claims = InsuranceClaim.objects.filter(
+            policy__merchant=merchant
+        ).count()
+        return int(risk_scores([age_days], [previous_claims])[0])
 
     def _get_risk_level(self, score):
         """Get risk level based on score"""
-        if score < 30:
-            return 'low'
-        elif score < 50:
-            return 'medium'
-        elif score < 70:
-            return 'high'
-        else:
-            return 'very_high'
+        return str(risk_levels([score])[0])
 
     def _generate_policy_number(self):
         """Generate unique policy number"""
-        import random
-        import string
-
-        while True:
-            prefix = 'POL'
-            random_digits = ''.join(random.choices(string.digits, k=8))
-            policy_number = f"{prefix}{random_digits}"
-
-            if not InsurancePolicy.objects.filter(
-                    policy_number=policy_number).exists():
-                return policy_number
+        return next_number('policy', 'POL')
 
     def _generate_claim_number(self):
         """Generate unique claim number"""
-        import random
-        import string
-
-        while True:
-            prefix = 'CLM'
-            random_digits = ''.join(random.choices(string.digits, k=8))
-            claim_number = f"{prefix}{random_digits}"
-
-            if not InsuranceClaim.objects.filter(
-                    claim_number=claim_number).exists():
-                return claim_number
-
-    def _create_premium_schedule(self, policy):
-        """Create premium payment schedule"""
-        premium_amount = policy.premium_amount
-
-        # Create monthly premiums for 1 year
-        for month in range(12):
-            # Calculate proper monthly due date
-            year = policy.start_date.year
-            m = policy.start_date.month + month
-            if m > 12:
-                year += (m - 1) // 12
-                m = ((m - 1) % 12) + 1
-            # Clamp day to last day of target month
-            import calendar
-            max_day = calendar.monthrange(year, m)[1]
-            day = min(policy.start_date.day, max_day)
-            due_date = policy.start_date.replace(
-                year=year, month=m, day=day
-            )
-            premium_number = (
-                f"{policy.policy_number}-PREM-{month + 1:02d}"
-            )
-
-            InsurancePremium.objects.create(
-                policy=policy,
-                premium_number=premium_number,
-                amount=premium_amount,
-                due_date=due_date,
-                payment_status='pending',
-            )
+        return next_number('claim', 'CLM')
@@ -1,12 +1,85 @@
 """
 KYC (Know Your Customer) Service for bank compliance
 """
+import base64
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, Q
+from django.utils import timezone
+from ..background import submit_on_commit
+from .image_quality import analyze_in_pool
 from ..models_kyc import (
-    KYCDocument, KYCVerification, BankAccount, ComplianceCheck
+    KYCBlob, KYCDocument, KYCVerification, BankAccount, ComplianceCheck
 )
 from ..models import MerchantProfile
 
+logger = logging.getLogger(__name__)
+
+MAX_DOCUMENT_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_PROCESSING_ATTEMPTS = 3  # Pick-ups before a stuck document fails
+IMAGE_QUALITY_CACHE_SECONDS = 30 * 24 * 3600
+ALLOWED_MIME_TYPES = ['image/jpeg', 'image/png', 'application/pdf']
+
+# Leading bytes of the formats phones and scanners produce.
+_MAGIC_NUMBERS = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'%PDF-', 'application/pdf'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+
+REVIEW_QUEUE_STATUSES = ['pending', 'in_progress']
+
+
+def encode_review_cursor(kyc_verification):
+    """Opaque review-queue cursor for the row after ``kyc_verification``"""
+    raw = (f'{kyc_verification.submitted_at.isoformat()}'
+           f'|{kyc_verification.id}')
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_review_cursor(cursor):
+    """Inverse of ``encode_review_cursor``; raises ValueError if invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        submitted_at, last_id = raw.split('|')
+        return datetime.fromisoformat(submitted_at), uuid.UUID(last_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def sniff_mime_type(header):
+    """Detect a file's MIME type from its first bytes"""
+    for magic, mime_type in _MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return mime_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    if header[4:8] == b'ftyp' and header[8:12] in (b'heic', b'heix',
+                                                   b'mif1'):
+        return 'image/heic'
+    return 'application/octet-stream'
+
+
+def process_kyc_document(document_id):
+    """Background task: validate an uploaded KYC document"""
+    KYCService().process_document(document_id)
+
+
+def recompute_bankability_scores(merchant_ids):
+    """Background task: refresh bankability for the given merchants"""
+    for merchant in MerchantProfile.objects.filter(id__in=merchant_ids):
+        merchant.update_bankability_score()
+
 
 class KYCService:
     """Know Your Customer service for bank compliance"""
@@ -51,29 +124,55 @@ class KYCService:
                 'error': 'Merchant not found',
             }
 
-    def upload_document(self, kyc_id, document_type, file_data, file_name):
-        """Upload and process KYC document"""
+    def upload_document(self, kyc_id, document_type, file_data,
+                        file_name=None):
+        """
+        Store a KYC document and queue it for validation.
+
+        ``file_data`` is normally the request's UploadedFile, already
+        hashed by the upload handlers; raw bytes are accepted too. Files
+        are stored once per content hash, and a document whose bytes
+        were validated before takes the earlier result instead of being
+        queued again.
+        """
         try:
             kyc_verification = KYCVerification.objects.get(id=kyc_id)
 
-            # Create KYC document record
-            kyc_document = KYCDocument.objects.create(
-                verification=kyc_verification,
-                document_type=document_type,
-                file_name=file_name,
-                verification_status='pending',
-            )
-
-            # Save file
-            kyc_document.file.save(file_name, ContentFile(file_data))
-
-            # Perform basic validation
-            validation_result = self._validate_document(kyc_document)
+            if isinstance(file_data, bytes):
+                file_data = ContentFile(file_data)
+            file_name = file_name or file_data.name
+
+            with transaction.atomic():
+                blob = self._store_blob(file_data)
+                kyc_document = KYCDocument(
+                    verification=kyc_verification,
+                    document_type=document_type,
+                    file_name=file_name,
+                    file=blob.file.name,
+                    blob=blob,
+                    file_size=blob.size,
+                    mime_type=blob.mime_type,
+                    verification_status='pending',
+                    processing_status='queued',
+                )
+                if blob.is_validated():
+                    kyc_document.verification_score = blob.validation_score
+                    kyc_document.verification_notes = blob.validation_notes
+                    kyc_document.verification_status = (
+                        self._status_for_score(blob.validation_score)
+                    )
+                    kyc_document.processing_status = 'completed'
+                kyc_document.save()
+
+                if kyc_document.processing_status == 'queued':
+                    submit_on_commit(process_kyc_document,
+                                     str(kyc_document.id))
 
             return {
                 'success': True,
                 'document_id': str(kyc_document.id),
-                'validation_result': validation_result,
+                'processing_status': kyc_document.processing_status,
+                'deduplicated': blob.ref_count > 1,
             }
 
         except KYCVerification.DoesNotExist:
@@ -82,58 +181,184 @@ class KYCService:
                 'error': 'KYC verification not found',
             }
 
+    def _store_blob(self, file_data):
+        """Return the blob for ``file_data``'s content, adding a reference"""
+        digest = getattr(file_data, 'sha256', None)
+        if digest is None:  # Not from the hashing upload handlers
+            hasher = hashlib.sha256()
+            for chunk in file_data.chunks():
+                hasher.update(chunk)
+            digest = hasher.hexdigest()
+
+        blob = KYCBlob.objects.filter(sha256=digest).first()
+        if blob is None:
+            file_data.seek(0)
+            blob = KYCBlob(
+                sha256=digest,
+                size=file_data.size,
+                mime_type=sniff_mime_type(file_data.read(16)),
+            )
+            file_data.seek(0)
+            blob.file.save(digest, file_data, save=False)
+            try:
+                with transaction.atomic():
+                    blob.save()
+            except IntegrityError:
+                # Lost a race with an identical upload; keep theirs.
+                blob.file.delete(save=False)
+                blob = KYCBlob.objects.get(sha256=digest)
+
+        KYCBlob.objects.filter(pk=blob.pk).update(
+            ref_count=F('ref_count') + 1
+        )
+        blob.refresh_from_db()
+        return blob
+
+    def process_document(self, document_id):
+        """Sniff, measure and validate a queued document"""
+        updated = KYCDocument.objects.filter(
+            id=document_id, processing_status='queued'
+        ).update(
+            processing_status='processing',
+            processing_updated_at=timezone.now(),
+            processing_attempts=F('processing_attempts') + 1,
+        )
+        if not updated:
+            return None  # Already picked up or deleted
+
+        document = KYCDocument.objects.get(id=document_id)
+        try:
+            with document.file.open('rb') as f:
+                document.mime_type = sniff_mime_type(f.read(16))
+            document.file_size = document.file.size
+            result = self._validate_document(document)
+        except Exception as e:
+            logger.exception('Processing KYC document %s failed',
+                             document_id)
+            document.processing_status = 'failed'
+            document.verification_notes = f'Processing failed: {e}'
+            document.save(update_fields=[
+                'processing_status', 'verification_notes',
+            ])
+            return None
+        return result
+
+    def get_document_status(self, document_id):
+        """Get processing and validation status of a document"""
+        try:
+            document = KYCDocument.objects.get(id=document_id)
+
+            return {
+                'success': True,
+                'document_id': str(document.id),
+                'processing_status': document.processing_status,
+                'verification_status': document.verification_status,
+                'verification_score': document.verification_score,
+                'verification_notes': document.verification_notes,
+                'file_size': document.file_size,
+                'mime_type': document.mime_type,
+            }
+
+        except KYCDocument.DoesNotExist:
+            return {
+                'success': False,
+                'error': 'KYC document not found',
+            }
+
     def _validate_document(self, document):
         """Validate uploaded document"""
         validation_score = 0
         issues = []
 
         # Check file size
-        if document.file.size > 10 * 1024 * 1024:  # 10MB limit
+        if document.file_size > MAX_DOCUMENT_SIZE:
             issues.append('File size exceeds 10MB limit')
         else:
             validation_score += 20
 
-        # Check file type
-        allowed_types = ['image/jpeg', 'image/png', 'application/pdf']
-        content_type = getattr(document.file, 'content_type', '')
-        if content_type and content_type not in allowed_types:
+        # Check file type (sniffed from content, not client-supplied)
+        mime_type = document.mime_type
+        if mime_type not in ALLOWED_MIME_TYPES:
             issues.append('Invalid file type')
         else:
             validation_score += 20
 
         # Check image quality for images
-        if content_type and content_type.startswith('image/'):
-            quality_score = self._check_image_quality(document.file)
+        if mime_type.startswith('image/'):
+            quality_score, quality_issues = self._check_image_quality(
+                document.file,
+                document.blob.sha256 if document.blob_id else None,
+            )
             validation_score += quality_score
+            issues.extend(quality_issues)
         else:
             validation_score += 30
 
         # Update document with correct field names
         document.verification_score = validation_score
         document.verification_notes = '; '.join(issues)
-        document.verification_status = (
-            'verified' if validation_score >= 50 else 'rejected'
+        document.verification_status = self._status_for_score(
+            validation_score
         )
+        document.processing_status = 'completed'
         document.save()
 
+        # Validation depends only on the bytes; remember it for re-uploads.
+        if document.blob_id:
+            KYCBlob.objects.filter(pk=document.blob_id).update(
+                validation_score=validation_score,
+                validation_notes=document.verification_notes,
+                validated_at=timezone.now(),
+            )
+
         return {
             'score': validation_score,
             'issues': issues,
             'status': document.verification_status,
         }
 
-    def _check_image_quality(self, file):
-        """Check image quality using file size heuristic"""
+    @staticmethod
+    def _status_for_score(score):
+        return 'verified' if score >= 50 else 'rejected'
+
+    def _check_image_quality(self, file, digest=None):
+        """
+        Score image quality (0-30) from resolution, blur and exposure.
+
+        Analysis runs in the image process pool and is cached by content
+        hash (``digest``, computed from ``file`` when not given), so
+        re-uploading the same photo costs only the hashing.
+        """
         try:
-            file_size = file.size
-            if file_size < 50 * 1024:  # < 50KB
-                return 10
-            elif file_size < 200 * 1024:  # < 200KB
-                return 20
-            else:
-                return 30
+            digest = digest or self._hash_file(file)
+            cache_key = f'kyc-image-quality:{digest}'
+            report = cache.get(cache_key)
+            if report is None:
+                try:
+                    source = file.path
+                except NotImplementedError:  # Remote storage
+                    with file.open('rb') as f:
+                        source = f.read()
+                report = analyze_in_pool(
+                    source,
+                    max_workers=getattr(
+                        settings, 'IMAGE_ANALYSIS_WORKERS', 2
+                    ),
+                )
+                cache.set(cache_key, report, IMAGE_QUALITY_CACHE_SECONDS)
+            return report['score'], report['issues']
         except Exception:
-            return 20
+            logger.exception('Image quality analysis failed')
+            return 0, ['Image could not be decoded']
+
+    @staticmethod
+    def _hash_file(file):
+        """SHA-256 of a stored file, read in chunks"""
+        digest = hashlib.sha256()
+        with file.open('rb') as f:
+            for chunk in f.chunks():
+                digest.update(chunk)
+        return digest.hexdigest()
 
     def verify_bank_account(self, kyc_id, account_number, bank_name,
                             account_type):
@@ -212,42 +437,22 @@ class KYCService:
     def run_compliance_check(self, kyc_id):
         """Run comprehensive compliance check"""
         try:
-            kyc_verification = KYCVerification.objects.get(id=kyc_id)
+            kyc_verification = self._compliance_queryset().get(id=kyc_id)
 
-            # Perform various checks
-            check_results = self._perform_compliance_checks(
+            check_results, overall_score = self._evaluate_compliance(
                 kyc_verification
             )
 
-            # Calculate overall score
-            overall_score = self._calculate_compliance_score(
-                check_results
-            )
-
-            # Determine result
-            result = (
-                'pass'
-                if overall_score >= self.verification_threshold
-                else 'fail'
-            )
-
             # Create compliance check record with correct fields
             ComplianceCheck.objects.create(
-                verification=kyc_verification,
-                check_type='risk',
-                result=result,
-                score=overall_score,
-                max_score=100,
-                details=check_results,
+                **self._compliance_check_fields(
+                    kyc_verification, check_results, overall_score
+                )
             )
 
             # Update KYC verification status
             kyc_verification.overall_score = overall_score
-            kyc_verification.status = (
-                'approved'
-                if overall_score >= self.verification_threshold
-                else 'rejected'
-            )
+            kyc_verification.status = self._compliance_status(overall_score)
             kyc_verification.save()
 
             # Update bankability score after compliance result
@@ -266,6 +471,94 @@ class KYCService:
                 'error': 'KYC verification not found',
             }
 
+    def run_compliance_checks(self, queryset=None, batch_size=500):
+        """
+        Re-check many verifications, e.g. nightly across all merchants.
+
+        Each batch costs a fixed number of queries: one for the
+        verifications and merchants, one each for their documents and
+        bank accounts, then a bulk insert and a bulk update. Merchants
+        whose verification status changed get their bankability score
+        recomputed. Returns counts by resulting status.
+        """
+        if queryset is None:
+            queryset = KYCVerification.objects.exclude(
+                status__in=['expired', 'suspended']
+            )
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+
+        summary = {'checked': 0, 'approved': 0, 'rejected': 0,
+                   'status_changed': 0}
+        for offset in range(0, len(ids), batch_size):
+            batch = self._compliance_queryset().filter(
+                pk__in=ids[offset:offset + batch_size]
+            )
+            checks, changed_merchants = [], []
+            verifications = list(batch)
+            for kyc_verification in verifications:
+                check_results, overall_score = self._evaluate_compliance(
+                    kyc_verification
+                )
+                checks.append(ComplianceCheck(
+                    **self._compliance_check_fields(
+                        kyc_verification, check_results, overall_score
+                    )
+                ))
+                new_status = self._compliance_status(overall_score)
+                if new_status != kyc_verification.status:
+                    changed_merchants.append(kyc_verification.merchant)
+                kyc_verification.overall_score = overall_score
+                kyc_verification.status = new_status
+                summary[new_status] += 1
+
+            with transaction.atomic():
+                ComplianceCheck.objects.bulk_create(checks)
+                KYCVerification.objects.bulk_update(
+                    verifications, ['overall_score', 'status']
+                )
+            for merchant in changed_merchants:
+                merchant.update_bankability_score()
+
+            summary['checked'] += len(verifications)
+            summary['status_changed'] += len(changed_merchants)
+        return summary
+
+    @staticmethod
+    def _compliance_queryset():
+        """Verifications with everything the rules read, in 3 queries"""
+        return KYCVerification.objects.select_related(
+            'merchant'
+        ).prefetch_related('documents', 'bank_accounts')
+
+    def _evaluate_compliance(self, kyc_verification):
+        """Evaluate every rule in memory; returns (results, score)"""
+        check_results = self._perform_compliance_checks(kyc_verification)
+        return check_results, self._calculate_compliance_score(
+            check_results
+        )
+
+    def _compliance_status(self, overall_score):
+        return (
+            'approved'
+            if overall_score >= self.verification_threshold
+            else 'rejected'
+        )
+
+    def _compliance_check_fields(self, kyc_verification, check_results,
+                                 overall_score):
+        return {
+            'verification': kyc_verification,
+            'check_type': 'risk',
+            'result': (
+                'pass'
+                if overall_score >= self.verification_threshold
+                else 'fail'
+            ),
+            'score': overall_score,
+            'max_score': 100,
+            'details': check_results,
+        }
+
     def _perform_compliance_checks(self, kyc_verification):
         """Perform various compliance checks"""
         check_results = {}
@@ -288,16 +581,17 @@ class KYCService:
 
     def _check_document_completeness(self, kyc_verification):
         """Check if all required documents are uploaded and valid"""
-        documents = KYCDocument.objects.filter(
-            verification=kyc_verification
-        )
+        # Newest document of each type, from the (prefetched) documents
+        latest = {}
+        for doc in kyc_verification.documents.all():
+            latest.setdefault(doc.document_type, doc)
         required_docs = kyc_verification.get_required_documents()
 
         score = 0
         issues = []
 
         for doc_type in required_docs:
-            doc = documents.filter(document_type=doc_type).first()
+            doc = latest.get(doc_type)
             if doc and doc.verification_status == 'verified':
                 score += 25
             else:
@@ -311,12 +605,10 @@ class KYCService:
 
     def _check_bank_verification(self, kyc_verification):
         """Check bank account verification status"""
-        bank_accounts = BankAccount.objects.filter(
-            verification=kyc_verification
-        )
+        bank_accounts = kyc_verification.bank_accounts.all()
 
-        if bank_accounts.exists():
-            account = bank_accounts.first()
+        if bank_accounts:
+            account = bank_accounts[0]
             return {
                 'score': account.verification_score,
                 'issues': account.verification_notes,
@@ -427,6 +719,106 @@ class KYCService:
                 'error': 'KYC verification not found',
             }
 
+    def expire_overdue(self, now=None, batch_size=1000):
+        """
+        Expire every overdue verification and document in bulk.
+
+        Works in batches of primary keys with set-based UPDATEs, so rows
+        are never loaded as model instances and locks stay short.
+        Merchants whose verification expired get their bankability
+        recomputed in the background, one task per batch.
+        """
+        now = now or timezone.now()
+
+        verifications = KYCVerification.objects.filter(
+            expires_at__lt=now
+        ).exclude(status='expired')
+        expired_verifications = 0
+        merchant_ids = set()
+        while True:
+            rows = list(
+                verifications.order_by('pk')
+                .values_list('pk', 'merchant_id')[:batch_size]
+            )
+            if not rows:
+                break
+            expired_verifications += KYCVerification.objects.filter(
+                pk__in=[pk for pk, _merchant in rows]
+            ).update(status='expired')
+            new_merchants = {m for _pk, m in rows} - merchant_ids
+            if new_merchants:
+                submit_on_commit(recompute_bankability_scores,
+                                 sorted(new_merchants))
+            merchant_ids |= new_merchants
+
+        documents = KYCDocument.objects.filter(
+            expiry_date__lt=now.date()
+        ).exclude(verification_status='expired')
+        expired_documents = 0
+        while True:
+            pks = list(
+                documents.order_by('pk').values_list('pk', flat=True)
+                [:batch_size]
+            )
+            if not pks:
+                break
+            expired_documents += KYCDocument.objects.filter(
+                pk__in=pks
+            ).update(verification_status='expired')
+
+        return {
+            'expired_verifications': expired_verifications,
+            'expired_documents': expired_documents,
+            'merchants_rescored': len(merchant_ids),
+        }
+
+    def requeue_stuck_documents(self, now=None, timeout_minutes=None,
+                                batch_size=1000):
+        """
+        Re-queue documents queued or processing for longer than the
+        timeout: their background task died with its worker. Documents
+        already picked up ``MAX_PROCESSING_ATTEMPTS`` times are marked
+        failed instead, so one that kills its worker is not retried
+        forever.
+        """
+        now = now or timezone.now()
+        if timeout_minutes is None:
+            timeout_minutes = getattr(
+                settings, 'KYC_PROCESSING_TIMEOUT_MINUTES', 30
+            )
+        stuck = KYCDocument.objects.filter(
+            processing_status__in=['queued', 'processing'],
+            processing_updated_at__lt=now - timedelta(
+                minutes=timeout_minutes
+            ),
+        )
+        failed = stuck.filter(
+            processing_attempts__gte=MAX_PROCESSING_ATTEMPTS
+        ).update(
+            processing_status='failed',
+            verification_notes='Processing failed: timed out after '
+                               f'{MAX_PROCESSING_ATTEMPTS} attempts',
+        )
+
+        requeued = 0
+        while True:
+            pks = list(
+                stuck.order_by('pk').values_list('pk', flat=True)
+                [:batch_size]
+            )
+            if not pks:
+                break
+            # Filtered again: a slow task may have finished meanwhile,
+            # and process_document skips documents no longer queued
+            with transaction.atomic():
+                requeued += stuck.filter(pk__in=pks).update(
+                    processing_status='queued', processing_updated_at=now,
+                )
+                for pk in pks:
+                    submit_on_commit(process_kyc_document, str(pk))
+
+        return {'requeued': requeued, 'failed': failed}
+
     def renew_kyc_verification(self, kyc_id, verification_level=None):
         """Renew KYC verification"""
         try:
@@ -470,19 +862,7 @@ class KYCService:
             return {
                 'success': True,
                 'documents': [
-                    {
-                        'id': str(doc.id),
-                        'document_type': doc.document_type,
-                        'file_name': doc.file_name,
-                        'verification_status': (
-                            doc.verification_status
-                        ),
-                        'verification_score': doc.verification_score,
-                        'verification_notes': doc.verification_notes,
-                        'upload_date': doc.upload_date,
-                        'is_valid': doc.is_valid(),
-                    }
-                    for doc in documents
+                    self._document_dict(doc) for doc in documents
                 ],
             }
 
@@ -503,20 +883,7 @@ class KYCService:
             return {
                 'success': True,
                 'bank_accounts': [
-                    {
-                        'id': str(acc.id),
-                        'bank_name': acc.bank_name,
-                        'account_name': acc.account_name,
-                        'account_number': acc.mask_account_number(),
-                        'account_type': acc.account_type,
-                        'verification_status': (
-                            acc.verification_status
-                        ),
-                        'verification_score': acc.verification_score,
-                        'verification_notes': acc.verification_notes,
-                        'created_at': acc.created_at,
-                    }
-                    for acc in accounts
+                    self._bank_account_dict(acc) for acc in accounts
                 ],
             }
 
@@ -537,19 +904,7 @@ class KYCService:
             return {
                 'success': True,
                 'compliance_checks': [
-                    {
-                        'id': str(chk.id),
-                        'check_type': chk.check_type,
-                        'result': chk.result,
-                        'score': chk.score,
-                        'max_score': chk.max_score,
-                        'percentage_score': (
-                            chk.get_percentage_score()
-                        ),
-                        'details': chk.details,
-                        'checked_at': chk.checked_at,
-                    }
-                    for chk in checks
+                    self._compliance_check_dict(chk) for chk in checks
                 ],
             }
 
@@ -558,3 +913,119 @@ class KYCService:
                 'success': False,
                 'error': 'KYC verification not found',
             }
+
+    def get_review_queue(self, statuses=None, verification_level=None,
+                         cursor=None, limit=50):
+        """
+        Page through verifications awaiting review, oldest first.
+
+        Uses keyset pagination on (submitted_at, id): pass the returned
+        ``next_cursor`` back to get the following page. Documents, bank
+        accounts and the latest compliance check are prefetched, so a
+        page costs four queries however many applicants it holds.
+        """
+        queryset = KYCVerification.objects.filter(
+            status__in=statuses or REVIEW_QUEUE_STATUSES
+        )
+        if verification_level:
+            queryset = queryset.filter(
+                verification_level=verification_level
+            )
+        if cursor:
+            submitted_at, last_id = decode_review_cursor(cursor)
+            queryset = queryset.filter(
+                Q(submitted_at__gt=submitted_at)
+                | Q(submitted_at=submitted_at, id__gt=last_id)
+            )
+
+        page = list(
+            queryset.select_related('merchant').prefetch_related(
+                'documents',
+                'bank_accounts',
+                Prefetch(
+                    'compliance_checks',
+                    queryset=ComplianceCheck.objects.order_by(
+                        '-checked_at'
+                    )[:1],
+                    to_attr='latest_checks',
+                ),
+            ).order_by('submitted_at', 'id')[:limit + 1]
+        )
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        return {
+            'success': True,
+            'results': [
+                {
+                    'kyc_id': str(kyc.id),
+                    'merchant_id': kyc.merchant_id,
+                    'business_name': kyc.merchant.business_name,
+                    'location': kyc.merchant.location,
+                    'status': kyc.status,
+                    'verification_level': kyc.verification_level,
+                    'overall_score': kyc.overall_score,
+                    'submitted_at': kyc.submitted_at,
+                    'completion_percentage': (
+                        kyc.get_completion_percentage()
+                    ),
+                    'documents': [
+                        self._document_dict(doc)
+                        for doc in kyc.documents.all()
+                    ],
+                    'bank_accounts': [
+                        self._bank_account_dict(acc)
+                        for acc in kyc.bank_accounts.all()
+                    ],
+                    'latest_compliance_check': (
+                        self._compliance_check_dict(kyc.latest_checks[0])
+                        if kyc.latest_checks else None
+                    ),
+                }
+                for kyc in page
+            ],
+            'next_cursor': (
+                encode_review_cursor(page[-1]) if has_more else None
+            ),
+        }
+
+    @staticmethod
+    def _document_dict(doc):
+        return {
+            'id': str(doc.id),
+            'document_type': doc.document_type,
+            'file_name': doc.file_name,
+            'verification_status': doc.verification_status,
+            'verification_score': doc.verification_score,
+            'verification_notes': doc.verification_notes,
+            'processing_status': doc.processing_status,
+            'upload_date': doc.upload_date,
+            'is_valid': doc.is_valid(),
+        }
+
+    @staticmethod
+    def _bank_account_dict(acc):
+        return {
+            'id': str(acc.id),
+            'bank_name': acc.bank_name,
+            'account_name': acc.account_name,
+            'account_number': acc.mask_account_number(),
+            'account_type': acc.account_type,
+            'verification_status': acc.verification_status,
+            'verification_score': acc.verification_score,
+            'verification_notes': acc.verification_notes,
+            'created_at': acc.created_at,
+        }
+
+    @staticmethod
+    def _compliance_check_dict(chk):
+        return {
+            'id': str(chk.id),
+            'check_type': chk.check_type,
+            'result': chk.result,
+            'score': chk.score,
+            'max_score': chk.max_score,
+            'percentage_score': chk.get_percentage_score(),
+            'details': chk.details,
+            'checked_at': chk.checked_at,
+        }
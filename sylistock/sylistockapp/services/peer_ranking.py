@@ -0,0 +1,237 @@
+"""
+Nightly peer ranking of merchants within their market.
+
+``MerchantProfile.location`` is free text ("Madina Market", "madina
+mkt", "Marché Madina"); ``normalize_location`` reduces it to a market
+slug so those land in one ``Market``. Per market, bankability score,
+sales velocity and stock value are ranked with NumPy over one array
+entry per merchant: one sort per metric ranks every market at once.
+Ranks are stored in ``MerchantPeerRank`` (keyed by merchant) and the
+distribution percentiles on ``Market``, so APIs read them by primary key
+instead of scanning merchants per request.
+"""
+import re
+import unicodedata
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from ..models import (
+    InventoryLog, Market, MerchantPeerRank, MerchantProfile,
+    MerchantValuation,
+)
+from .arrays import scatter
+
+VELOCITY_DAYS = 30
+DISTRIBUTION_PERCENTILES = (10, 25, 50, 75, 90)
+# Words that describe the place rather than name it
+GENERIC_WORDS = {
+    'market', 'markets', 'marche', 'marches', 'mkt', 'the', 'de', 'du',
+    'la', 'le', 'of',
+}
+
+
+def normalize_location(location):
+    """Market slug for a free-text location ('' if nothing is left)"""
+    text = unicodedata.normalize('NFKD', location or '')
+    text = text.encode('ascii', 'ignore').decode().lower()
+    words = [
+        word for word in re.split(r'[^a-z0-9]+', text)
+        if word and word not in GENERIC_WORDS
+    ]
+    return '-'.join(words)
+
+
+def percentile_ranks(values, groups):
+    """
+    Mid-rank percentiles (0-100) of ``values`` within each group.
+
+    A value's rank is the share of its group below it plus half the
+    share equal to it, so ties rank alike and a group of one sits at
+    50. One lexsort covers every group.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups)
+    n = len(values)
+    if not n:
+        return np.zeros(0)
+    order = np.lexsort((values, groups))
+    g, v = groups[order], values[order]
+
+    new_group = np.r_[True, g[1:] != g[:-1]]
+    new_run = new_group | np.r_[True, v[1:] != v[:-1]]
+    positions = np.arange(n)
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    run_start = np.maximum.accumulate(np.where(new_run, positions, 0))
+    group_id = np.cumsum(new_group) - 1
+    run_id = np.cumsum(new_run) - 1
+    group_size = np.bincount(group_id)[group_id]
+    run_size = np.bincount(run_id)[run_id]
+
+    ranks = np.empty(n)
+    ranks[order] = (
+        (run_start - group_start) + 0.5 * run_size
+    ) / group_size * 100
+    return np.round(ranks, 1)
+
+
+class PeerRankingService:
+    """Assign markets and recompute every merchant's peer ranks"""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+
+    def run(self, today=None):
+        today = today or timezone.localdate()
+        with transaction.atomic():
+            merchants = self._assign_markets()
+            ranked = self._rank(merchants, today)
+        return {
+            'as_of': today,
+            'markets': len({m for _id, m, _s in merchants if m}),
+            'merchants_ranked': ranked,
+            'unplaced': sum(1 for _id, m, _s in merchants if not m),
+        }
+
+    def _assign_markets(self):
+        """Normalize locations; returns (id, market_id, score) rows"""
+        rows = list(MerchantProfile.objects.order_by('id').values_list(
+            'id', 'location', 'market_id', 'bankability_score'
+        ))
+        slugs = {row[0]: normalize_location(row[1]) for row in rows}
+        names = {}
+        for merchant_id, location, _market, _score in rows:
+            slug = slugs[merchant_id]
+            if slug and slug not in names:
+                names[slug] = slug.replace('-', ' ').title()
+        Market.objects.bulk_create(
+            [Market(slug=slug, name=name) for slug, name in names.items()],
+            batch_size=self.batch_size, ignore_conflicts=True,
+        )
+        market_ids = dict(Market.objects.filter(
+            slug__in=list(names)
+        ).values_list('slug', 'id'))
+
+        changed = []
+        merchants = []
+        for merchant_id, _location, market_id, score in rows:
+            new_market = market_ids.get(slugs[merchant_id])
+            if new_market != market_id:
+                changed.append(MerchantProfile(id=merchant_id,
+                                               market_id=new_market))
+            merchants.append((merchant_id, new_market, score))
+        MerchantProfile.objects.bulk_update(
+            changed, ['market'], batch_size=self.batch_size
+        )
+        return merchants
+
+    def _rank(self, merchants, today):
+        placed = [row for row in merchants if row[1]]
+        MerchantPeerRank.objects.filter(
+            merchant__market__isnull=True
+        ).delete()
+        if not placed:
+            return 0
+
+        ids = np.array([row[0] for row in placed], dtype=np.int64)
+        markets = np.array([row[1] for row in placed], dtype=np.int64)
+        # Sales of the VELOCITY_DAYS ending with ``today``, so a re-run
+        # for an earlier day ranks that day's window
+        cutoff = timezone.make_aware(
+            datetime.combine(today + timedelta(days=1), time.min)
+        )
+        metrics = {
+            'bankability': np.array([float(row[2]) for row in placed]),
+            'sales_velocity': scatter(
+                ids, InventoryLog.objects.filter(
+                    action='OUT',
+                    timestamp__gte=cutoff - timedelta(days=VELOCITY_DAYS),
+                    timestamp__lt=cutoff,
+                ).values_list('merchant_id').annotate(
+                    units=Sum('quantity_changed')
+                ).order_by(),
+            ) / -VELOCITY_DAYS,
+            'stock_value': scatter(
+                ids, MerchantValuation.objects.values_list(
+                    'merchant_id', 'value_at_cost'
+                ),
+            ),
+        }
+        ranks = {
+            name: percentile_ranks(values, markets)
+            for name, values in metrics.items()
+        }
+        market_ids, inverse, sizes = np.unique(
+            markets, return_inverse=True, return_counts=True
+        )
+
+        rows = [
+            MerchantPeerRank(
+                merchant_id=int(ids[i]),
+                market_id=int(markets[i]),
+                as_of=today,
+                market_size=int(sizes[inverse[i]]),
+                bankability_score=float(metrics['bankability'][i]),
+                bankability_percentile=float(ranks['bankability'][i]),
+                sales_velocity=round(float(metrics['sales_velocity'][i]), 2),
+                sales_velocity_percentile=float(ranks['sales_velocity'][i]),
+                stock_value=round(float(metrics['stock_value'][i]), 2),
+                stock_value_percentile=float(ranks['stock_value'][i]),
+            )
+            for i in range(len(ids))
+        ]
+        MerchantPeerRank.objects.bulk_create(
+            rows, batch_size=self.batch_size, update_conflicts=True,
+            unique_fields=['merchant'],
+            update_fields=[
+                'market', 'as_of', 'market_size', 'bankability_score',
+                'bankability_percentile', 'sales_velocity',
+                'sales_velocity_percentile', 'stock_value',
+                'stock_value_percentile',
+            ],
+        )
+
+        updated = []
+        for index, market_id in enumerate(market_ids):
+            members = inverse == index
+            updated.append(Market(
+                id=int(market_id),
+                merchant_count=int(sizes[index]),
+                distribution={
+                    name: dict(zip(
+                        (f'p{p}' for p in DISTRIBUTION_PERCENTILES),
+                        np.round(np.percentile(
+                            values[members], DISTRIBUTION_PERCENTILES
+                        ), 2).tolist(),
+                    ))
+                    for name, values in metrics.items()
+                },
+                updated_at=timezone.now(),
+            ))
+        Market.objects.bulk_update(
+            updated, ['merchant_count', 'distribution', 'updated_at'],
+            batch_size=self.batch_size,
+        )
+        Market.objects.exclude(id__in=market_ids.tolist()).update(
+            merchant_count=0, distribution={}
+        )
+        return len(rows)
+
+
+def peer_rank_dict(rank):
+    """API representation of a MerchantPeerRank (None when unranked)"""
+    if rank is None:
+        return None
+    return {
+        'market': rank.market.name,
+        'market_size': rank.market_size,
+        'as_of': rank.as_of,
+        'percentiles': {
+            'bankability': rank.bankability_percentile,
+            'sales_velocity': rank.sales_velocity_percentile,
+            'stock_value': rank.stock_value_percentile,
+        },
+    }
@@ -0,0 +1,223 @@
+"""
+Portfolio-wide insurance repricing.
+
+Risk scores and premiums are computed with NumPy over arrays holding
+one entry per merchant (or per policy), so re-pricing the whole book
+after a rate change is a handful of queries plus vector arithmetic.
+``InsuranceService`` prices single merchants with the same functions.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from ..models import MerchantProfile, MerchantValuation
+from ..models_insurance import (
+    InsuranceClaim, InsurancePolicy, InsuranceRiskAssessment,
+)
+from .arrays import scatter
+
+RISK_LEVELS = np.array(['low', 'medium', 'high', 'very_high'])
+RISK_LEVEL_BOUNDS = np.array([30, 50, 70])  # Lower bounds of levels 1-3
+DEFAULT_BASE_RATE = 0.02  # 2% of coverage amount
+DEFAULT_RISK_MULTIPLIERS = {
+    'low': 1.0,
+    'medium': 1.5,
+    'high': 2.0,
+    'very_high': 3.0,
+}
+
+
+def risk_scores(age_days, previous_claims):
+    """Risk scores (0-100) from business age and past claim counts"""
+    age_days = np.asarray(age_days)
+    scores = np.full(age_days.shape, 50, dtype=np.int64)
+    scores -= np.where(age_days > 365, 10, 0)   # Established business
+    scores += np.where(age_days < 30, 20, 0)    # Brand new business
+    scores += 10                                # Location risk (Guinea)
+    scores += np.minimum(np.asarray(previous_claims), 3) * 10
+    return np.clip(scores, 0, 100)
+
+
+def risk_levels(scores):
+    """Map risk scores to their level names"""
+    return RISK_LEVELS[
+        np.searchsorted(RISK_LEVEL_BOUNDS, scores, side='right')
+    ]
+
+
+def premiums(coverage, deductible, multipliers, base_rate=DEFAULT_BASE_RATE):
+    """
+    Premiums for arrays of coverage, deductible and risk multipliers.
+
+    Deductibles earn a discount of 1% of their amount, with the premium
+    floored at 0.1% of coverage.
+    """
+    coverage = np.asarray(coverage, dtype=np.float64)
+    deductible = np.asarray(deductible, dtype=np.float64)
+    adjusted = coverage * base_rate * np.asarray(multipliers)
+    discounted = np.maximum(adjusted - deductible * 0.01, coverage * 0.001)
+    return np.round(np.where(deductible > 0, discounted, adjusted), 2)
+
+
+class PortfolioRepricer:
+    """
+    Recompute every merchant's risk and every active policy's premium.
+
+    ``run(dry_run=True)`` returns the same summary and changes without
+    writing anything.
+    """
+
+    def __init__(self, base_rate=DEFAULT_BASE_RATE, multipliers=None,
+                 batch_size=1000):
+        self.base_rate = base_rate
+        self.multipliers = {**DEFAULT_RISK_MULTIPLIERS,
+                            **(multipliers or {})}
+        self.batch_size = batch_size
+
+    def run(self, dry_run=False, today=None):
+        today = today or timezone.now().date()
+        merchant_ids, scores, levels, inventory, claims = (
+            self._score_merchants(today)
+        )
+        assessment_changes = self._assessment_changes(
+            merchant_ids, scores, levels, inventory, claims
+        )
+        policy_changes = self._policy_changes(merchant_ids, levels)
+
+        if not dry_run:
+            self._write(assessment_changes, policy_changes)
+
+        return {
+            'dry_run': dry_run,
+            'merchants': len(merchant_ids),
+            'risk_level_counts': {
+                str(level): int((levels == level).sum())
+                for level in RISK_LEVELS
+            },
+            'assessments_updated': len(assessment_changes['update']),
+            'assessments_created': len(assessment_changes['create']),
+            'policies_repriced': len(policy_changes),
+            'premium_delta': float(sum(
+                new - old for _policy, old, new in policy_changes
+            )),
+            'policy_changes': [
+                (policy.policy_number, old, new)
+                for policy, old, new in policy_changes
+            ],
+        }
+
+    def _score_merchants(self, today):
+        rows = list(MerchantProfile.objects.order_by('id').values_list(
+            'id', 'created_at'
+        ))
+        merchant_ids = np.fromiter(
+            (merchant_id for merchant_id, _created in rows), dtype=np.int64
+        )
+        age_days = np.array([
+            (today - created.date()).days for _id, created in rows
+        ], dtype=np.int64)
+
+        claims = scatter(
+            merchant_ids,
+            InsuranceClaim.objects.values_list('policy__merchant_id')
+            .annotate(n=Count('id')).order_by(),
+            dtype=np.int64,
+        )
+        inventory = scatter(
+            merchant_ids,
+            MerchantValuation.objects.values_list(
+                'merchant_id', 'value_at_cost'
+            ),
+        )
+        scores = risk_scores(age_days, claims)
+        return merchant_ids, scores, risk_levels(scores), inventory, claims
+
+    def _assessment_changes(self, merchant_ids, scores, levels, inventory,
+                            claims):
+        index = {int(m): i for i, m in enumerate(merchant_ids)}
+        latest = {}
+        for assessment in InsuranceRiskAssessment.objects.order_by(
+            'merchant_id', '-assessment_date'
+        ).only('id', 'merchant_id', 'risk_score', 'risk_level',
+               'inventory_value', 'previous_claims'):
+            latest.setdefault(assessment.merchant_id, assessment)
+
+        update = []
+        for merchant_id, assessment in latest.items():
+            i = index[merchant_id]
+            new = (int(scores[i]), str(levels[i]), int(claims[i]),
+                   Decimal(str(round(float(inventory[i]), 2))))
+            old = (assessment.risk_score, assessment.risk_level,
+                   assessment.previous_claims, assessment.inventory_value)
+            if new != old:
+                (assessment.risk_score, assessment.risk_level,
+                 assessment.previous_claims,
+                 assessment.inventory_value) = new
+                update.append(assessment)
+
+        # Insured merchants without an assessment get one
+        insured = set(InsurancePolicy.objects.filter(
+            status='active'
+        ).values_list('merchant_id', flat=True))
+        create = [
+            InsuranceRiskAssessment(
+                merchant_id=merchant_id,
+                risk_score=int(scores[index[merchant_id]]),
+                risk_level=str(levels[index[merchant_id]]),
+                previous_claims=int(claims[index[merchant_id]]),
+                inventory_value=Decimal(str(round(
+                    float(inventory[index[merchant_id]]), 2
+                ))),
+            )
+            for merchant_id in sorted(insured - set(latest))
+        ]
+        return {'update': update, 'create': create}
+
+    def _policy_changes(self, merchant_ids, levels):
+        policies = list(InsurancePolicy.objects.filter(
+            status='active'
+        ).only('id', 'merchant_id', 'policy_number',
+               'total_coverage_amount', 'deductible_amount',
+               'premium_amount').order_by('id'))
+        if not policies:
+            return []
+
+        idx = np.searchsorted(
+            merchant_ids, [p.merchant_id for p in policies]
+        )
+        multipliers = np.array([
+            self.multipliers[level] for level in levels[idx]
+        ])
+        new_premiums = premiums(
+            [float(p.total_coverage_amount) for p in policies],
+            [float(p.deductible_amount) for p in policies],
+            multipliers, self.base_rate,
+        )
+
+        changes = []
+        for policy, premium in zip(policies, new_premiums):
+            new = Decimal(f'{premium:.2f}')
+            if new != policy.premium_amount:
+                changes.append((policy, policy.premium_amount, new))
+        return changes
+
+    def _write(self, assessment_changes, policy_changes):
+        for policy, _old, new in policy_changes:
+            policy.premium_amount = new
+        with transaction.atomic():
+            InsuranceRiskAssessment.objects.bulk_update(
+                assessment_changes['update'],
+                ['risk_score', 'risk_level', 'previous_claims',
+                 'inventory_value'],
+                batch_size=self.batch_size,
+            )
+            InsuranceRiskAssessment.objects.bulk_create(
+                assessment_changes['create'], batch_size=self.batch_size
+            )
+            InsurancePolicy.objects.bulk_update(
+                [policy for policy, _old, _new in policy_changes],
+                ['premium_amount'], batch_size=self.batch_size,
+            )
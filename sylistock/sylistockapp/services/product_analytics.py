@@ -0,0 +1,195 @@
+"""
+Per-product sales analytics for one merchant.
+
+One query over the merchant's ``StockItem`` rows does all the work in
+the database: correlated subqueries sum each product's ``InventoryLog``
+rows (served by the ``(merchant, product, timestamp)`` index), window
+functions rank products and accumulate their revenue share, and plain
+expressions derive days of cover and turnover. Python only reshapes
+one row per SKU, never the logs themselves.
+
+- revenue: units sold times the current sale price, as in
+  ``sales_report``
+- ABC class: products making up the first 80% of revenue are A, the
+  next 15% B, the rest (and anything unsold) C
+- days of cover: units on hand over the daily sales rate of the last
+  ``VELOCITY_DAYS`` (None when nothing sold recently)
+- turnover: units sold over the average of opening and closing stock
+  for the period (None when there was no stock)
+
+Results are cached per merchant, period and top-N size for
+``settings.PRODUCT_ANALYTICS_CACHE_SECONDS``.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, FloatField, OuterRef,
+    RowRange, Subquery, Sum, Value, When, Window,
+)
+from django.db.models.functions import Cast, Coalesce, NullIf, RowNumber
+from django.db.models.lookups import LessThan
+from django.utils import timezone
+
+from ..models import InventoryLog, StockItem
+
+VELOCITY_DAYS = 14
+MAX_DAYS = 365
+MAX_TOP = 100
+ABC_BOUNDS = (('A', Decimal('0.80')), ('B', Decimal('0.95')))
+CACHE_KEY = 'product-analytics:{}:{}:{}'
+
+
+class ProductAnalyticsService:
+    """Top sellers, ABC classes, days of cover and turnover per product"""
+
+    def __init__(self, merchant_id, days=30, top=10):
+        if not 1 <= days <= MAX_DAYS:
+            raise ValueError(f'days must be between 1 and {MAX_DAYS}')
+        if not 1 <= top <= MAX_TOP:
+            raise ValueError(f'top must be between 1 and {MAX_TOP}')
+        self.merchant_id = merchant_id
+        self.days = days
+        self.top = top
+
+    @property
+    def cache_key(self):
+        return CACHE_KEY.format(self.merchant_id, self.days, self.top)
+
+    def get(self):
+        """Cached ``analyze()``"""
+        report = cache.get(self.cache_key)
+        if report is None:
+            report = self.analyze()
+            cache.set(
+                self.cache_key, report,
+                getattr(settings, 'PRODUCT_ANALYTICS_CACHE_SECONDS', 300),
+            )
+        return report
+
+    def analyze(self, now=None):
+        now = now or timezone.now()
+        start = now - timedelta(days=self.days)
+        rows = list(self.queryset(start, now).values(
+            'product_id', 'product__name', 'product__barcode', 'quantity',
+            'sale_price', 'units_sold', 'revenue', 'units_rank',
+            'revenue_rank', 'abc_class', 'days_of_cover', 'turnover',
+        ))
+        products = [_product_dict(row) for row in rows]
+
+        total_revenue = sum(p['revenue'] for p in products)
+        return {
+            'merchant_id': self.merchant_id,
+            'period_days': self.days,
+            'start_date': start.date(),
+            'velocity_days': VELOCITY_DAYS,
+            'total_units': sum(p['units_sold'] for p in products),
+            'total_revenue': round(total_revenue, 2),
+            'abc_summary': {
+                abc: {
+                    'products': sum(
+                        1 for p in products if p['abc_class'] == abc
+                    ),
+                    'revenue': round(sum(
+                        p['revenue'] for p in products
+                        if p['abc_class'] == abc
+                    ), 2),
+                }
+                for abc in ('A', 'B', 'C')
+            },
+            'top_by_units': _top(products, 'units_rank', self.top),
+            'top_by_revenue': _top(products, 'revenue_rank', self.top),
+            'products': products,
+        }
+
+    def queryset(self, start, end):
+        """The merchant's stock items annotated with every metric"""
+        revenue = F('revenue')
+        by_revenue = [F('revenue').desc(), F('product_id').asc()]
+        items = StockItem.objects.filter(
+            merchant_id=self.merchant_id
+        ).annotate(
+            units_sold=self._log_total(start, end, action='OUT'),
+            recent_units=self._log_total(
+                end - timedelta(days=min(VELOCITY_DAYS, self.days)), end,
+                action='OUT',
+            ),
+            net_change=self._log_total(start, end),
+        ).annotate(
+            revenue=ExpressionWrapper(
+                F('units_sold') * F('sale_price'),
+                output_field=DecimalField(max_digits=18, decimal_places=2),
+            ),
+            days_of_cover=ExpressionWrapper(
+                Cast('quantity', FloatField())
+                * min(VELOCITY_DAYS, self.days)
+                / NullIf(F('recent_units'), 0),
+                output_field=FloatField(),
+            ),
+            # Closing stock is on hand; opening is that minus the change
+            turnover=ExpressionWrapper(
+                Cast('units_sold', FloatField()) / NullIf(
+                    Cast(F('quantity') * 2 - F('net_change'), FloatField())
+                    / 2, 0.0
+                ),
+                output_field=FloatField(),
+            ),
+        ).annotate(
+            units_rank=Window(RowNumber(), order_by=[
+                F('units_sold').desc(), F('product_id').asc(),
+            ]),
+            revenue_rank=Window(RowNumber(), order_by=by_revenue),
+            cumulative_revenue=Window(
+                Sum(revenue), order_by=by_revenue,
+                frame=RowRange(start=None, end=0),
+            ),
+            total_revenue=Window(Sum(revenue)),
+        )
+        # Classed by the share of revenue *before* the product, so the
+        # top seller is always A even when it alone passes 80%
+        preceding = F('cumulative_revenue') - revenue
+        return items.annotate(abc_class=Case(
+            When(units_sold__lte=0, then=Value('C')),
+            *[
+                When(LessThan(preceding, F('total_revenue') * bound),
+                     then=Value(abc))
+                for abc, bound in ABC_BOUNDS
+            ],
+            default=Value('C'),
+        )).order_by('revenue_rank')
+
+    def _log_total(self, start, end, **filters):
+        """Correlated sum of the product's log quantities in range"""
+        logs = InventoryLog.objects.filter(
+            merchant_id=self.merchant_id, product_id=OuterRef('product_id'),
+            timestamp__gte=start, timestamp__lt=end, **filters,
+        ).order_by().values('product_id').annotate(
+            total=Sum('quantity_changed')
+        ).values('total')
+        sign = -1 if filters.get('action') == 'OUT' else 1
+        return Coalesce(Subquery(logs), 0) * sign
+
+
+def _product_dict(row):
+    cover, turnover = row['days_of_cover'], row['turnover']
+    return {
+        'product_id': row['product_id'],
+        'name': row['product__name'],
+        'barcode': row['product__barcode'],
+        'quantity': row['quantity'],
+        'sale_price': float(row['sale_price']),
+        'units_sold': row['units_sold'],
+        'revenue': float(row['revenue'] or 0),
+        'units_rank': row['units_rank'],
+        'revenue_rank': row['revenue_rank'],
+        'abc_class': row['abc_class'],
+        'days_of_cover': round(cover, 1) if cover is not None else None,
+        'turnover': round(turnover, 2) if turnover is not None else None,
+    }
+
+
+def _top(products, rank, n):
+    sold = [p for p in products if p['units_sold'] > 0]
+    return sorted(sold, key=lambda p: p[rank])[:n]
@@ -0,0 +1,137 @@
+"""
+Online detection of score-gaming scan patterns.
+
+Scans count towards the bankability score, so IN/OUT loops on one
+product are an easy way to inflate it. ``ScanAnomalyDetector`` keeps a
+few running statistics in the Django cache, a fixed-size dict per key
+updated in O(1) per scan:
+
+- ``rate``: scans decayed with a ``RATE_HALF_LIFE`` half-life
+- ``pingpong``: EWMA of scans reversing the previous scan of the same
+  product (IN right after OUT, or OUT right after IN) within
+  ``PINGPONG_WINDOW`` seconds
+- ``interval_mean``/``interval_var``: EWMA of the gap between scans;
+  a human never scans at a near-constant cadence for long
+
+Statistics are kept per (merchant, device) and per (merchant, product).
+``device_id`` is whatever the client sends, so rotating it resets the
+device statistics; the product statistics still see the loop.
+
+A scan is suspicious when any of these crosses its threshold on either
+key. The scan path observes only scans it applied (rejected ones write
+no log and must not move the statistics), flags their
+``InventoryLog.is_suspicious``, and the score leaves such logs out when
+``settings.SCAN_ANOMALY_DISCOUNT`` is on.
+
+The default local-memory cache keeps statistics per worker process;
+configure a shared cache (Redis, Memcached) to pool them across workers.
+"""
+import hashlib
+import logging
+import math
+
+from django.core.cache import caches
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+STATE_TTL = 24 * 3600     # Forget devices idle for a day
+RATE_HALF_LIFE = 600.0    # Seconds
+MAX_RATE = 240            # ~ one scan every 2.5s sustained
+ALPHA = 0.1               # EWMA weight of the newest scan
+MIN_SCANS = 10            # Before pattern thresholds apply
+MAX_PINGPONG = 0.5
+PINGPONG_WINDOW = 300.0   # Seconds; slower reversals are ordinary trade
+REGULAR_MIN_SCANS = 20
+REGULAR_MAX_CV = 0.1      # Interval std-dev / mean below this is robotic
+REGULAR_MAX_INTERVAL = 30.0
+
+
+def update_scan_stats(state, action, product_id, at):
+    """
+    Fold one scan (``at`` in epoch seconds) into ``state``.
+
+    Returns the new state and the list of reasons the scan is
+    suspicious (empty when it is not).
+    """
+    if state is None:
+        return {
+            'n': 1, 'last_at': at, 'last_action': action,
+            'last_product': product_id, 'rate': 1.0, 'pingpong': 0.0,
+            'interval_mean': 0.0, 'interval_var': 0.0,
+        }, []
+
+    gap = max(at - state['last_at'], 0.0)
+    n = state['n'] + 1
+    rate = state['rate'] * 0.5 ** (gap / RATE_HALF_LIFE) + 1
+    reversal = float(
+        gap < PINGPONG_WINDOW
+        and product_id == state['last_product']
+        and {action, state['last_action']} == {'IN', 'OUT'}
+    )
+    pingpong = state['pingpong'] + ALPHA * (reversal - state['pingpong'])
+    if n == 2:
+        mean, var = gap, 0.0
+    else:
+        diff = gap - state['interval_mean']
+        mean = state['interval_mean'] + ALPHA * diff
+        var = (1 - ALPHA) * (state['interval_var'] + ALPHA * diff * diff)
+
+    reasons = []
+    if rate > MAX_RATE:
+        reasons.append('scan_rate')
+    if n >= MIN_SCANS and pingpong > MAX_PINGPONG:
+        reasons.append('in_out_pingpong')
+    if (n >= REGULAR_MIN_SCANS and 0 < mean < REGULAR_MAX_INTERVAL
+            and math.sqrt(var) < REGULAR_MAX_CV * mean):
+        reasons.append('regular_timing')
+
+    return {
+        'n': n, 'last_at': at, 'last_action': action,
+        'last_product': product_id, 'rate': rate, 'pingpong': pingpong,
+        'interval_mean': mean, 'interval_var': var,
+    }, reasons
+
+
+class ScanAnomalyDetector:
+    """Per device and per product scan statistics in a Django cache"""
+
+    def __init__(self, cache_alias='default'):
+        self.cache = caches[cache_alias]
+
+    @staticmethod
+    def key(merchant_id, device_id):
+        device = hashlib.sha256(str(device_id).encode()).hexdigest()[:16]
+        return f'scan-stats:{merchant_id}:{device}'
+
+    @staticmethod
+    def product_key(merchant_id, product_id):
+        return f'scan-stats:{merchant_id}:product:{product_id}'
+
+    def observe(self, merchant_id, device_id, product_id, action, at=None):
+        """Record a scan; returns why it is suspicious (empty if not)"""
+        at = (at or timezone.now()).timestamp()
+        try:
+            keys = (self.key(merchant_id, device_id),
+                    self.product_key(merchant_id, product_id))
+            states = self.cache.get_many(keys)
+            updated, reasons = {}, []
+            for key in keys:
+                updated[key], found = update_scan_stats(
+                    states.get(key), action, product_id, at
+                )
+                reasons += [r for r in found if r not in reasons]
+            self.cache.set_many(updated, STATE_TTL)
+            return reasons
+        except Exception:
+            # Never fail or slow a scan over its statistics
+            logger.exception('Scan anomaly detection failed')
+            return []
+
+    def stats(self, merchant_id, device_id):
+        """Current statistics for a device (None if unseen)"""
+        return self.cache.get(self.key(merchant_id, device_id))
+
+    def product_stats(self, merchant_id, product_id):
+        """Current statistics for a merchant's product (None if unseen)"""
+        return self.cache.get(self.product_key(merchant_id, product_id))
@@ -0,0 +1,129 @@
+"""
+Bankability score history as a compact step series.
+
+``MerchantProfile.update_bankability_score`` records a point only when
+the score moves, so a point holds until the next one. ``downsample``
+keeps every point from the last ``raw_days``, then the closing point of
+each day, ISO week and finally month, and drops points that repeat the
+previous kept score, so storage per merchant stays bounded however
+often scans trigger recomputes.
+
+``series`` and ``sparklines`` answer a date range with one query each;
+the point in effect when the range starts is included so a series
+never begins with a gap.
+"""
+from datetime import timedelta
+
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from ..models import BankabilityScorePoint
+
+MAX_SPARKLINE_MERCHANTS = 200
+
+
+class ScoreHistoryService:
+    """Query and downsample bankability score history"""
+
+    def __init__(self, raw_days=7, daily_days=90, weekly_days=365):
+        self.raw_days = raw_days
+        self.daily_days = daily_days
+        self.weekly_days = weekly_days
+
+    def series(self, merchant_id, start=None, end=None):
+        """One merchant's points in range as ``{'at', 'score'}`` dicts"""
+        return [
+            {'at': recorded_at, 'score': float(score)}
+            for _merchant, recorded_at, score in self._points(
+                [merchant_id], start, end
+            )
+        ]
+
+    def sparklines(self, merchant_ids, start=None, end=None):
+        """
+        Parallel ``timestamps``/``scores`` arrays per merchant, for
+        charting many merchants at once. Merchants without history
+        get empty arrays.
+        """
+        if len(merchant_ids) > MAX_SPARKLINE_MERCHANTS:
+            raise ValueError(
+                f'At most {MAX_SPARKLINE_MERCHANTS} merchants per request'
+            )
+        lines = {
+            merchant_id: {'timestamps': [], 'scores': []}
+            for merchant_id in merchant_ids
+        }
+        for merchant_id, recorded_at, score in self._points(
+            merchant_ids, start, end
+        ):
+            lines[merchant_id]['timestamps'].append(recorded_at)
+            lines[merchant_id]['scores'].append(float(score))
+        return lines
+
+    def _points(self, merchant_ids, start, end):
+        points = BankabilityScorePoint.objects.filter(
+            merchant_id__in=merchant_ids
+        )
+        if end is not None:
+            points = points.filter(recorded_at__lte=end)
+        if start is not None:
+            in_effect = BankabilityScorePoint.objects.filter(
+                merchant_id=OuterRef('merchant_id'), recorded_at__lt=start,
+            ).order_by('-recorded_at').values('pk')[:1]
+            points = points.filter(
+                Q(recorded_at__gte=start) | Q(pk=Subquery(in_effect))
+            )
+        return points.order_by('merchant_id', 'recorded_at').values_list(
+            'merchant_id', 'recorded_at', 'score'
+        )
+
+    def downsample(self, now=None, batch_size=1000):
+        """Thin old points; returns the number deleted"""
+        now = now or timezone.now()
+        raw_cutoff = now - timedelta(days=self.raw_days)
+        daily_cutoff = now - timedelta(days=self.daily_days)
+        weekly_cutoff = now - timedelta(days=self.weekly_days)
+
+        points = BankabilityScorePoint.objects.order_by(
+            'merchant_id', 'recorded_at', 'id'
+        ).values_list('id', 'merchant_id', 'recorded_at', 'score')
+
+        doomed = []
+        held = None      # (id, merchant, period, score) last seen
+        previous = {}    # Last kept score per merchant
+        for point_id, merchant_id, recorded_at, score in points.iterator(
+            chunk_size=5000
+        ):
+            if recorded_at >= raw_cutoff:
+                period = ('raw', point_id)
+            elif recorded_at >= daily_cutoff:
+                period = ('day', recorded_at.date())
+            elif recorded_at >= weekly_cutoff:
+                period = ('week',) + tuple(recorded_at.isocalendar())[:2]
+            else:
+                period = ('month', recorded_at.year, recorded_at.month)
+
+            if held and held[1:3] == (merchant_id, period):
+                # A later point closes the same period
+                doomed.append(held[0])
+            elif held:
+                self._keep_or_drop(held, previous, doomed)
+            held = (point_id, merchant_id, period, score)
+        if held:
+            self._keep_or_drop(held, previous, doomed)
+
+        # Delete once the scan is finished, not under its open cursor
+        deleted = 0
+        for offset in range(0, len(doomed), batch_size):
+            deleted += BankabilityScorePoint.objects.filter(
+                pk__in=doomed[offset:offset + batch_size]
+            ).delete()[0]
+        return deleted
+
+    @staticmethod
+    def _keep_or_drop(held, previous, doomed):
+        point_id, merchant_id, _period, score = held
+        if previous.get(merchant_id) == score:
+            doomed.append(point_id)  # Repeats the step already kept
+        else:
+            previous[merchant_id] = score
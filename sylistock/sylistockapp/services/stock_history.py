@@ -0,0 +1,209 @@
+"""
+Point-in-time stock reconstruction from periodic snapshots.
+
+``take_snapshots`` records every merchant's StockItems (daily from
+cron). ``stock_as_of`` starts from the snapshot nearest the requested
+moment, or the live stock when that is nearer, and applies only the
+InventoryLog delta between the two, so answering costs a few indexed
+queries whatever the date. ``compact`` thins old snapshots to one per
+week, then one per month.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ..models import InventoryLog, StockItem, StockSnapshot
+
+
+class StockHistoryService:
+    """Snapshot, query and compact merchants' stock history"""
+
+    def __init__(self, daily_days=35, weekly_days=365):
+        self.daily_days = daily_days
+        self.weekly_days = weekly_days
+
+    def take_snapshots(self, merchant_ids=None, now=None, batch_size=500):
+        """Snapshot every merchant's stock; returns snapshots written"""
+        now = now or timezone.now()
+        rows = StockItem.objects.order_by(
+            'merchant_id', 'product_id'
+        ).values_list(
+            'merchant_id', 'product_id', 'quantity', 'cost_price',
+            'sale_price',
+        )
+        if merchant_ids:
+            rows = rows.filter(merchant_id__in=merchant_ids)
+
+        written = 0
+        snapshots = []
+        for merchant_id, group in groupby(
+            rows.iterator(chunk_size=2000), key=itemgetter(0)
+        ):
+            items = {}
+            total_quantity = 0
+            total_value = Decimal('0')
+            for _merchant, product_id, quantity, cost, sale in group:
+                items[str(product_id)] = [quantity, str(cost), str(sale)]
+                total_quantity += quantity
+                total_value += quantity * cost
+            snapshots.append(StockSnapshot(
+                merchant_id=merchant_id, taken_at=now, items=items,
+                total_quantity=total_quantity, total_value=total_value,
+            ))
+            if len(snapshots) >= batch_size:
+                written += len(StockSnapshot.objects.bulk_create(snapshots))
+                snapshots = []
+        written += len(StockSnapshot.objects.bulk_create(snapshots))
+        return written
+
+    def stock_as_of(self, merchant_id, at):
+        """
+        Reconstruct a merchant's stock at ``at``.
+
+        Prices are those recorded in the base snapshot (or current
+        prices for products it does not contain); stock value is at
+        cost price.
+        """
+        now = timezone.now()
+        at = min(at, now)
+        snapshots = StockSnapshot.objects.filter(merchant_id=merchant_id)
+        before = snapshots.filter(taken_at__lte=at).order_by(
+            '-taken_at'
+        ).first()
+        after = snapshots.filter(taken_at__gt=at).order_by(
+            'taken_at'
+        ).only('taken_at').first()
+        after_at = after.taken_at if after else now
+
+        live = False
+        if before is not None and at - before.taken_at <= after_at - at:
+            base_at, items = before.taken_at, before.items
+        elif after is not None:
+            base_at = after.taken_at
+            items = StockSnapshot.objects.get(pk=after.pk).items
+        else:
+            base_at, items, live = now, self._live_items(merchant_id), True
+
+        stock = {
+            int(product_id): [quantity, Decimal(cost), Decimal(sale)]
+            for product_id, (quantity, cost, sale) in items.items()
+        }
+
+        # Replay forward from an earlier base, backward from a later one
+        logs = InventoryLog.objects.filter(merchant_id=merchant_id)
+        if base_at <= at:
+            logs, sign = logs.filter(
+                timestamp__gt=base_at, timestamp__lte=at
+            ), 1
+        else:
+            logs, sign = logs.filter(
+                timestamp__gt=at, timestamp__lte=base_at
+            ), -1
+        deltas = dict(
+            logs.values_list('product_id').annotate(
+                change=Sum('quantity_changed')
+            ).order_by()
+        )
+
+        missing = set(deltas) - set(stock)
+        if missing:
+            for product_id, cost, sale in StockItem.objects.filter(
+                merchant_id=merchant_id, product_id__in=missing
+            ).values_list('product_id', 'cost_price', 'sale_price'):
+                stock[product_id] = [0, cost, sale]
+            for product_id in missing - set(stock):
+                stock[product_id] = [0, Decimal('0'), Decimal('0')]
+        for product_id, change in deltas.items():
+            stock[product_id][0] += sign * change
+
+        result_items = [
+            {
+                'product_id': product_id,
+                # Untracked manual edits can push replays below zero
+                'quantity': max(quantity, 0),
+                'cost_price': float(cost),
+                'sale_price': float(sale),
+                'value': float(max(quantity, 0) * cost),
+            }
+            for product_id, (quantity, cost, sale) in sorted(stock.items())
+        ]
+        return {
+            'merchant_id': merchant_id,
+            'as_of': at,
+            'base': 'live' if live else 'snapshot',
+            'base_taken_at': base_at,
+            'products_replayed': len(deltas),
+            'items': [item for item in result_items if item['quantity']],
+            'total_quantity': sum(i['quantity'] for i in result_items),
+            'total_value': round(sum(i['value'] for i in result_items), 2),
+        }
+
+    def compact(self, now=None, batch_size=1000):
+        """
+        Keep all snapshots from the last ``daily_days``, the first of
+        each ISO week up to ``weekly_days``, then the first of each
+        month. Returns the number of snapshots deleted.
+        """
+        now = now or timezone.now()
+        daily_cutoff = now - timedelta(days=self.daily_days)
+        weekly_cutoff = now - timedelta(days=self.weekly_days)
+
+        old = StockSnapshot.objects.filter(
+            taken_at__lt=daily_cutoff
+        ).order_by('merchant_id', 'taken_at').values_list(
+            'id', 'merchant_id', 'taken_at'
+        )
+        seen = set()
+        doomed = []
+        for snapshot_id, merchant_id, taken_at in old.iterator(
+            chunk_size=5000
+        ):
+            if taken_at >= weekly_cutoff:
+                period = ('week',) + tuple(taken_at.isocalendar())[:2]
+            else:
+                period = ('month', taken_at.year, taken_at.month)
+            if (merchant_id, period) in seen:
+                doomed.append(snapshot_id)
+            else:
+                seen.add((merchant_id, period))
+
+        # Delete once the scan is finished, not under its open cursor
+        deleted = 0
+        for offset in range(0, len(doomed), batch_size):
+            deleted += StockSnapshot.objects.filter(
+                pk__in=doomed[offset:offset + batch_size]
+            ).delete()[0]
+        return deleted
+
+    @staticmethod
+    def _live_items(merchant_id):
+        return {
+            str(product_id): [quantity, str(cost), str(sale)]
+            for product_id, quantity, cost, sale in StockItem.objects.filter(
+                merchant_id=merchant_id
+            ).values_list('product_id', 'quantity', 'cost_price',
+                          'sale_price')
+        }
+
+
+def parse_as_of(value, end_of_day=True, name='at'):
+    """
+    Parse an ISO datetime, or a date meaning the end (or start) of it;
+    ``name`` is the parameter the ValueError message refers to.
+    """
+    moment = parse_datetime(value) if len(value) > 10 else None
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(
+                f'{name} must be an ISO datetime or a YYYY-MM-DD date'
+            )
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
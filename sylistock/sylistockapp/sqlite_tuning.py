@@ -0,0 +1,38 @@
+"""
+Per-connection SQLite tuning for single-node deployments.
+
+Applied from a connection_created receiver so every new connection,
+including the ones opened by scanner request threads, gets WAL
+journaling (readers no longer block the writer), relaxed fsync and a
+busy timeout instead of failing with "database is locked".
+"""
+from django.conf import settings
+
+# Applied in this order; journal_mode first since it changes the file.
+PRAGMA_ORDER = (
+    'journal_mode', 'synchronous', 'busy_timeout', 'mmap_size',
+    'cache_size',
+)
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None) or {}
+    with connection.cursor() as cursor:
+        for name in PRAGMA_ORDER:
+            value = pragmas.get(name)
+            if value is not None:
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def current_pragmas(connection):
+    """Read back the effective pragma values of ``connection``"""
+    with connection.cursor() as cursor:
+        values = {}
+        for name in PRAGMA_ORDER:
+            cursor.execute(f'PRAGMA {name}')
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
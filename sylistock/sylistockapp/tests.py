@@ -1,3 +1,7 @@
+import io
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
@@ -220,3 +224,2305 @@ class UnauthenticatedAccessTests(APITestCase):
             [status.HTTP_401_UNAUTHORIZED,
              status.HTTP_403_FORBIDDEN],
         )
+
+
+class AsyncReadViewTests(APITestCase):
+    """Test the async (ASGI) read endpoints"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testmerchant', password='testpass123'
+        )
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user,
+            business_name='Test Shop',
+            location='Madina Market',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(
+            barcode='1234567890',
+            name='Test Product',
+        )
+        StockItem.objects.create(
+            merchant=self.merchant,
+            product=self.product,
+            quantity=2,
+            sale_price=9.99,
+        )
+
+    def test_get_stock_items_matches_sync_view(self):
+        sync_response = self.client.get('/inventory/items/')
+        async_response = self.client.get('/inventory/async/items/')
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+    def test_search_and_alerts(self):
+        response = self.client.get('/inventory/async/items/search/?q=Test')
+        self.assertEqual(response.json()['count'], 1)
+        response = self.client.get(
+            '/inventory/async/alerts/low-stock/?threshold=5'
+        )
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_sales_report(self):
+        InventoryLog.objects.create(
+            merchant=self.merchant,
+            product=self.product,
+            action='OUT',
+            quantity_changed=-2,
+            source='ZEBRA',
+            device_id='tc52',
+        )
+        response = self.client.get('/inventory/async/reports/sales/')
+        data = response.json()
+        self.assertEqual(data['total_sales'], 2)
+        self.assertAlmostEqual(data['total_revenue'], 19.98)
+        self.assertEqual(data['most_active_source'], 'tc52')
+
+    def test_requires_auth(self):
+        client = APIClient()
+        response = client.get('/inventory/async/reports/performance/')
+        self.assertEqual(
+            response.status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_token_auth(self):
+        from rest_framework.authtoken.models import Token
+        token = Token.objects.create(user=self.user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = client.get('/inventory/async/reports/performance/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['total_products'], 1)
+
+
+class RuntimeMetricsTests(APITestCase):
+    """Test the admin metrics endpoint"""
+
+    def test_requires_admin(self):
+        user = User.objects.create_user(
+            username='testmerchant', password='testpass123'
+        )
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/inventory/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_database_stats(self):
+        from django.db import connection
+        from .metrics import connections_opened, record_connection_created
+
+        admin = User.objects.create_superuser(
+            username='admin', password='adminpass123'
+        )
+        self.client.force_authenticate(user=admin)
+
+        before = connections_opened('default')
+        record_connection_created(sender=None, connection=connection)
+        self.assertEqual(connections_opened('default'), before + 1)
+
+        response = self.client.get('/inventory/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        default = response.data['databases']['default']
+        self.assertTrue(default['connected'])
+        self.assertIn('conn_max_age', default)
+        self.assertGreaterEqual(default['connections_opened'], before + 1)
+
+
+class SQLiteTuningTests(TestCase):
+    """Test the SQLite connection tuning layer"""
+
+    def test_pragmas_applied_to_connection(self):
+        from django.db import connection
+        from .sqlite_tuning import current_pragmas
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        pragmas = current_pragmas(connection)
+        self.assertEqual(pragmas['busy_timeout'], 5000)
+        self.assertEqual(pragmas['synchronous'], 1)  # NORMAL
+        self.assertEqual(pragmas['cache_size'], -20000)
+
+    def test_write_transactions_begin_immediate(self):
+        from django.db import connection
+
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class ReplicaRoutingTests(APITestCase):
+    """Test read-replica routing and read-your-writes stickiness"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testmerchant', password='testpass123'
+        )
+        MerchantProfile.objects.create(
+            user=self.user,
+            business_name='Test Shop',
+            location='Madina Market',
+        )
+
+    def _routed_alias(self, user):
+        from django.test import RequestFactory
+        from .db_router import ReplicaRouter, read_from_replica
+
+        seen = []
+
+        @read_from_replica
+        def view(request):
+            seen.append(ReplicaRouter().db_for_read(StockItem))
+
+        request = RequestFactory().get('/')
+        request.user = user
+        view(request)
+        return seen[0]
+
+    def test_no_replica_configured(self):
+        self.assertIsNone(self._routed_alias(self.user))
+
+    def test_reads_routed_to_replica(self):
+        # The default alias stands in for a configured replica.
+        with self.settings(REPLICA_DATABASE_ALIAS='default'):
+            self.assertEqual(self._routed_alias(self.user), 'default')
+
+    def test_writer_pinned_to_primary(self):
+        with self.settings(REPLICA_DATABASE_ALIAS='default'):
+            self.client.force_login(self.user)
+            response = self.client.post(
+                '/inventory/alerts/threshold/', {'threshold': 3}
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIsNone(self._routed_alias(self.user))
+
+    def test_async_views_routed_across_awaits(self):
+        from asgiref.sync import async_to_sync, sync_to_async
+        from django.test import RequestFactory
+        from .db_router import (
+            ReplicaRouter, pin_to_primary, read_from_replica,
+        )
+
+        @read_from_replica
+        async def view(request):
+            # The async ORM runs each query like this
+            return await sync_to_async(ReplicaRouter().db_for_read)(
+                StockItem
+            )
+
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.client.force_authenticate(user=self.user)
+        with self.settings(REPLICA_DATABASE_ALIAS='default'):
+            self.assertEqual(async_to_sync(view)(request), 'default')
+            response = self.client.get(
+                '/inventory/async/reports/performance/'
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pin_to_primary(self.user.pk)
+            self.assertIsNone(async_to_sync(view)(request))
+
+    def test_reporting_view_still_served(self):
+        with self.settings(REPLICA_DATABASE_ALIAS='default'):
+            self.client.force_authenticate(user=self.user)
+            response = self.client.get('/inventory/reports/performance/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class LenderExportTests(APITestCase):
+    """Test the streaming lender export"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testmerchant', password='testpass123'
+        )
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user,
+            business_name='Test Shop',
+            location='Madina Market',
+        )
+        other_user = User.objects.create_user(
+            username='othermerchant', password='testpass123'
+        )
+        self.other = MerchantProfile.objects.create(
+            user=other_user,
+            business_name='Other Shop',
+            location='Madina Market',
+        )
+        product = Product.objects.create(barcode='111', name='Rice')
+        for merchant in (self.merchant, self.other):
+            StockItem.objects.create(
+                merchant=merchant, product=product, quantity=4,
+            )
+            InventoryLog.objects.create(
+                merchant=merchant, product=product, action='IN',
+                quantity_changed=4, source='MANUAL', device_id='web',
+            )
+
+    def _records(self, response):
+        import gzip
+        import json
+        body = gzip.decompress(b''.join(response.streaming_content))
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_merchant_exports_own_history(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            f'/inventory/bulk/export-lender/?merchant_id={self.other.pk}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        records = self._records(response)
+        self.assertEqual(records[0]['type'], 'export')
+        self.assertEqual(records[0]['merchant_ids'], [self.merchant.pk])
+        types = [r['type'] for r in records[1:]]
+        self.assertEqual(types, ['bankability', 'stock', 'log'])
+        log_columns = records[0]['columns']['log']
+        log = dict(zip(log_columns, records[-1]['row']))
+        self.assertEqual(log['merchant_id'], self.merchant.pk)
+
+    def test_staff_exports_all_merchants(self):
+        staff = User.objects.create_user(
+            username='lender', password='testpass123', is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        response = self.client.get('/inventory/bulk/export-lender/')
+        records = self._records(response)
+        logs = [r for r in records if r['type'] == 'log']
+        self.assertEqual(len(logs), 2)
+
+    def test_export_honours_primary_pin(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from .db_router import pin_to_primary
+
+        self.addCleanup(cache.clear)
+        staff = User.objects.create_user(
+            username='lender', password='testpass123', is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        with mock.patch('sylistockapp.db_router.replica_alias',
+                        return_value='replica'), mock.patch(
+            'sylistockapp.views_bulk_operations.LenderExportService'
+        ) as service:
+            service.return_value.iter_ndjson_gzip.return_value = iter(())
+            self.client.get('/inventory/bulk/export-lender/')
+            pin_to_primary(staff.pk)
+            self.client.get('/inventory/bulk/export-lender/')
+        self.assertEqual(
+            [c.kwargs['using'] for c in service.call_args_list],
+            ['replica', 'default'],
+        )
+
+    def test_date_windows(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .services.export_service import LenderExportService
+
+        end = timezone.now()
+        start = end - timedelta(days=65)
+        windows = list(
+            LenderExportService(chunk_days=30).date_windows(start, end)
+        )
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[0][0], start)
+        self.assertEqual(windows[-1][1], end)
+
+
+class KYCDocumentPipelineTests(APITestCase):
+    """Test background KYC document upload processing"""
+
+    def setUp(self):
+        import tempfile
+        from .models_kyc import KYCVerification
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = self.settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = User.objects.create_user(
+            username='testmerchant', password='testpass123'
+        )
+        merchant = MerchantProfile.objects.create(
+            user=self.user,
+            business_name='Test Shop',
+            location='Madina Market',
+        )
+        self.kyc = KYCVerification.objects.create(merchant=merchant)
+        self.client.force_authenticate(user=self.user)
+
+    def _upload(self, name, content, expect='queued'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/inventory/kyc/upload-document/',
+                {
+                    'kyc_id': str(self.kyc.id),
+                    'document_type': 'national_id',
+                    'file': SimpleUploadedFile(name, content),
+                },
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['processing_status'], expect)
+        return self.client.get(
+            '/inventory/kyc/document-status/'
+            f'{response.data["document_id"]}/'
+        ).data
+
+    def test_pdf_is_sniffed_and_validated(self):
+        result = self._upload('id.pdf', b'%PDF-1.4\n' + b'0' * 1024)
+        self.assertEqual(result['processing_status'], 'completed')
+        self.assertEqual(result['mime_type'], 'application/pdf')
+        self.assertEqual(result['file_size'], 1033)
+        self.assertEqual(result['verification_status'], 'verified')
+
+    def test_unknown_content_rejected_despite_extension(self):
+        result = self._upload('id.jpg', b'MZ\x90\x00not an image')
+        self.assertEqual(result['mime_type'], 'application/octet-stream')
+        self.assertIn('Invalid file type', result['verification_notes'])
+
+    def test_identical_upload_reuses_blob_and_validation(self):
+        import hashlib
+        from unittest import mock
+        from .models_kyc import KYCBlob, KYCDocument
+
+        content = b'%PDF-1.4\n' + b'1' * 2048
+        first = self._upload('id.pdf', content)
+        with mock.patch(
+            'sylistockapp.services.kyc_service.process_kyc_document'
+        ) as process:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    '/inventory/kyc/upload-document/',
+                    {
+                        'kyc_id': str(self.kyc.id),
+                        'document_type': 'national_id',
+                        'file': SimpleUploadedFile('renewal.pdf', content),
+                    },
+                    format='multipart',
+                )
+        process.assert_not_called()
+        self.assertEqual(response.data['processing_status'], 'completed')
+        self.assertTrue(response.data['deduplicated'])
+
+        blob = KYCBlob.objects.get()
+        self.assertEqual(blob.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.size, len(content))
+        renewal = KYCDocument.objects.get(id=response.data['document_id'])
+        self.assertEqual(renewal.file.name, blob.file.name)
+        self.assertEqual(renewal.mime_type, 'application/pdf')
+        self.assertEqual(
+            renewal.verification_status, first['verification_status']
+        )
+
+    def test_blob_deleted_with_last_reference(self):
+        import os
+        from .models_kyc import KYCBlob, KYCDocument
+
+        self._upload('a.pdf', b'%PDF-1.4\nsame')
+        self._upload('b.pdf', b'%PDF-1.4\nsame', expect='completed')
+        blob = KYCBlob.objects.get()
+        path = blob.file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            KYCDocument.objects.first().delete()
+        self.assertEqual(KYCBlob.objects.get().ref_count, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            KYCDocument.objects.get().delete()
+        self.assertFalse(KYCBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_stuck_documents_requeued(self):
+        from datetime import timedelta
+        from unittest import mock
+        from django.core.management import call_command
+        from django.utils import timezone
+        from .models_kyc import KYCDocument
+
+        # Workers die before running the tasks
+        with mock.patch(
+            'sylistockapp.services.kyc_service.process_kyc_document'
+        ):
+            for content in (b'a', b'b', b'c'):
+                self._upload('id.pdf', b'%PDF-1.4\n' + content)
+        stuck, exhausted, recent = KYCDocument.objects.order_by('pk')
+        long_ago = timezone.now() - timedelta(hours=2)
+        KYCDocument.objects.filter(pk=stuck.pk).update(
+            processing_status='processing', processing_attempts=1,
+            processing_updated_at=long_ago,
+        )
+        KYCDocument.objects.filter(pk=exhausted.pk).update(
+            processing_status='processing', processing_attempts=3,
+            processing_updated_at=long_ago,
+        )
+
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('requeue_kyc_documents', stdout=out)
+        self.assertIn('Re-queued 1 documents and failed 1', out.getvalue())
+        statuses = dict(KYCDocument.objects.values_list(
+            'pk', 'processing_status'
+        ))
+        self.assertEqual(statuses, {
+            stuck.pk: 'completed', exhausted.pk: 'failed',
+            recent.pk: 'queued',
+        })
+        self.assertEqual(
+            KYCDocument.objects.get(pk=stuck.pk).processing_attempts, 2
+        )
+
+    def test_blob_hashed_without_upload_handler(self):
+        import hashlib
+        from .services.kyc_service import KYCService
+
+        content = b'\x89PNG\r\n\x1a\n' + b'x' * 100
+        file = SimpleUploadedFile('id.png', content)
+        blob = KYCService()._store_blob(file)
+        self.assertEqual(blob.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(blob.mime_type, 'image/png')
+
+    def test_sniff_mime_type(self):
+        from .services.kyc_service import sniff_mime_type
+
+        self.assertEqual(sniff_mime_type(b'\xff\xd8\xff\xe0'), 'image/jpeg')
+        self.assertEqual(
+            sniff_mime_type(b'\x89PNG\r\n\x1a\n'), 'image/png'
+        )
+        self.assertEqual(
+            sniff_mime_type(b'\x00\x00\x00\x18ftypheic'), 'image/heic'
+        )
+
+
+class ImageQualityTests(TestCase):
+    """Test bounded-cost KYC image quality analysis"""
+
+    def _image_bytes(self, size, sharp=True, fmt='JPEG'):
+        from PIL import Image, ImageDraw
+
+        img = Image.new('L', size, 128)
+        if sharp:
+            draw = ImageDraw.Draw(img)
+            for x in range(0, size[0], 16):
+                draw.line([(x, 0), (x, size[1])], fill=20, width=3)
+            for y in range(0, size[1], 16):
+                draw.line([(0, y), (size[0], y)], fill=230, width=3)
+        buffer = io.BytesIO()
+        img.convert('RGB').save(buffer, fmt)
+        return buffer.getvalue()
+
+    def test_sharp_high_resolution_photo(self):
+        from .services.image_quality import analyze_image
+
+        report = analyze_image(self._image_bytes((2400, 1600)))
+        self.assertEqual((report['width'], report['height']), (2400, 1600))
+        self.assertEqual(report['score'], 30)
+        self.assertEqual(report['issues'], [])
+
+    def test_blurry_low_resolution_photo(self):
+        from .services.image_quality import analyze_image
+
+        report = analyze_image(
+            self._image_bytes((320, 240), sharp=False, fmt='PNG')
+        )
+        self.assertIn('Image is blurry', report['issues'])
+        self.assertIn('Image resolution too low', report['issues'])
+        self.assertEqual(report['score'], 5)
+
+    def test_process_pool(self):
+        from .services.image_quality import analyze_in_pool
+
+        report = analyze_in_pool(
+            self._image_bytes((1200, 900)), max_workers=1
+        )
+        # Sharp and well exposed, but a 900px short edge is only fair.
+        self.assertEqual(report['score'], 26)
+
+    def test_results_cached_by_content_hash(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import FileSystemStorage
+        from django.db.models.fields.files import FieldFile
+        from .models_kyc import KYCDocument
+        from .services.kyc_service import KYCService
+
+        cache.clear()
+        storage_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(storage_dir.cleanup)
+        storage = FileSystemStorage(location=storage_dir.name)
+        name = storage.save('id.jpg', ContentFile(
+            self._image_bytes((1200, 900))
+        ))
+        field = KYCDocument._meta.get_field('file')
+        file = FieldFile(None, field, name)
+        file.storage = storage
+
+        service = KYCService()
+        with self.settings(IMAGE_ANALYSIS_WORKERS=0), mock.patch(
+            'sylistockapp.services.kyc_service.analyze_in_pool',
+            wraps=lambda source, max_workers: {'score': 30, 'issues': []},
+        ) as analyze:
+            self.assertEqual(service._check_image_quality(file), (30, []))
+            self.assertEqual(service._check_image_quality(file), (30, []))
+        self.assertEqual(analyze.call_count, 1)
+
+
+class ComplianceEngineTests(TestCase):
+    """Test prefetch-based single and batch compliance checks"""
+
+    def _verification(self, username, verified_docs, account_digits=True):
+        from .models_kyc import BankAccount, KYCDocument, KYCVerification
+
+        user = User.objects.create_user(username=username, password='x')
+        merchant = MerchantProfile.objects.create(
+            user=user, business_name=f'{username} shop',
+            location='Madina Market', business_age=400,
+        )
+        kyc = KYCVerification.objects.create(merchant=merchant)
+        for doc_type in verified_docs:
+            KYCDocument.objects.create(
+                verification=kyc, document_type=doc_type,
+                file_name=f'{doc_type}.pdf', file=f'{doc_type}.pdf',
+                verification_status='verified',
+            )
+        BankAccount.objects.create(
+            verification=kyc, account_number=(
+                '12345678' if account_digits else 'ABC'
+            ),
+            account_name='Shop', bank_name='GCB', account_type='savings',
+            verification_score=100 if account_digits else 20,
+        )
+        return kyc
+
+    def test_single_check_uses_constant_queries(self):
+        from .services.kyc_service import KYCService
+
+        kyc = self._verification('ama', ['national_id', 'utility_bill'])
+        service = KYCService()
+        kyc = service._compliance_queryset().get(id=kyc.id)
+        with self.assertNumQueries(0):
+            check_results, score = service._evaluate_compliance(kyc)
+            self.assertEqual(kyc.get_completion_percentage(), 100)
+        self.assertEqual(check_results['document_completeness']['score'], 50)
+        self.assertEqual(score, 71)
+
+    def test_run_compliance_check(self):
+        from .models_kyc import ComplianceCheck
+        from .services.kyc_service import KYCService
+
+        kyc = self._verification('kofi', ['national_id', 'utility_bill'])
+        result = KYCService().run_compliance_check(kyc.id)
+        self.assertEqual(result['status'], 'approved')
+        self.assertEqual(ComplianceCheck.objects.get().result, 'pass')
+
+    def test_batch_evaluation(self):
+        from .models_kyc import ComplianceCheck, KYCVerification
+        from .services.kyc_service import KYCService
+
+        good = self._verification('esi', ['national_id', 'utility_bill'])
+        bad = self._verification('yaw', [], account_digits=False)
+
+        summary = KYCService().run_compliance_checks(batch_size=1)
+        self.assertEqual(summary['checked'], 2)
+        self.assertEqual(summary['approved'], 1)
+        self.assertEqual(summary['rejected'], 1)
+        self.assertEqual(summary['status_changed'], 2)
+        self.assertEqual(ComplianceCheck.objects.count(), 2)
+        self.assertEqual(
+            KYCVerification.objects.get(id=good.id).status, 'approved'
+        )
+        self.assertEqual(
+            KYCVerification.objects.get(id=bad.id).status, 'rejected'
+        )
+        self.assertEqual(
+            MerchantProfile.objects.get(id=good.merchant_id)
+            .bankability_score, 50
+        )
+
+
+class KYCExpirySweeperTests(TestCase):
+    """Test bulk expiry of KYC verifications and documents"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models_kyc import KYCDocument, KYCVerification
+
+        now = timezone.now()
+        self.merchants = []
+        for i, (status_, expires) in enumerate([
+            ('approved', now - timedelta(days=1)),
+            ('approved', now - timedelta(days=2)),
+            ('approved', now + timedelta(days=30)),
+            ('expired', now - timedelta(days=90)),
+        ]):
+            user = User.objects.create_user(username=f'm{i}', password='x')
+            merchant = MerchantProfile.objects.create(
+                user=user, business_name=f'Shop {i}', location='Accra',
+                bankability_score=30,
+            )
+            kyc = KYCVerification.objects.create(
+                merchant=merchant, status=status_, expires_at=expires,
+            )
+            KYCDocument.objects.create(
+                verification=kyc, document_type='national_id',
+                file_name='id.pdf', file='id.pdf',
+                verification_status='verified',
+                expiry_date=expires.date(),
+            )
+            self.merchants.append(merchant)
+
+    def test_sweep_expires_in_batches(self):
+        from .models_kyc import KYCDocument, KYCVerification
+        from .services.kyc_service import KYCService
+
+        with self.captureOnCommitCallbacks(execute=True):
+            summary = KYCService().expire_overdue(batch_size=1)
+
+        self.assertEqual(summary['expired_verifications'], 2)
+        self.assertEqual(summary['expired_documents'], 3)
+        self.assertEqual(summary['merchants_rescored'], 2)
+        self.assertEqual(
+            KYCVerification.objects.filter(status='expired').count(), 3
+        )
+        self.assertEqual(
+            KYCDocument.objects.filter(
+                verification_status='verified'
+            ).count(), 1
+        )
+        # Expired merchants lose their KYC points; others are untouched
+        scores = [
+            MerchantProfile.objects.get(id=m.id).bankability_score
+            for m in self.merchants
+        ]
+        self.assertEqual(scores, [0, 0, 30, 30])
+
+    def test_command_reports_counts(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('expire_kyc', stdout=out)
+        self.assertIn('Expired 2 verifications and 3 documents',
+                      out.getvalue())
+        out = StringIO()
+        call_command('expire_kyc', stdout=out)
+        self.assertIn('Expired 0 verifications and 0 documents',
+                      out.getvalue())
+
+
+class KYCReviewQueueTests(APITestCase):
+    """Test the keyset-paginated back-office review queue"""
+
+    def setUp(self):
+        from .models_kyc import (
+            BankAccount, ComplianceCheck, KYCDocument, KYCVerification,
+        )
+
+        self.staff = User.objects.create_user(
+            username='reviewer', password='x', is_staff=True
+        )
+        for i in range(5):
+            user = User.objects.create_user(username=f'm{i}', password='x')
+            merchant = MerchantProfile.objects.create(
+                user=user, business_name=f'Shop {i}', location='Accra',
+            )
+            kyc = KYCVerification.objects.create(
+                merchant=merchant,
+                status='approved' if i == 4 else 'pending',
+            )
+            KYCDocument.objects.create(
+                verification=kyc, document_type='national_id',
+                file_name='id.pdf', file='id.pdf',
+                verification_status='verified',
+            )
+            BankAccount.objects.create(
+                verification=kyc, account_number='0012345678',
+                account_name='Shop', bank_name='GCB',
+                account_type='savings',
+            )
+            for score in (40, 80):
+                ComplianceCheck.objects.create(
+                    verification=kyc, check_type='risk', result='pass',
+                    score=score,
+                )
+
+    def test_requires_staff(self):
+        user = User.objects.get(username='m0')
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/inventory/kyc/review-queue/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_keyset_pages_with_embedded_details(self):
+        self.client.force_authenticate(user=self.staff)
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(
+                '/inventory/kyc/review-queue/', params
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(r['business_name'] for r in response.data['results'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(seen, ['Shop 0', 'Shop 1', 'Shop 2', 'Shop 3'])
+        entry = response.data['results'][-1]
+        self.assertEqual(entry['bank_accounts'][0]['account_number'],
+                         '******5678')
+        self.assertEqual(entry['documents'][0]['document_type'],
+                         'national_id')
+        self.assertEqual(entry['completion_percentage'], 50)
+        self.assertEqual(entry['latest_compliance_check']['score'], 80)
+
+    def test_constant_queries_per_page(self):
+        from .services.kyc_service import KYCService
+
+        with self.assertNumQueries(4):
+            result = KYCService().get_review_queue(limit=10)
+        self.assertEqual(len(result['results']), 4)
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(
+            '/inventory/kyc/review-queue/', {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class NumberSequenceTests(TestCase):
+    """Test block-allocated policy and claim numbers"""
+
+    def setUp(self):
+        from .sequences import reset_cache
+
+        reset_cache()
+        self.addCleanup(reset_cache)
+
+    def test_luhn_check_digit(self):
+        from .sequences import is_valid_number, luhn_check_digit
+
+        self.assertEqual(luhn_check_digit('7992739871'), '3')
+        self.assertTrue(is_valid_number('POL000000018', 'POL'))
+        self.assertFalse(is_valid_number('POL000000019', 'POL'))
+        self.assertFalse(is_valid_number('CLM000000018', 'POL'))
+
+    def test_block_served_from_memory_after_commit(self):
+        from .sequences import next_number, next_value
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(next_value('policy'), 1)
+        with self.assertNumQueries(0):
+            numbers = [next_number('policy', 'POL') for _ in range(19)]
+        self.assertEqual(numbers[0], 'POL000000026')
+        self.assertEqual(len(set(numbers)), 19)
+        # Block exhausted: the next call reserves a fresh one
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(next_value('policy'), 21)
+
+    def test_rolled_back_block_not_cached(self):
+        from django.db import transaction
+        from .sequences import next_value
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.assertEqual(next_value('claim'), 1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        # Counter rolled back and nothing was cached, so 1 is reissued
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(next_value('claim'), 1)
+
+    def test_policies_and_claims_get_distinct_numbers(self):
+        from .services.insurance_service import InsuranceService
+        from .sequences import is_valid_number
+
+        service = InsuranceService()
+        policies = {service._generate_policy_number() for _ in range(5)}
+        claims = {service._generate_claim_number() for _ in range(5)}
+        self.assertEqual(len(policies), 5)
+        self.assertTrue(all(is_valid_number(n, 'POL') for n in policies))
+        self.assertTrue(all(is_valid_number(n, 'CLM') for n in claims))
+
+
+class PremiumScheduleTests(APITestCase):
+    """Test premium schedule generation and bulk policy enrollment"""
+
+    def setUp(self):
+        from .sequences import reset_cache
+
+        self.addCleanup(reset_cache)
+        self.staff = User.objects.create_user(
+            username='coop', password='x', is_staff=True
+        )
+        self.merchants = [
+            MerchantProfile.objects.create(
+                user=User.objects.create_user(username=f'm{i}',
+                                              password='x'),
+                business_name=f'Shop {i}', location='Makola',
+            )
+            for i in range(3)
+        ]
+
+    def test_monthly_schedule_clamps_short_months(self):
+        from datetime import date
+        from decimal import Decimal
+        from .services.insurance_service import build_premium_schedule
+
+        schedule = build_premium_schedule(date(2024, 1, 31), '25.00')
+        self.assertEqual(len(schedule), 12)
+        self.assertEqual(schedule[1][0], date(2024, 2, 29))
+        self.assertEqual(schedule[-1][0], date(2024, 12, 31))
+        self.assertTrue(all(a == Decimal('25.00') for _, a in schedule))
+
+    def test_weekly_and_quarterly_schedules(self):
+        from datetime import date
+        from decimal import Decimal
+        from .services.insurance_service import build_premium_schedule
+
+        weekly = build_premium_schedule(
+            date(2024, 3, 1), '52', term_months=6, frequency='weekly'
+        )
+        self.assertEqual(len(weekly), 27)  # 184 days
+        self.assertEqual(weekly[1][0], date(2024, 3, 8))
+        self.assertEqual(weekly[0][1], Decimal('12.00'))
+
+        quarterly = build_premium_schedule(
+            date(2024, 3, 1), '10', term_months=24, frequency='quarterly'
+        )
+        self.assertEqual(len(quarterly), 8)
+        self.assertEqual(quarterly[1], (date(2024, 6, 1), Decimal('30.00')))
+
+        with self.assertRaises(ValueError):
+            build_premium_schedule(date(2024, 3, 1), '10',
+                                   frequency='daily')
+
+    def test_create_policy_bulk_inserts_schedule(self):
+        from .models_insurance import InsurancePolicy
+        from .services.insurance_service import InsuranceService
+
+        service = InsuranceService()
+        with self.captureOnCommitCallbacks(execute=True):
+            service._generate_policy_number()  # Reserve a number block
+        # Savepoint, merchant, policy insert, premium insert, release
+        with self.assertNumQueries(5):
+            result = service.create_policy(
+                self.merchants[0].id, 'basic', 5000, 0, 20,
+                payment_frequency='weekly', term_months=3,
+            )
+        policy = InsurancePolicy.objects.get(id=result['policy_id'])
+        self.assertEqual(policy.status, 'active')
+        self.assertEqual(policy.premiums.count(), 14)
+        self.assertEqual(policy.next_premium_due, policy.start_date)
+
+    def test_bulk_enrollment_reserves_numbers_once(self):
+        from .models import NumberSequence
+        from .sequences import is_valid_number
+        from .services.insurance_service import InsuranceService
+
+        service = InsuranceService()
+        rows = [{'merchant_id': self.merchants[i % 3].id}
+                for i in range(10)]
+        defaults = {'policy_type': 'basic', 'coverage_amount': 2000,
+                    'premium_amount': 10}
+        service._generate_policy_number()  # Creates the sequence row
+        # Merchants, savepoint, sequence savepoint, update, select,
+        # release, policies, premiums (two SQLite-sized batches), release
+        with self.assertNumQueries(10):
+            result = service.create_policies_bulk(rows, defaults)
+        self.assertEqual(len(result['created']), 10)
+        numbers = [row['policy_number'] for row in result['created']]
+        self.assertEqual(len(set(numbers)), 10)
+        self.assertTrue(all(is_valid_number(n, 'POL') for n in numbers))
+        # The single call took a block of 20; the batch exactly 10 more
+        self.assertEqual(
+            NumberSequence.objects.get(name='policy').next_value, 31
+        )
+
+        service.create_policies_bulk(rows * 2, defaults)
+        self.assertEqual(
+            NumberSequence.objects.get(name='policy').next_value, 51
+        )
+
+    def test_bulk_enrollment_endpoint(self):
+        from .models_insurance import InsurancePolicy, InsurancePremium
+
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.post(
+            '/inventory/insurance/bulk-create-policies/',
+            {
+                'defaults': {'policy_type': 'basic',
+                             'coverage_amount': 2000,
+                             'premium_amount': 10},
+                'policies': [
+                    {'merchant_id': m.id} for m in self.merchants
+                ] + [
+                    {'merchant_id': 99999},
+                    {'merchant_id': self.merchants[0].id,
+                     'payment_frequency': 'daily'},
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 3)
+        self.assertEqual(
+            [e['index'] for e in response.data['errors']], [3, 4]
+        )
+        self.assertEqual(InsurancePolicy.objects.count(), 3)
+        self.assertEqual(InsurancePremium.objects.count(), 36)
+
+    def test_bulk_enrollment_coerces_merchant_ids(self):
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.post(
+            '/inventory/insurance/bulk-create-policies/',
+            {
+                'defaults': {'policy_type': 'basic',
+                             'coverage_amount': 2000,
+                             'premium_amount': 10},
+                'policies': [
+                    {'merchant_id': str(self.merchants[0].id)},
+                    {'merchant_id': 'abc'},
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'][0]['merchant_id'],
+                         self.merchants[0].id)
+        self.assertEqual(response.data['errors'], [
+            {'index': 1, 'error': 'merchant_id must be an integer'},
+        ])
+
+    def test_bulk_enrollment_rejects_bad_amounts_per_row(self):
+        from .models_insurance import InsurancePolicy
+
+        self.client.force_authenticate(user=self.staff)
+        merchant_id = self.merchants[0].id
+        response = self.client.post(
+            '/inventory/insurance/bulk-create-policies/',
+            {
+                'defaults': {'policy_type': 'basic', 'premium_amount': 10},
+                'policies': [
+                    {'merchant_id': merchant_id, 'coverage_amount': 2000},
+                    {'merchant_id': merchant_id, 'coverage_amount': 'abc'},
+                    {'merchant_id': merchant_id, 'coverage_amount': 2000,
+                     'deductible_amount': -5},
+                    'not a row',
+                    {'merchant_id': self.merchants[1].id,
+                     'coverage_amount': '1500.50'},
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [row['index'] for row in response.data['created']], [0, 4]
+        )
+        self.assertEqual(response.data['errors'], [
+            {'index': 1, 'error': 'Invalid coverage_amount: abc'},
+            {'index': 2, 'error': 'deductible_amount must be non-negative'},
+            {'index': 3, 'error': 'Enrollment must be an object'},
+        ])
+        self.assertEqual(InsurancePolicy.objects.filter(
+            total_coverage_amount=1500.5
+        ).count(), 1)
+
+    def test_bulk_enrollment_requires_staff(self):
+        self.client.force_authenticate(user=self.merchants[0].user)
+        response = self.client.post(
+            '/inventory/insurance/bulk-create-policies/',
+            {'policies': [{'merchant_id': self.merchants[0].id}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PortfolioRepricingTests(TestCase):
+    """Test vectorized portfolio-wide risk and premium recalculation"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models_insurance import InsuranceClaim, InsurancePolicy
+
+        today = timezone.now().date()
+        self.policies = []
+        for i, (age, claims) in enumerate([(400, 0), (100, 2), (10, 0)]):
+            user = User.objects.create_user(username=f'm{i}', password='x')
+            merchant = MerchantProfile.objects.create(
+                user=user, business_name=f'Shop {i}', location='Accra',
+            )
+            MerchantProfile.objects.filter(id=merchant.id).update(
+                created_at=timezone.now() - timedelta(days=age)
+            )
+            policy = InsurancePolicy.objects.create(
+                merchant=merchant, policy_number=f'POL{i}',
+                status='active', total_coverage_amount=10000,
+                deductible_amount=0, premium_amount=1,
+                start_date=today, end_date=today + timedelta(days=365),
+            )
+            for n in range(claims):
+                InsuranceClaim.objects.create(
+                    policy=policy, claim_number=f'CLM{i}{n}',
+                    claim_type='theft', description='x',
+                    estimated_loss=100, incident_date=timezone.now(),
+                )
+            self.policies.append(policy)
+
+    def test_vectorized_scores_and_premiums(self):
+        import numpy as np
+        from .services.portfolio_pricing import (
+            premiums, risk_levels, risk_scores,
+        )
+
+        scores = risk_scores([400, 100, 10], [0, 2, 0])
+        self.assertEqual(scores.tolist(), [50, 80, 80])
+        self.assertEqual(risk_levels(scores).tolist(),
+                         ['high', 'very_high', 'very_high'])
+        self.assertEqual(risk_levels([29, 30]).tolist(), ['low', 'medium'])
+        result = premiums([10000, 10000], [0, 5000], np.array([1.0, 1.0]))
+        self.assertEqual(result.tolist(), [200.0, 150.0])
+
+    def test_scatter_skips_unknown_merchants(self):
+        import numpy as np
+        from .services.arrays import scatter
+
+        ids = np.array([3, 5, 9], dtype=np.int64)
+        values = scatter(ids, [(9, 2), (4, 7), (12, 1), (3, None)])
+        np.testing.assert_array_equal(values, [0.0, 0.0, 2.0])
+        self.assertEqual(scatter(ids, [], dtype=np.int64).dtype, np.int64)
+        self.assertEqual(len(scatter(ids[:0], [(3, 1)])), 0)
+
+    def test_dry_run_writes_nothing(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models_insurance import InsurancePolicy
+
+        out = StringIO()
+        call_command('reprice_portfolio', '--dry-run', stdout=out)
+        self.assertIn('Would reprice 3 policies', out.getvalue())
+        self.assertIn('POL0: 1.00 -> 400.00', out.getvalue())
+        self.assertEqual(
+            InsurancePolicy.objects.get(policy_number='POL0')
+            .premium_amount, 1
+        )
+
+    def test_repricing_writes_premiums_and_assessments(self):
+        from decimal import Decimal
+        from .models_insurance import (
+            InsurancePolicy, InsuranceRiskAssessment,
+        )
+        from .services.portfolio_pricing import PortfolioRepricer
+
+        summary = PortfolioRepricer(
+            multipliers={'very_high': 4.0}
+        ).run()
+        self.assertEqual(summary['policies_repriced'], 3)
+        self.assertEqual(summary['assessments_created'], 3)
+        premiums = dict(InsurancePolicy.objects.values_list(
+            'policy_number', 'premium_amount'
+        ))
+        self.assertEqual(premiums, {
+            'POL0': Decimal('400.00'),
+            'POL1': Decimal('800.00'),
+            'POL2': Decimal('800.00'),
+        })
+        assessment = InsuranceRiskAssessment.objects.get(
+            merchant=self.policies[1].merchant
+        )
+        self.assertEqual(assessment.previous_claims, 2)
+        self.assertEqual(assessment.risk_level, 'very_high')
+
+        # Unchanged book: nothing left to do
+        self.assertEqual(
+            PortfolioRepricer(multipliers={'very_high': 4.0})
+            .run()['policies_repriced'], 0
+        )
+
+
+class PremiumAgingTests(APITestCase):
+    """Test overdue premium marking and the aging report"""
+
+    def setUp(self):
+        from datetime import date, timedelta
+        from .models_insurance import InsurancePolicy, InsurancePremium
+
+        self.today = date(2025, 6, 30)
+        user = User.objects.create_user(username='m', password='x')
+        merchant = MerchantProfile.objects.create(
+            user=user, business_name='Shop', location='Accra',
+        )
+        self.policy = InsurancePolicy.objects.create(
+            merchant=merchant, policy_number='POL1', status='active',
+            total_coverage_amount=1000, premium_amount=10,
+            start_date=date(2025, 1, 1), end_date=date(2026, 1, 1),
+            next_premium_due=date(2025, 1, 1),
+        )
+        for days_ago, status_ in [
+            (120, 'pending'), (75, 'pending'), (45, 'overdue'),
+            (30, 'pending'), (5, 'paid'), (1, 'pending'), (-10, 'pending'),
+        ]:
+            InsurancePremium.objects.create(
+                policy=self.policy, premium_number=f'P{days_ago}',
+                amount=10, payment_status=status_,
+                due_date=self.today - timedelta(days=days_ago),
+            )
+
+    def test_age_premiums(self):
+        from datetime import date
+        from .models_insurance import InsurancePremium
+        from .services.insurance_service import InsuranceService
+
+        with self.assertNumQueries(4):  # savepoint, 2 UPDATEs, release
+            result = InsuranceService().age_premiums(today=self.today)
+        self.assertEqual(result['marked_overdue'], 4)
+        self.assertEqual(
+            InsurancePremium.objects.filter(
+                payment_status='overdue'
+            ).count(), 5
+        )
+        self.policy.refresh_from_db()
+        self.assertEqual(self.policy.next_premium_due, date(2025, 3, 2))
+
+    def test_age_premiums_skips_inactive_policies(self):
+        from datetime import date, timedelta
+        from .models_insurance import InsurancePolicy, InsurancePremium
+        from .services.insurance_service import InsuranceService
+
+        cancelled = InsurancePolicy.objects.create(
+            merchant=self.policy.merchant, policy_number='POL2',
+            status='cancelled', total_coverage_amount=1000,
+            premium_amount=10, start_date=date(2025, 1, 1),
+            end_date=date(2026, 1, 1), next_premium_due=date(2025, 1, 1),
+        )
+        stale = InsurancePremium.objects.create(
+            policy=cancelled, premium_number='C1', amount=10,
+            payment_status='pending',
+            due_date=self.today - timedelta(days=40),
+        )
+        result = InsuranceService().age_premiums(today=self.today)
+        self.assertEqual(result, {'marked_overdue': 4,
+                                  'policies_refreshed': 1})
+        stale.refresh_from_db()
+        cancelled.refresh_from_db()
+        self.assertEqual(stale.payment_status, 'pending')
+        self.assertEqual(cancelled.next_premium_due, date(2025, 1, 1))
+        report = InsuranceService().premium_aging_report(today=self.today)
+        self.assertEqual(report['groups'][0]['policies'], 1)
+
+    def test_aging_report_buckets(self):
+        from .services.insurance_service import InsuranceService
+
+        with self.assertNumQueries(1):
+            report = InsuranceService().premium_aging_report(
+                today=self.today
+            )
+        group = report['groups'][0]
+        self.assertEqual(
+            [(b['bucket'], b['count']) for b in group['buckets']],
+            [('0-30', 2), ('31-60', 1), ('61-90', 1), ('90+', 1)],
+        )
+        self.assertEqual(group['total_amount'], 50.0)
+        self.assertEqual(group['policies'], 1)
+
+    def test_report_endpoint_grouped(self):
+        staff = User.objects.create_user(
+            username='ops', password='x', is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        response = self.client.get(
+            '/inventory/insurance/premium-aging/',
+            {'group_by': 'policy_type'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['groups'][0]['group'], 'basic')
+        response = self.client.get(
+            '/inventory/insurance/premium-aging/', {'group_by': 'nope'}
+        )
+        self.assertEqual(response.status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class StockHistoryTests(APITestCase):
+    """Test snapshot-based point-in-time stock reconstruction"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        self.now = timezone.now()
+        self.user = User.objects.create_user(username='m', password='x')
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user, business_name='Shop', location='Accra',
+        )
+        self.product = Product.objects.create(barcode='111', name='Rice')
+        self.stock = StockItem.objects.create(
+            merchant=self.merchant, product=self.product, quantity=0,
+            cost_price=2, sale_price=3,
+        )
+        # +50 ten days ago, -20 five days ago, -10 one day ago => 20 now
+        for days_ago, change in [(10, 50), (5, -20), (1, -10)]:
+            log = InventoryLog.objects.create(
+                merchant=self.merchant, product=self.product,
+                action='IN' if change > 0 else 'OUT',
+                quantity_changed=change, source='PHONE', device_id='d1',
+            )
+            InventoryLog.objects.filter(pk=log.pk).update(
+                timestamp=self.now - timedelta(days=days_ago)
+            )
+        self.stock.quantity = 20
+        self.stock.save()
+        self.days = lambda n: self.now - timedelta(days=n)
+
+    def _as_of(self, days_ago):
+        from .services.stock_history import StockHistoryService
+
+        return StockHistoryService().stock_as_of(
+            self.merchant.id, self.days(days_ago)
+        )
+
+    def test_live_base_replays_backward(self):
+        result = self._as_of(7)
+        self.assertEqual(result['base'], 'live')
+        self.assertEqual(result['total_quantity'], 50)
+        self.assertEqual(result['total_value'], 100.0)
+        self.assertEqual(self._as_of(20)['total_quantity'], 0)
+
+    def test_nearest_snapshot_used(self):
+        from .models import StockSnapshot
+        from .services.stock_history import StockHistoryService
+
+        StockHistoryService().take_snapshots(now=self.days(3))
+        snapshot = StockSnapshot.objects.get()
+        # The snapshot reads today's StockItems; make it the true state
+        snapshot.items = {str(self.product.id): [30, '2.00', '3.00']}
+        snapshot.save()
+
+        # Nearest before/after lookups, load the later base, log delta
+        with self.assertNumQueries(4):
+            result = self._as_of(4)
+        self.assertEqual(result['base'], 'snapshot')
+        self.assertEqual(result['base_taken_at'], self.days(3))
+        self.assertEqual(result['total_quantity'], 30)
+        self.assertEqual(self._as_of(7)['total_quantity'], 50)
+        self.assertEqual(self._as_of(0.5)['total_quantity'], 20)
+
+    def test_compaction_keeps_one_per_period(self):
+        from .models import StockSnapshot
+        from .services.stock_history import StockHistoryService
+
+        service = StockHistoryService(daily_days=7, weekly_days=60)
+        for days_ago in range(0, 120):
+            service.take_snapshots(now=self.days(days_ago))
+        deleted = service.compact(now=self.now)
+        remaining = StockSnapshot.objects.count()
+        self.assertEqual(deleted + remaining, 120)
+        self.assertLess(remaining, 7 + 9 + 3 + 2)
+        self.assertTrue(StockSnapshot.objects.filter(
+            taken_at__gte=self.days(6)
+        ).count() == 7)
+
+    def test_endpoint(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            '/inventory/items/as-of/',
+            {'at': self.days(7).strftime('%Y-%m-%dT%H:%M:%S')},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_quantity'], 50)
+        response = self.client.get('/inventory/items/as-of/',
+                                   {'at': 'yesterday'})
+        self.assertEqual(response.status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class ClaimAssessmentTests(TestCase):
+    """Test claim assessment against stock value at the incident"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .sequences import reset_cache
+        from .services.insurance_service import InsuranceService
+
+        self.addCleanup(reset_cache)
+        self.now = timezone.now()
+        self.merchant = MerchantProfile.objects.create(
+            user=User.objects.create_user(username='m', password='x'),
+            business_name='Shop', location='Madina',
+        )
+        product = Product.objects.create(barcode='222', name='Oil')
+        StockItem.objects.create(
+            merchant=self.merchant, product=product, quantity=10,
+            cost_price=5, sale_price=8,
+        )
+        # 40 in stock until a -30 loss adjustment two days ago
+        log = InventoryLog.objects.create(
+            merchant=self.merchant, product=product, action='ADJ',
+            quantity_changed=-30, source='PHONE', device_id='d1',
+        )
+        InventoryLog.objects.filter(pk=log.pk).update(
+            timestamp=self.now - timedelta(days=2)
+        )
+        self.service = InsuranceService()
+        result = self.service.create_policy(
+            self.merchant.id, 'basic', 1000, 0, 20
+        )
+        self.policy_id = result['policy_id']
+        self.incident = self.now - timedelta(days=3)
+
+    def test_loss_within_stock_value(self):
+        result = self.service.submit_claim(
+            self.policy_id, 'theft', 'Stolen oil', 150,
+            incident_date=self.incident,
+        )
+        self.assertTrue(result['success'])
+        self.assertEqual(result['assessed_stock_value'], 200.0)
+        self.assertFalse(result['exceeds_stock_value'])
+        self.assertEqual(result['status'], 'submitted')
+
+    def test_loss_above_stock_value_flagged(self):
+        from .models_insurance import InsuranceClaim
+
+        result = self.service.submit_claim(
+            self.policy_id, 'fire', 'Shop fire', 900,
+            incident_date=self.incident.date().isoformat(),
+        )
+        self.assertTrue(result['exceeds_stock_value'])
+        self.assertEqual(result['status'], 'under_review')
+        claim = InsuranceClaim.objects.get(pk=result['claim_id'])
+        self.assertIsNotNone(claim.assessed_at)
+        self.assertIn('exceeds stock value', claim.settlement_notes)
+
+    def test_invalid_estimated_loss_rejected(self):
+        from rest_framework.test import APIClient
+
+        client = APIClient()
+        client.force_authenticate(user=self.merchant.user)
+        for amount in ('lots', '-5', 'NaN'):
+            response = client.post('/inventory/insurance/submit-claim/', {
+                'policy_id': self.policy_id, 'claim_type': 'theft',
+                'description': 'Stolen oil', 'estimated_loss': amount,
+            })
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST, amount)
+        response = client.post('/inventory/insurance/submit-claim/', {
+            'policy_id': self.policy_id, 'claim_type': 'theft',
+            'description': 'Stolen oil', 'estimated_loss': 50,
+            'incident_date': 'last week',
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['error'],
+            'incident_date must be an ISO datetime or a YYYY-MM-DD date',
+        )
+
+    def test_approval_capped_at_stock_value(self):
+        from decimal import Decimal
+        from .models_insurance import InsuranceClaim
+
+        result = self.service.submit_claim(
+            self.policy_id, 'fire', 'Shop fire', 900,
+            incident_date=self.incident,
+        )
+        self.service.process_claim(result['claim_id'], 'approve')
+        claim = InsuranceClaim.objects.get(pk=result['claim_id'])
+        self.assertEqual(claim.approved_amount, Decimal('200.00'))
+
+
+class MerchantValuationTests(APITestCase):
+    """Test the incrementally maintained stock valuation"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='m', password='x')
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user, business_name='Shop', location='Kejetia',
+        )
+        self.rice = Product.objects.create(barcode='111', name='Rice')
+        self.item = StockItem.objects.create(
+            merchant=self.merchant, product=self.rice, quantity=10,
+            cost_price='2.50', sale_price='4.00',
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _totals(self):
+        from .models import MerchantValuation
+
+        valuation = MerchantValuation.objects.get(merchant=self.merchant)
+        return (valuation.total_quantity, float(valuation.value_at_cost),
+                float(valuation.value_at_sale))
+
+    def test_scans_and_edits_apply_deltas(self):
+        self.assertEqual(self._totals(), (10, 25.0, 40.0))
+        response = self.client.post('/inventory/scan/', {
+            'barcode': '111', 'action': 'OUT', 'source': 'ZEBRA',
+            'device_id': 'd1',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._totals(), (9, 22.5, 36.0))
+
+        item = StockItem.objects.get(pk=self.item.pk)
+        item.cost_price = 3
+        item.save()
+        self.assertEqual(self._totals(), (9, 27.0, 36.0))
+        item.delete()
+        self.assertEqual(self._totals(), (0, 0.0, 0.0))
+
+    def test_bulk_update_coalesces_deltas(self):
+        oil = StockItem.objects.create(
+            merchant=self.merchant,
+            product=Product.objects.create(barcode='222', name='Oil'),
+            quantity=1, cost_price=10, sale_price=12,
+        )
+        # Savepoint, two item reads and saves, one valuation UPDATE
+        with self.assertNumQueries(7):
+            response = self.client.post('/inventory/bulk/update/', {
+                'updates': [
+                    {'id': self.item.id, 'quantity': 20},
+                    {'id': oil.id, 'price': 15},
+                ],
+            }, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(self._totals(), (21, 60.0, 95.0))
+
+    def test_save_after_refresh_uses_fresh_basis(self):
+        stale = StockItem.objects.get(pk=self.item.pk)
+        moved_at = stale.last_movement_at
+        other = StockItem.objects.get(pk=self.item.pk)
+        other.quantity = 20
+        other.save()
+        self.assertEqual(self._totals(), (20, 50.0, 80.0))
+
+        stale.refresh_from_db()
+        stale.sale_price = 5
+        stale.save()
+        # Only the price changed since the refresh: no movement either
+        self.assertEqual(self._totals(), (20, 50.0, 100.0))
+        stale.refresh_from_db(fields=['last_movement_at'])
+        self.assertEqual(stale.last_movement_at, other.last_movement_at)
+        self.assertGreater(other.last_movement_at, moved_at)
+
+        stale.quantity = 25
+        stale.save()
+        self.assertEqual(self._totals(), (25, 62.5, 125.0))
+        self.assertGreater(stale.last_movement_at, other.last_movement_at)
+
+    def test_price_updates_roll_back_with_valuation(self):
+        from unittest import mock
+
+        response = self.client.post('/inventory/items/bulk-update-prices/', {
+            'price_updates': [{'id': self.item.id, 'price': 5}],
+        }, format='json')
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(self._totals(), (10, 25.0, 50.0))
+
+        with mock.patch('sylistockapp.valuation.apply_delta',
+                        side_effect=RuntimeError('lost connection')):
+            response = self.client.post(
+                '/inventory/items/bulk-update-prices/',
+                {'price_updates': [{'id': self.item.id, 'price': 9}]},
+                format='json',
+            )
+        self.assertEqual(response.status_code,
+                         status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.item.refresh_from_db()
+        self.assertEqual(float(self.item.sale_price), 5.0)
+        self.assertEqual(self._totals(), (10, 25.0, 50.0))
+
+    def test_reconcile_detects_and_fixes_drift(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from .valuation import reconcile
+
+        self.assertEqual(reconcile(), (1, []))
+        # Queryset updates bypass the signals
+        StockItem.objects.filter(pk=self.item.pk).update(quantity=4)
+        checked, drifted = reconcile()
+        self.assertEqual(drifted[0][0], self.merchant.id)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_valuations', stdout=io.StringIO())
+        call_command('reconcile_valuations', '--fix', stdout=io.StringIO())
+        self.assertEqual(self._totals(), (4, 10.0, 16.0))
+
+    def test_exposed_on_profile_and_reports(self):
+        expected = {'total_quantity': 10, 'value_at_cost': 25.0,
+                    'value_at_sale': 40.0}
+        response = self.client.get('/api/auth/profile/')
+        self.assertEqual(
+            response.data['merchant']['inventory_valuation'], expected
+        )
+        response = self.client.get('/inventory/reports/performance/')
+        self.assertEqual(response.data['inventory_valuation'], expected)
+
+
+class CreditMetricsTests(APITestCase):
+    """Test the batch credit metrics engine"""
+
+    def setUp(self):
+        from datetime import date, datetime, time, timedelta
+        from django.utils import timezone
+
+        self.as_of = date(2024, 10, 15)  # Peak harvest season
+        day_start = timezone.make_aware(datetime.combine(self.as_of,
+                                                         time(9)))
+        self.user = User.objects.create_user(username='m', password='x')
+        self.active, self.idle = [
+            MerchantProfile.objects.create(
+                user=user, business_name=name, location='Madina',
+            )
+            for user, name in [
+                (self.user, 'Busy'),
+                (User.objects.create_user(username='i', password='x'),
+                 'Idle'),
+            ]
+        ]
+        MerchantProfile.objects.update(created_at=day_start - timedelta(
+            days=400
+        ))
+        products = [
+            Product.objects.create(barcode=str(i), name=f'P{i}')
+            for i in range(3)
+        ]
+        for product in products:
+            StockItem.objects.create(
+                merchant=self.active, product=product, quantity=40,
+                cost_price=100, sale_price=150,
+            )
+
+        def log(product, change, when):
+            entry = InventoryLog.objects.create(
+                merchant=self.active, product=product,
+                action='OUT' if change < 0 else 'IN',
+                quantity_changed=change, source='ZEBRA', device_id='d1',
+            )
+            InventoryLog.objects.filter(pk=entry.pk).update(timestamp=when)
+
+        # 2 sales a day on 20 of the last 28 days, across 3 products
+        for day in range(20):
+            log(products[day % 3], -2, day_start - timedelta(days=day))
+        # After the scored day: must not change its score
+        log(products[0], -30, day_start + timedelta(days=2))
+
+    def test_scoring_functions(self):
+        import numpy as np
+        from .services.credit_metrics import (
+            component_points, credit_scores, credit_tiers,
+        )
+
+        points = component_points(
+            units_sold=[0, 300, 600], units_on_hand=[0, 300, 100],
+            active_days=[0, 14, 28], products_sold=[0, 5, 12],
+            active=[False, True, True], month=12,
+        )
+        np.testing.assert_allclose(points[0], [0, 0, 0, 0, 0])
+        np.testing.assert_allclose(points[2], [200, 150, 100, 50, 50])
+        np.testing.assert_allclose(points[1], [200, 150, 50, 25, 50])
+        scores = credit_scores(points)
+        self.assertEqual(scores[0], 300)
+        self.assertEqual(scores[2], 850)
+        self.assertEqual(list(credit_tiers([300, 560, 750, 850])),
+                         ['very_poor', 'poor', 'excellent', 'excellent'])
+
+    def test_batch_run_is_reproducible(self):
+        from .models import CreditMetrics
+        from .services.credit_metrics import CreditMetricsEngine
+
+        summary = CreditMetricsEngine(as_of=self.as_of).run()
+        self.assertEqual(summary['written'], 2)
+        busy = CreditMetrics.objects.get(merchant=self.active)
+        # 120 on hand now, plus the 30 sold after the scored day
+        self.assertEqual(busy.features['units_on_hand'], 150)
+        self.assertEqual(busy.features['units_sold'], 40)
+        self.assertEqual(busy.features['active_days'], 20)
+        self.assertEqual(busy.features['inventory_value'], 15000)
+        self.assertEqual(busy.diversity, 15)
+        self.assertEqual(busy.seasonality, 42.86)
+        idle = CreditMetrics.objects.get(merchant=self.idle)
+        self.assertEqual((idle.credit_score, idle.credit_tier),
+                         (300, 'very_poor'))
+        self.assertEqual(idle.recommended_loan, 0)
+
+        CreditMetricsEngine(as_of=self.as_of).run()
+        self.assertEqual(CreditMetrics.objects.count(), 2)
+        self.assertEqual(
+            CreditMetrics.objects.get(merchant=self.active).credit_score,
+            busy.credit_score,
+        )
+
+    def test_stock_comes_from_snapshot_before_cutoff(self):
+        from datetime import datetime, time, timedelta
+        from django.utils import timezone
+        from .models import CreditMetrics
+        from .services.credit_metrics import CreditMetricsEngine
+        from .services.stock_history import StockHistoryService
+
+        # 120 on hand half a day before the last sale (2 units) counted
+        day_start = timezone.make_aware(datetime.combine(self.as_of,
+                                                         time(9)))
+        StockHistoryService().take_snapshots(
+            now=day_start - timedelta(hours=12)
+        )
+        CreditMetricsEngine(as_of=self.as_of).run()
+        busy = CreditMetrics.objects.get(merchant=self.active)
+        self.assertEqual(busy.features['units_on_hand'], 118)
+        self.assertEqual(busy.features['inventory_value'], 11800)
+
+        # Edits without a log, and new prices, leave the day alone
+        StockItem.objects.update(quantity=5, cost_price=999)
+        CreditMetricsEngine(as_of=self.as_of).run()
+        rerun = CreditMetrics.objects.get(merchant=self.active)
+        self.assertEqual(rerun.features, busy.features)
+        self.assertEqual(rerun.recommended_loan, busy.recommended_loan)
+
+    def test_command_and_endpoint(self):
+        from django.core.management import call_command
+
+        out = io.StringIO()
+        call_command('compute_credit_metrics', '--date', '2024-10-15',
+                     stdout=out)
+        self.assertIn('Scored and stored 2 merchants', out.getvalue())
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/inventory/reports/credit-score/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['as_of'], self.as_of)
+        self.assertEqual(response.data['engine_version'], '1.1')
+        self.assertGreater(response.data['credit_score'], 300)
+        response = self.client.get('/inventory/reports/credit-score/',
+                                   {'as_of': '2024-10-01'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ScoreHistoryTests(APITestCase):
+    """Test bankability score history recording and downsampling"""
+
+    def setUp(self):
+        from datetime import datetime
+        from django.utils import timezone
+
+        self.now = timezone.make_aware(datetime(2024, 6, 15, 12))
+        self.user = User.objects.create_user(username='m', password='x')
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user, business_name='Shop', location='Madina',
+            business_age=400,
+        )
+
+    def _add(self, days_ago, score, merchant=None):
+        from datetime import timedelta
+        from .models import BankabilityScorePoint
+
+        return BankabilityScorePoint.objects.create(
+            merchant=merchant or self.merchant, score=score,
+            recorded_at=self.now - timedelta(days=days_ago),
+        )
+
+    def test_point_recorded_only_on_change(self):
+        self.merchant.update_bankability_score()
+        self.merchant.update_bankability_score()
+        history = self.merchant.score_history.all()
+        self.assertEqual(history.count(), 1)
+        self.assertEqual(history[0].score, self.merchant.bankability_score)
+
+    def test_downsample_keeps_closing_points(self):
+        from .services.score_history import ScoreHistoryService
+
+        for hours in range(0, 48, 6):       # Recent: all kept
+            self._add(hours / 24, 50 + hours)
+        self._add(30.45, 10)                # Same day: only 11 closes
+        self._add(30.05, 11)
+        self._add(400.2, 20)                # Same month: 30 closes
+        self._add(400, 30)
+        self._add(200, 25)                  # Closes at 30 again: dropped
+        self._add(199.5, 30)
+
+        service = ScoreHistoryService(raw_days=7, daily_days=90,
+                                      weekly_days=365)
+        deleted = service.downsample(now=self.now)
+        scores = [point['score'] for point in service.series(
+            self.merchant.pk
+        )]
+        self.assertEqual(scores[:2], [30.0, 11.0])
+        self.assertEqual(len(scores), 2 + 8)
+        self.assertEqual(deleted, 4)
+        self.assertEqual(service.downsample(now=self.now), 0)
+
+    def test_range_and_sparkline_endpoints(self):
+        from datetime import timedelta
+
+        other = MerchantProfile.objects.create(
+            user=User.objects.create_user(username='o', password='x'),
+            business_name='Other', location='Madina',
+        )
+        self._add(10, 40)
+        self._add(3, 45)
+        self._add(1, 50)
+        self._add(2, 70, merchant=other)
+
+        self.client.force_authenticate(user=self.user)
+        start = (self.now - timedelta(days=5)).date().isoformat()
+        response = self.client.get('/inventory/reports/score-history/',
+                                   {'start': start})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The point in effect at the start leads the series
+        self.assertEqual([p['score'] for p in response.data['points']],
+                         [40.0, 45.0, 50.0])
+
+        response = self.client.get(
+            '/inventory/reports/score-history/sparklines/',
+            {'merchant_id': [self.merchant.pk, other.pk]},
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        with self.assertNumQueries(1):
+            from .services.score_history import ScoreHistoryService
+            lines = ScoreHistoryService().sparklines(
+                [self.merchant.pk, other.pk],
+                start=self.now - timedelta(days=5),
+            )
+        self.assertEqual(lines[other.pk]['scores'], [70.0])
+        response = self.client.get(
+            '/inventory/reports/score-history/sparklines/',
+            {'merchant_id': [self.merchant.pk, other.pk], 'start': start},
+        )
+        self.assertEqual(
+            response.data['merchants'][str(self.merchant.pk)]['scores'],
+            [40.0, 45.0, 50.0],
+        )
+
+
+class PeerRankingTests(APITestCase):
+    """Test market normalization and per-market percentile ranks"""
+
+    def setUp(self):
+        locations = ['Madina Market', 'madina mkt', 'MADINA', 'Marché Madina',
+                     'Kaloum', '  ']
+        self.merchants = []
+        for i, location in enumerate(locations):
+            merchant = MerchantProfile.objects.create(
+                user=User.objects.create_user(username=f'm{i}',
+                                              password='x'),
+                business_name=f'Shop {i}', location=location,
+            )
+            MerchantProfile.objects.filter(pk=merchant.pk).update(
+                bankability_score=10 * i
+            )
+            self.merchants.append(merchant)
+        product = Product.objects.create(barcode='1', name='Rice')
+        for merchant, quantity in zip(self.merchants, [5, 5, 50, 0, 9]):
+            StockItem.objects.create(merchant=merchant, product=product,
+                                     quantity=quantity, cost_price=10)
+
+    def test_normalize_location(self):
+        from .services.peer_ranking import normalize_location
+
+        self.assertEqual(normalize_location('Marché de Madina'), 'madina')
+        self.assertEqual(normalize_location(' Madina  Market '), 'madina')
+        self.assertEqual(normalize_location('Kejetia-Market, Kumasi'),
+                         'kejetia-kumasi')
+        self.assertEqual(normalize_location('Market'), '')
+
+    def test_percentile_ranks_within_groups(self):
+        from .services.peer_ranking import percentile_ranks
+
+        ranks = percentile_ranks([3, 1, 2, 2, 7, 5], [1, 1, 1, 1, 2, 2])
+        self.assertEqual(ranks.tolist(), [87.5, 12.5, 50.0, 50.0, 75.0,
+                                          25.0])
+        self.assertEqual(percentile_ranks([4], [9]).tolist(), [50.0])
+
+    def test_rerun_for_earlier_day_uses_its_window(self):
+        from datetime import date, datetime, time, timedelta
+        from django.utils import timezone
+        from .models import MerchantPeerRank
+        from .services.peer_ranking import PeerRankingService
+
+        day = date(2024, 3, 31)
+        noon = timezone.make_aware(datetime.combine(day, time(12)))
+        product = Product.objects.get(barcode='1')
+        for merchant, days_ago, units in [
+            (self.merchants[0], 0, 60),    # In the window
+            (self.merchants[1], 40, 90),   # Before it
+            (self.merchants[2], -1, 90),   # After the day
+        ]:
+            entry = InventoryLog.objects.create(
+                merchant=merchant, product=product, action='OUT',
+                quantity_changed=-units, source='MANUAL', device_id='d',
+            )
+            InventoryLog.objects.filter(pk=entry.pk).update(
+                timestamp=noon - timedelta(days=days_ago)
+            )
+
+        PeerRankingService().run(today=day)
+        velocity = dict(MerchantPeerRank.objects.filter(
+            as_of=day
+        ).values_list('merchant_id', 'sales_velocity'))
+        self.assertEqual(velocity[self.merchants[0].id], 2.0)
+        self.assertEqual(velocity[self.merchants[1].id], 0.0)
+        self.assertEqual(velocity[self.merchants[2].id], 0.0)
+
+    def test_nightly_run_and_profile(self):
+        from django.core.management import call_command
+        from .models import Market, MerchantPeerRank
+
+        out = io.StringIO()
+        call_command('rank_merchants', stdout=out)
+        self.assertIn('Ranked 5 merchants in 2 markets (1 without',
+                      out.getvalue())
+        madina = Market.objects.get(slug='madina')
+        self.assertEqual(madina.merchant_count, 4)
+        self.assertEqual(madina.distribution['stock_value']['p50'], 50.0)
+
+        rank = MerchantPeerRank.objects.get(merchant=self.merchants[2])
+        self.assertEqual(rank.market_size, 4)
+        self.assertEqual(rank.stock_value_percentile, 87.5)
+        self.assertEqual(rank.bankability_percentile, 62.5)
+
+        self.client.force_authenticate(user=self.merchants[2].user)
+        with self.assertNumQueries(2):  # Valuation and rank by key
+            response = self.client.get('/api/auth/profile/')
+        peer_rank = response.data['merchant']['peer_rank']
+        self.assertEqual(peer_rank['market'], 'Madina')
+        self.assertEqual(peer_rank['percentiles']['stock_value'], 87.5)
+
+        # Moving away drops the stale rank on the next run
+        MerchantProfile.objects.filter(pk=self.merchants[2].pk).update(
+            location='market'
+        )
+        call_command('rank_merchants', stdout=out)
+        self.assertFalse(MerchantPeerRank.objects.filter(
+            merchant=self.merchants[2]
+        ).exists())
+
+
+class ScanAnomalyTests(APITestCase):
+    """Test the streaming scan anomaly detector"""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user(username='m', password='x')
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user, business_name='Shop', location='Madina',
+        )
+        Product.objects.create(barcode='111', name='Rice')
+        self.client.force_authenticate(user=self.user)
+
+    def _replay(self, scans):
+        from .services.scan_anomaly import update_scan_stats
+
+        state, flagged = None, []
+        for at, action, product in scans:
+            state, reasons = update_scan_stats(state, action, product, at)
+            flagged.append(reasons)
+        return state, flagged
+
+    def test_normal_restocking_not_flagged(self):
+        gaps = [3, 17, 5, 40, 8, 2, 25, 11, 6, 60]
+        at, scans = 0.0, []
+        for i in range(60):
+            at += gaps[i % len(gaps)]
+            scans.append((at, 'IN' if i < 40 else 'OUT', i % 15))
+        _state, flagged = self._replay(scans)
+        self.assertFalse(any(flagged))
+
+    def test_pingpong_and_robotic_timing_flagged(self):
+        _state, flagged = self._replay([
+            (i * 7.0 + (i % 3), 'IN' if i % 2 else 'OUT', 1)
+            for i in range(20)
+        ])
+        self.assertEqual(flagged[5], [])
+        self.assertIn('in_out_pingpong', flagged[-1])
+
+        state, flagged = self._replay([
+            (i * 5.0, 'IN', i) for i in range(25)
+        ])
+        self.assertEqual(flagged[-1], ['regular_timing'])
+        self.assertEqual(state['n'], 25)
+        self.assertAlmostEqual(state['interval_mean'], 5.0)
+
+    def test_rotating_device_ids_still_flagged(self):
+        from .services.scan_anomaly import ScanAnomalyDetector
+
+        product = Product.objects.get(barcode='111')
+        for i in range(30):
+            response = self.client.post('/inventory/scan/', {
+                'barcode': '111', 'action': 'OUT' if i % 2 else 'IN',
+                'source': 'PHONE', 'device_id': f'phone-{i % 20}',
+            })
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        detector = ScanAnomalyDetector()
+        self.assertEqual(detector.stats(self.merchant.pk, 'phone-0')['n'], 2)
+        self.assertEqual(
+            detector.product_stats(self.merchant.pk, product.pk)['n'], 30
+        )
+        self.assertEqual(InventoryLog.objects.filter(
+            merchant=self.merchant, is_suspicious=True
+        ).count(), 21)
+
+    def test_rejected_scans_not_observed(self):
+        from .services.scan_anomaly import ScanAnomalyDetector
+
+        product = Product.objects.get(barcode='111')
+        for _ in range(5):
+            response = self.client.post('/inventory/scan/', {
+                'barcode': '111', 'action': 'OUT', 'source': 'PHONE',
+                'device_id': 'empty-shelf',
+            })
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+        detector = ScanAnomalyDetector()
+        self.assertIsNone(detector.stats(self.merchant.pk, 'empty-shelf'))
+        self.assertIsNone(
+            detector.product_stats(self.merchant.pk, product.pk)
+        )
+
+    def test_slow_reversals_are_not_pingpong(self):
+        _state, flagged = self._replay([
+            (i * 3600.0, 'IN' if i % 2 else 'OUT', 1) for i in range(20)
+        ])
+        self.assertFalse(any(flagged))
+
+    def test_scan_loop_flagged_and_discounted(self):
+        from django.test import override_settings
+        from decimal import Decimal
+        from .services.scan_anomaly import ScanAnomalyDetector
+
+        for i in range(30):
+            response = self.client.post('/inventory/scan/', {
+                'barcode': '111', 'action': 'OUT' if i % 2 else 'IN',
+                'source': 'PHONE', 'device_id': 'loop-phone',
+            })
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        logs = InventoryLog.objects.filter(merchant=self.merchant)
+        self.assertEqual(logs.filter(is_suspicious=True).count(), 21)
+        stats = ScanAnomalyDetector().stats(self.merchant.pk, 'loop-phone')
+        self.assertEqual(stats['n'], 30)
+
+        self.merchant.refresh_from_db()
+        # 9 clean scans earn no activity points; all 30 would earn 10
+        self.assertEqual(self.merchant.bankability_score, 0)
+        with override_settings(SCAN_ANOMALY_DISCOUNT=False):
+            self.merchant.update_bankability_score()
+        self.assertEqual(self.merchant.bankability_score, Decimal('10'))
+
+
+class ProductAnalyticsTests(APITestCase):
+    """Test the per-product analytics report"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+
+        cache.clear()
+        self.user = User.objects.create_user(username='m', password='x')
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user, business_name='Shop', location='Madina',
+        )
+        self.products = {}
+        for name, price, on_hand, sold in [
+            ('Oil', 100, 50, 50),      # Revenue 5000
+            ('Salt', 10, 100, 200),    # Revenue 2000, most units
+            ('Rice', 50, 10, 30),      # Revenue 1500
+            ('Soap', 20, 20, 0),       # Unsold
+        ]:
+            product = Product.objects.create(barcode=name, name=name)
+            self.products[name] = product
+            StockItem.objects.create(
+                merchant=self.merchant, product=product, quantity=on_hand,
+                cost_price=price / 2, sale_price=price,
+            )
+            if sold:
+                InventoryLog.objects.create(
+                    merchant=self.merchant, product=product, action='OUT',
+                    quantity_changed=-sold, source='ZEBRA',
+                    device_id='d1',
+                )
+        # Outside a 30-day period
+        old = InventoryLog.objects.create(
+            merchant=self.merchant, product=self.products['Rice'],
+            action='OUT', quantity_changed=-500, source='ZEBRA',
+            device_id='d1',
+        )
+        InventoryLog.objects.filter(pk=old.pk).update(
+            timestamp=timezone.now() - timedelta(days=40)
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_ranks_classes_and_cover(self):
+        from .services.product_analytics import ProductAnalyticsService
+
+        report = ProductAnalyticsService(self.merchant.pk, top=2).analyze()
+        products = {p['name']: p for p in report['products']}
+
+        self.assertEqual(report['total_units'], 280)
+        self.assertEqual(report['total_revenue'], 8500)
+        self.assertEqual(
+            [p['name'] for p in report['top_by_units']], ['Salt', 'Oil']
+        )
+        self.assertEqual(
+            [p['name'] for p in report['top_by_revenue']], ['Oil', 'Salt']
+        )
+        # Shares before each product: 0%, 59%, 82%; unsold is always C
+        self.assertEqual(
+            {name: p['abc_class'] for name, p in products.items()},
+            {'Oil': 'A', 'Salt': 'A', 'Rice': 'B', 'Soap': 'C'},
+        )
+        self.assertEqual(report['abc_summary']['A'],
+                         {'products': 2, 'revenue': 7000})
+
+        # 50 sold in 14 days with 50 on hand: two weeks of cover
+        self.assertEqual(products['Oil']['days_of_cover'], 14.0)
+        self.assertIsNone(products['Soap']['days_of_cover'])
+        # Opening stock 100, closing 50: 50 sold over an average of 75
+        self.assertEqual(products['Oil']['turnover'], 0.67)
+        self.assertEqual(products['Soap']['turnover'], 0)
+
+    def test_endpoint_cached_per_period(self):
+        with self.assertNumQueries(1):
+            first = self.client.get('/inventory/reports/products/')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first.data['top_by_units']), 3)
+
+        InventoryLog.objects.create(
+            merchant=self.merchant, product=self.products['Soap'],
+            action='OUT', quantity_changed=-5, source='ZEBRA',
+            device_id='d1',
+        )
+        with self.assertNumQueries(0):
+            cached = self.client.get('/inventory/reports/products/')
+        self.assertEqual(cached.data['total_units'], 280)
+
+        fresh = self.client.get('/inventory/reports/products/?days=60')
+        self.assertEqual(fresh.data['total_units'], 785)
+
+    def test_invalid_period_rejected(self):
+        response = self.client.get('/inventory/reports/products/?days=0')
+        self.assertEqual(response.status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/inventory/reports/products/?top=x')
+        self.assertEqual(response.status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class DeadStockTests(APITestCase):
+    """Test last-movement stamping and the dead-stock report"""
+
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        self.user = User.objects.create_user(username='m', password='x')
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user, business_name='Shop', location='Madina',
+        )
+        now = timezone.now()
+        self.items = {}
+        for name, idle_days, sold in [
+            ('Fresh', 5, True),
+            ('Slow', 45, True),
+            ('Stale', 120, True),
+            ('Never', 200, False),
+        ]:
+            product = Product.objects.create(barcode=name, name=name)
+            item = StockItem.objects.create(
+                merchant=self.merchant, product=product, quantity=10,
+                cost_price=100, sale_price=150,
+            )
+            when = now - timedelta(days=idle_days)
+            StockItem.objects.filter(pk=item.pk).update(
+                created_at=when - timedelta(days=1),
+                last_sold_at=when if sold else None,
+            )
+            self.items[name] = item
+        self.client.force_authenticate(user=self.user)
+
+    def test_write_paths_stamp_movement(self):
+        item = self.items['Fresh']
+        StockItem.objects.filter(pk=item.pk).update(
+            last_sold_at=None, last_movement_at=None
+        )
+        response = self.client.post('/inventory/scan/', {
+            'barcode': 'Fresh', 'action': 'OUT', 'source': 'PHONE',
+            'device_id': 'd1',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item.refresh_from_db()
+        self.assertIsNotNone(item.last_sold_at)
+        self.assertIsNotNone(item.last_movement_at)
+
+        # Adjustments move stock but are not sales
+        sold_at = item.last_sold_at
+        response = self.client.put(
+            f'/inventory/items/update/{item.pk}/', {'quantity': 3}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item.refresh_from_db()
+        self.assertEqual(item.last_sold_at, sold_at)
+        self.assertGreater(item.last_movement_at, sold_at)
+
+        # Price-only changes are not movements
+        moved_at = item.last_movement_at
+        item = StockItem.objects.get(pk=item.pk)
+        item.sale_price = 175
+        item.save()
+        item.refresh_from_db()
+        self.assertEqual(item.last_movement_at, moved_at)
+
+    def test_dead_stock_buckets(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/inventory/alerts/dead-stock/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+
+        self.assertEqual(data['items_count'], 3)
+        self.assertEqual(data['tied_up_capital'], 3000)
+        self.assertEqual(
+            [(b['age_days'], b['items']) for b in data['age_buckets']],
+            [('30-59', 1), ('60-89', 0), ('90-179', 1), ('180+', 1)],
+        )
+        self.assertEqual([item['name'] for item in data['items']],
+                         ['Never', 'Stale', 'Slow'])
+        self.assertEqual(data['items'][0]['idle_days'], 201)
+
+        response = self.client.get('/inventory/alerts/dead-stock/?days=100')
+        self.assertEqual(
+            [(b['age_days'], b['items']) for b in response.data[
+                'age_buckets'
+            ]],
+            [('100-179', 1), ('180+', 1)],
+        )
+
+    def test_stock_items_sorted_by_last_sale(self):
+        response = self.client.get('/inventory/items/?sort=slow_movers')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['items']],
+                         ['Never', 'Stale', 'Slow', 'Fresh'])
+
+        response = self.client.get('/inventory/items/?sort=bogus')
+        self.assertEqual(response.status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class DemandForecastTests(APITestCase):
+    """Test vectorized demand forecasting and reorder suggestions"""
+
+    def setUp(self):
+        from datetime import datetime, time, timedelta
+        from django.core.cache import cache
+        from django.utils import timezone
+
+        cache.clear()
+        self.user = User.objects.create_user(username='m', password='x')
+        self.merchant = MerchantProfile.objects.create(
+            user=self.user, business_name='Shop', location='Madina',
+        )
+        yesterday = timezone.localdate() - timedelta(days=1)
+        products = {}
+        for name, on_hand in [('Bread', 50), ('Paint', 1), ('Nails', 9)]:
+            products[name] = Product.objects.create(barcode=name, name=name)
+            StockItem.objects.create(
+                merchant=self.merchant, product=products[name],
+                quantity=on_hand, cost_price=10, sale_price=15,
+            )
+
+        logs = []
+        for day in range(90):
+            when = timezone.make_aware(datetime.combine(
+                yesterday - timedelta(days=day), time(12)
+            ))
+            # Bread sells 10 a day; Paint 2 units every 10th day
+            sales = [('Bread', 10)] + ([('Paint', 2)] if day % 10 == 0
+                                       else [])
+            for name, units in sales:
+                logs.append((InventoryLog(
+                    merchant=self.merchant, product=products[name],
+                    action='OUT', quantity_changed=-units, source='ZEBRA',
+                    device_id='d1',
+                ), when))
+        InventoryLog.objects.bulk_create([log for log, _when in logs])
+        created = list(InventoryLog.objects.order_by('pk'))
+        for log, (_log, when) in zip(created, logs):
+            log.timestamp = when
+        InventoryLog.objects.bulk_update(created, ['timestamp'])
+        self.client.force_authenticate(user=self.user)
+
+    def test_models(self):
+        import numpy as np
+        from .services.demand_forecast import croston, reorder_levels, ses
+
+        demand = np.zeros((2, 40))
+        demand[0] = 5
+        demand[1, 3::4] = 4  # 4 units every 4th day
+        level, rmse = ses(demand)
+        self.assertAlmostEqual(level[0], 5)
+        self.assertAlmostEqual(rmse[0], 0)
+        # Bias-corrected: (1 - alpha / 2) * 4 units / 4 days
+        self.assertAlmostEqual(croston(demand)[1], 0.9)
+        self.assertEqual(croston(np.zeros((1, 10)))[0], 0)
+
+        points, up_to = reorder_levels([2.0, 0.0], [0.0, 0.0])
+        self.assertEqual(points.tolist(), [14, 0])
+        self.assertEqual(up_to.tolist(), [28, 0])
+
+    def test_forecast_picks_method_per_product(self):
+        from .services.demand_forecast import DemandForecaster
+
+        forecast = DemandForecaster().forecast(self.merchant.pk)
+        by_name = dict(zip(
+            Product.objects.order_by('pk').values_list('name', flat=True),
+            zip(forecast['method'], forecast['daily_demand'],
+                forecast['reorder_point'], forecast['order_up_to']),
+        ))
+        self.assertEqual(by_name['Bread'], ('ses', 10.0, 70, 140))
+        self.assertEqual(by_name['Paint'][:2], ('croston', 0.18))
+        self.assertEqual(by_name['Nails'], ('croston', 0.0, 0, 0))
+
+    def test_nightly_run_serves_endpoint(self):
+        from django.core.management import call_command
+        from .models import ReorderSuggestion
+
+        stdout = io.StringIO()
+        call_command('forecast_demand', stdout=stdout)
+        self.assertIn('Forecast and stored 3 products of 1 merchants',
+                      stdout.getvalue())
+        self.assertEqual(ReorderSuggestion.objects.count(), 3)
+
+        response = self.client.get('/inventory/alerts/reorder/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bread, paint = response.data['suggestions']
+        self.assertEqual((bread['name'], bread['suggested_quantity']),
+                         ('Bread', 90))
+        self.assertEqual(bread['days_of_cover'], 5.0)
+        self.assertEqual(paint['name'], 'Paint')
+
+        # Levels are cached; only today's stock is read again
+        StockItem.objects.filter(product__name='Bread').update(quantity=200)
+        with self.assertNumQueries(1):
+            response = self.client.get('/inventory/alerts/reorder/')
+        self.assertEqual([s['name'] for s in response.data['suggestions']],
+                         ['Paint'])
+
+    def test_endpoint_forecasts_on_demand(self):
+        from .models import ReorderSuggestion
+
+        response = self.client.get('/inventory/alerts/reorder/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertFalse(ReorderSuggestion.objects.exists())
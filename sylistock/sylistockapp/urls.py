@@ -6,14 +6,21 @@ from .views_production import (
     update_stock_item,
     get_stock_items,
     inventory_history,
+    stock_as_of,
 )
 from .views_alerts import (
     low_stock_alerts,
+    dead_stock_alerts,
+    reorder_suggestions,
     set_stock_alert_threshold,
 )
 from .views_reporting import (
     sales_report,
     merchant_performance,
+    credit_score,
+    score_history,
+    score_sparklines,
+    product_analytics,
 )
 from .views_stock_management import (
     search_items,
@@ -23,11 +30,13 @@ from .views_stock_management import (
 from .views_bulk_operations import (
     bulk_import_inventory,
     export_inventory,
+    export_lender_data,
     bulk_update_inventory,
 )
 from .views_kyc import (
     initiate_kyc,
     upload_kyc_document,
+    get_kyc_document_status,
     add_bank_account,
     perform_compliance_checks,
     evaluate_kyc_application,
@@ -35,6 +44,7 @@ from .views_kyc import (
     get_kyc_documents,
     get_bank_accounts,
     get_compliance_checks,
+    get_kyc_review_queue,
     expire_kyc_verification,
     renew_kyc_verification,
 )
@@ -42,6 +52,8 @@ from .views_insurance import (
     calculate_premium,
     assess_risk,
     create_insurance_policy,
+    bulk_create_insurance_policies,
+    get_premium_aging_report,
     submit_claim,
     process_claim,
     get_policy_details,
@@ -50,6 +62,8 @@ from .views_insurance import (
     get_policy_premiums,
     get_merchant_risk_assessment,
 )
+from . import views_async
+from .views_metrics import runtime_metrics
 from .views_categories import (
     list_categories,
     create_category,
@@ -70,29 +84,56 @@ urlpatterns = [
          name='remove-stock-item'),
     path('items/search/', search_items, name='search-items'),
     path('items/history/', inventory_history, name='inventory-history'),
+    path('items/as-of/', stock_as_of, name='stock-as-of'),
     path('items/bulk-update-prices/', bulk_update_prices,
          name='bulk-update-prices'),
     path('items/<int:item_id>/', get_item_details, name='item-details'),
 
     # Alerts
     path('alerts/low-stock/', low_stock_alerts, name='low-stock-alerts'),
+    path('alerts/dead-stock/', dead_stock_alerts,
+         name='dead-stock-alerts'),
+    path('alerts/reorder/', reorder_suggestions,
+         name='reorder-suggestions'),
     path('alerts/threshold/', set_stock_alert_threshold,
          name='set-alert-threshold'),
 
     # Reports
     path('reports/sales/', sales_report, name='sales-report'),
+    path('reports/products/', product_analytics,
+         name='product-analytics'),
     path('reports/performance/', merchant_performance,
          name='performance-report'),
+    path('reports/credit-score/', credit_score, name='credit-score'),
+    path('reports/score-history/', score_history, name='score-history'),
+    path('reports/score-history/sparklines/', score_sparklines,
+         name='score-sparklines'),
+
+    # Async (ASGI) read endpoints
+    path('async/items/', views_async.get_stock_items,
+         name='async-stock-items'),
+    path('async/items/search/', views_async.search_items,
+         name='async-search-items'),
+    path('async/alerts/low-stock/', views_async.low_stock_alerts,
+         name='async-low-stock-alerts'),
+    path('async/reports/sales/', views_async.sales_report,
+         name='async-sales-report'),
+    path('async/reports/performance/', views_async.merchant_performance,
+         name='async-performance-report'),
 
     # Bulk operations
     path('bulk/import/', bulk_import_inventory, name='bulk-import'),
     path('bulk/export/', export_inventory, name='bulk-export'),
+    path('bulk/export-lender/', export_lender_data,
+         name='bulk-export-lender'),
     path('bulk/update/', bulk_update_inventory, name='bulk-update'),
 
     # KYC (Know Your Customer)
     path('kyc/initiate/', initiate_kyc, name='kyc-initiate'),
     path('kyc/upload-document/', upload_kyc_document,
          name='kyc-upload-document'),
+    path('kyc/document-status/<uuid:document_id>/',
+         get_kyc_document_status, name='kyc-document-status'),
     path('kyc/add-bank-account/', add_bank_account,
          name='kyc-add-bank-account'),
     path('kyc/compliance-checks/', perform_compliance_checks,
@@ -107,6 +148,8 @@ urlpatterns = [
          name='kyc-bank-accounts'),
     path('kyc/compliance/<uuid:kyc_id>/', get_compliance_checks,
          name='kyc-compliance'),
+    path('kyc/review-queue/', get_kyc_review_queue,
+         name='kyc-review-queue'),
     path('kyc/expire/', expire_kyc_verification,
          name='kyc-expire'),
     path('kyc/renew/', renew_kyc_verification,
@@ -119,6 +162,8 @@ urlpatterns = [
          name='insurance-assess-risk'),
     path('insurance/create-policy/', create_insurance_policy,
          name='insurance-create-policy'),
+    path('insurance/bulk-create-policies/', bulk_create_insurance_policies,
+         name='insurance-bulk-create-policies'),
     path('insurance/submit-claim/', submit_claim,
          name='insurance-submit-claim'),
     path('insurance/process-claim/', process_claim,
@@ -134,6 +179,11 @@ urlpatterns = [
     path('insurance/merchant/<int:merchant_id>/risk/',
          get_merchant_risk_assessment,
          name='insurance-risk-assessment'),
+    path('insurance/premium-aging/', get_premium_aging_report,
+         name='insurance-premium-aging'),
+
+    # Operations
+    path('metrics/', runtime_metrics, name='runtime-metrics'),
 
     # Categories
     path('categories/', list_categories, name='list-categories'),
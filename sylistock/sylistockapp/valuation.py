@@ -0,0 +1,201 @@
+"""
+Per-merchant inventory valuation maintained incrementally.
+
+``MerchantValuation`` holds each merchant's total units and stock value
+at cost and at sale price. StockItem remembers the values it was loaded
+with (``from_db``, ``refresh_from_db``), and the save/delete receivers turn
+every change into a delta applied with one ``F()`` UPDATE, so reading a
+merchant's stock value never scans their StockItems.
+
+Bulk paths wrap their loop in ``valuation_batch()`` to coalesce deltas
+into one UPDATE per merchant. ``QuerySet.update()``/``bulk_update()``
+on StockItem bypass the receivers: call ``recompute()`` after them.
+``reconcile()`` (and the ``reconcile_valuations`` command) checks the
+stored totals against a full SQL recomputation.
+"""
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import MerchantValuation, StockItem
+
+ZERO_BASIS = (0, Decimal('0'), Decimal('0'))
+
+_local = threading.local()
+
+
+def _contribution(basis):
+    quantity, cost, sale = basis
+    return (quantity, quantity * cost, quantity * sale)
+
+
+def _queue(merchant_id, delta):
+    """Apply ``delta`` now, or add it to the open batch; None recomputes"""
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        if delta is None:
+            recompute([merchant_id])
+        else:
+            apply_delta(merchant_id, *delta)
+        return
+    if delta is None or pending.get(merchant_id, ()) is None:
+        pending[merchant_id] = None
+    else:
+        current = pending.get(merchant_id, ZERO_BASIS)
+        pending[merchant_id] = tuple(a + b for a, b in zip(current, delta))
+
+
+def track_stock_item_save(sender, instance, created, raw=False, **kwargs):
+    """post_save receiver: apply the change in the item's valuation"""
+    if raw:
+        return
+    new = instance.valuation_basis()
+    old = ZERO_BASIS if created else getattr(
+        instance, '_valuation_basis', None
+    )
+    if new is None or old is None:
+        # Loaded without all valued fields: the delta is unknown
+        _queue(instance.merchant_id, None)
+    elif new != old:
+        _queue(instance.merchant_id, tuple(
+            n - o for n, o in zip(_contribution(new), _contribution(old))
+        ))
+    instance._valuation_basis = new
+
+
+def track_stock_item_delete(sender, instance, **kwargs):
+    """post_delete receiver: remove the item's stored contribution"""
+    old = getattr(instance, '_valuation_basis', None)
+    if old is None:
+        _queue(instance.merchant_id, None)
+    else:
+        _queue(instance.merchant_id,
+               tuple(-value for value in _contribution(old)))
+
+
+def apply_delta(merchant_id, quantity, cost_value, sale_value):
+    """Add a change to a merchant's totals, creating the row if needed"""
+    updated = MerchantValuation.objects.filter(
+        merchant_id=merchant_id
+    ).update(
+        total_quantity=F('total_quantity') + quantity,
+        value_at_cost=F('value_at_cost') + cost_value,
+        value_at_sale=F('value_at_sale') + sale_value,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        return
+    # First change for this merchant: value everything it holds
+    totals = _totals([merchant_id]).get(merchant_id, ZERO_BASIS)
+    try:
+        with transaction.atomic():
+            MerchantValuation.objects.create(
+                merchant_id=merchant_id, total_quantity=totals[0],
+                value_at_cost=totals[1], value_at_sale=totals[2],
+            )
+    except IntegrityError:
+        # Created concurrently from a snapshot without our change
+        apply_delta(merchant_id, quantity, cost_value, sale_value)
+
+
+@contextmanager
+def valuation_batch():
+    """Coalesce valuation deltas until the block exits cleanly"""
+    if getattr(_local, 'pending', None) is not None:
+        yield  # Nested: the outermost batch flushes
+        return
+    _local.pending = {}
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+    stale = [m for m, delta in pending.items() if delta is None]
+    for merchant_id, delta in pending.items():
+        if delta is not None and any(delta):
+            apply_delta(merchant_id, *delta)
+    if stale:
+        recompute(stale)
+
+
+def _totals(merchant_ids=None):
+    """{merchant_id: (units, value at cost, value at sale)} from SQL"""
+    rows = StockItem.objects.values_list('merchant_id').annotate(
+        units=Sum('quantity'),
+        cost=Sum(F('quantity') * F('cost_price')),
+        sale=Sum(F('quantity') * F('sale_price')),
+    ).order_by()
+    if merchant_ids is not None:
+        rows = rows.filter(merchant_id__in=merchant_ids)
+    cent = Decimal('0.01')
+    return {
+        merchant_id: (
+            units or 0,
+            Decimal(cost or 0).quantize(cent),
+            Decimal(sale or 0).quantize(cent),
+        )
+        for merchant_id, units, cost, sale in rows
+    }
+
+
+def recompute(merchant_ids):
+    """Rewrite merchants' totals from a full SQL recomputation"""
+    totals = _totals(merchant_ids)
+    for merchant_id in merchant_ids:
+        units, cost, sale = totals.get(merchant_id, ZERO_BASIS)
+        MerchantValuation.objects.update_or_create(
+            merchant_id=merchant_id,
+            defaults={'total_quantity': units, 'value_at_cost': cost,
+                      'value_at_sale': sale},
+        )
+
+
+def reconcile(merchant_ids=None, fix=False):
+    """
+    Compare stored totals with a full recomputation.
+
+    Returns ``(checked, drifted)`` where ``drifted`` lists
+    ``(merchant_id, stored, actual)`` tuples (``stored`` is None for a
+    missing row). With ``fix=True`` drifted merchants are recomputed.
+    """
+    actual = _totals(merchant_ids)
+    stored_rows = MerchantValuation.objects.values_list(
+        'merchant_id', 'total_quantity', 'value_at_cost', 'value_at_sale'
+    )
+    if merchant_ids is not None:
+        stored_rows = stored_rows.filter(merchant_id__in=merchant_ids)
+    stored = {row[0]: tuple(row[1:]) for row in stored_rows}
+
+    drifted = [
+        (merchant_id, stored.get(merchant_id),
+         actual.get(merchant_id, ZERO_BASIS))
+        for merchant_id in sorted(set(actual) | set(stored))
+        if stored.get(merchant_id) != actual.get(merchant_id, ZERO_BASIS)
+    ]
+    if fix and drifted:
+        with transaction.atomic():
+            recompute([merchant_id for merchant_id, _s, _a in drifted])
+    return len(set(actual) | set(stored)), drifted
+
+
+def valuation_dict(valuation):
+    """API representation of a MerchantValuation (zeros when None)"""
+    if valuation is None:
+        return {'total_quantity': 0, 'value_at_cost': 0.0,
+                'value_at_sale': 0.0}
+    return {
+        'total_quantity': valuation.total_quantity,
+        'value_at_cost': float(valuation.value_at_cost),
+        'value_at_sale': float(valuation.value_at_sale),
+    }
+
+
+def get_valuation(merchant_id):
+    """A merchant's current totals as a dict"""
+    return valuation_dict(
+        MerchantValuation.objects.filter(merchant_id=merchant_id).first()
+    )
@@ -1,4 +1,5 @@
 from django.db import transaction
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -8,6 +9,7 @@ from .models import (
     InventoryLog,
     MerchantProfile,
 )
+from .services.scan_anomaly import ScanAnomalyDetector
 
 
 class ProcessScanView(APIView):
@@ -24,12 +26,10 @@ class ProcessScanView(APIView):
         merchant_user = request.user
 
         try:
-            with transaction.atomic():
-                product = Product.objects.get(barcode=barcode)
-                merchant = MerchantProfile.objects.get(
-                    user=merchant_user
-                )
+            product = Product.objects.get(barcode=barcode)
+            merchant = MerchantProfile.objects.get(user=merchant_user)
 
+            with transaction.atomic():
                 # LOCK the row to prevent double-counting
                 stock_item, created = (
                     StockItem.objects.select_for_update()
@@ -52,9 +52,11 @@ class ProcessScanView(APIView):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
+                if action == "OUT":
+                    stock_item.last_sold_at = timezone.now()
                 stock_item.save()
 
-                InventoryLog.objects.create(
+                log = InventoryLog.objects.create(
                     merchant=merchant,
                     product=product,
                     quantity_changed=qty_change,
@@ -63,6 +65,16 @@ class ProcessScanView(APIView):
                     device_id=device_id,
                 )
 
+            # Only applied scans feed the statistics; the cache round
+            # trips stay outside the row lock above
+            if ScanAnomalyDetector().observe(
+                merchant.pk, device_id, product.pk, action,
+                at=log.timestamp,
+            ):
+                InventoryLog.objects.filter(pk=log.pk).update(
+                    is_suspicious=True
+                )
+
             # Update bankability score after scan
             merchant.update_bankability_score()
 
@@ -3,6 +3,9 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from .models import StockItem, MerchantProfile
+from .db_router import read_from_replica
+from .services.dead_stock import DeadStockService
+from .services.demand_forecast import DemandForecaster
 
 
 @api_view(['GET'])
@@ -51,6 +54,74 @@ def low_stock_alerts(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
+def reorder_suggestions(request):
+    """
+    Products at or below their forecast reorder point, with how much
+    to order (see ``forecast_demand``)
+    """
+    try:
+        merchant_profile = request.user.merchantprofile
+        forecaster = DemandForecaster()
+        suggestions = forecaster.suggestions(merchant_profile.pk)
+
+        return Response({
+            'suggestions': suggestions,
+            'count': len(suggestions),
+            'as_of': forecaster.as_of,
+            'lead_time_days': forecaster.lead_time_days,
+            'review_days': forecaster.review_days,
+        })
+
+    except MerchantProfile.DoesNotExist:
+        return Response(
+            {'error': 'Merchant profile not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
+def dead_stock_alerts(request):
+    """
+    Items on hand not sold in ``days`` (default 30), with age buckets
+    and the capital tied up in them (``limit`` oldest items listed)
+    """
+    try:
+        merchant_profile = request.user.merchantprofile
+        try:
+            service = DeadStockService(
+                merchant_profile.pk,
+                days=int(request.GET.get('days', 30)),
+                limit=int(request.GET.get('limit', 100)),
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(service.report())
+
+    except MerchantProfile.DoesNotExist:
+        return Response(
+            {'error': 'Merchant profile not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def set_stock_alert_threshold(request):
@@ -0,0 +1,293 @@
+"""
+Async (ASGI) read views for the inventory API.
+
+These mirror the read-heavy DRF endpoints using Django's async ORM so a
+slow client does not hold a worker while its response trickles out.
+They only pay off when the project is served by an ASGI server (see the
+README); under WSGI they still work but run one request per worker.
+
+Routing follows the sync views they mirror: the reports read from the
+replica through ``read_from_replica``, while the item and alert views
+stay on the primary so scanners read their own writes.
+"""
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import (
+    MerchantProfile, MerchantValuation, StockItem, InventoryLog,
+)
+from .db_router import read_from_replica
+from .services.dead_stock import order_stock_items
+from .valuation import valuation_dict
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    """Render like DRF's JSONRenderer so both API flavours match."""
+    return JsonResponse(data, status=status_code, encoder=JSONEncoder,
+                        safe=False)
+
+
+def _authenticate(request):
+    """Run the configured DRF authenticators against a plain request"""
+    drf_request = Request(request, authenticators=[
+        auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    return drf_request.user
+
+
+def async_api_view(view):
+    """
+    Authenticate a GET-only async view the same way DRF would and
+    resolve the caller's merchant profile before calling it.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return _json(
+                {'detail': f'Method "{request.method}" not allowed.'},
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+            )
+
+        try:
+            user = await sync_to_async(_authenticate)(request)
+        except exceptions.APIException as exc:
+            return _json({'detail': str(exc.detail)}, exc.status_code)
+
+        if not user or not user.is_authenticated:
+            return _json(
+                {'detail': 'Authentication credentials were not provided.'},
+                status.HTTP_401_UNAUTHORIZED,
+            )
+        request.user = user
+
+        try:
+            merchant_profile = await MerchantProfile.objects.aget(user=user)
+        except MerchantProfile.DoesNotExist:
+            return _json(
+                {'error': 'Merchant profile not found'},
+                status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            return await view(request, merchant_profile, *args, **kwargs)
+        except Exception as e:
+            return _json(
+                {'error': str(e)},
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+    return wrapper
+
+
+def _item_data(item):
+    return {
+        'id': item.pk,
+        'barcode': item.product.barcode,
+        'name': item.product.name,
+        'quantity': item.quantity,
+        'price': item.sale_price,
+        'last_updated': item.updated_at,
+        'last_sold_at': item.last_sold_at,
+        'last_movement_at': item.last_movement_at,
+    }
+
+
+@async_api_view
+async def get_stock_items(request, merchant_profile):
+    """
+    Get all stock items for merchant (async)
+    """
+    search = request.GET.get('search', '')
+    page = int(request.GET.get('page', 1))
+    page_size = int(request.GET.get('page_size', 20))
+
+    queryset = StockItem.objects.filter(merchant=merchant_profile)
+
+    if search:
+        queryset = queryset.filter(
+            Q(product__barcode__icontains=search) |
+            Q(product__name__icontains=search)
+        )
+
+    try:
+        queryset = order_stock_items(
+            queryset.select_related('product'),
+            request.GET.get('sort', 'newest'),
+        )
+    except ValueError as e:
+        return _json({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    start = (page - 1) * page_size
+    end = start + page_size
+    items_data = [_item_data(item) async for item in queryset[start:end]]
+
+    return _json({
+        'items': items_data,
+        'page': page,
+        'page_size': page_size,
+        'total': await queryset.acount(),
+    })
+
+
+@async_api_view
+async def search_items(request, merchant_profile):
+    """
+    Search inventory items by barcode or name (async)
+    """
+    query = request.GET.get('q', '').strip()
+
+    if not query:
+        return _json(
+            {'error': 'Search query is required'},
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    items = StockItem.objects.filter(
+        merchant=merchant_profile
+    ).filter(
+        Q(product__barcode__icontains=query) |
+        Q(product__name__icontains=query)
+    ).select_related('product')[:20]
+
+    results = [_item_data(item) async for item in items]
+
+    return _json({
+        'query': query,
+        'results': results,
+        'count': len(results),
+    })
+
+
+@async_api_view
+async def low_stock_alerts(request, merchant_profile):
+    """
+    Get items with low stock levels (async)
+    """
+    threshold = int(request.GET.get(
+        'threshold', merchant_profile.alert_threshold
+    ))
+
+    low_stock_items = StockItem.objects.filter(
+        merchant=merchant_profile,
+        quantity__lte=threshold
+    ).select_related('product')
+
+    alerts = [
+        {
+            'id': item.pk,
+            'product_name': item.product.name,
+            'barcode': item.product.barcode,
+            'current_quantity': item.quantity,
+            'threshold': threshold,
+            'last_updated': item.updated_at,
+        }
+        async for item in low_stock_items
+    ]
+
+    return _json({
+        'alerts': alerts,
+        'count': len(alerts),
+        'threshold': threshold,
+    })
+
+
+@async_api_view
+@read_from_replica
+async def sales_report(request, merchant_profile):
+    """
+    Get sales report for specified period (async)
+    """
+    days = int(request.GET.get('days', 7))
+    start_date = timezone.now() - timedelta(days=days)
+
+    sales_logs = InventoryLog.objects.filter(
+        merchant=merchant_profile,
+        action='OUT',
+        timestamp__gte=start_date
+    ).select_related('product')
+
+    stock_prices = {
+        product_id: sale_price
+        async for product_id, sale_price in StockItem.objects.filter(
+            merchant=merchant_profile
+        ).values_list('product_id', 'sale_price')
+    }
+
+    total_sales = 0
+    total_revenue = 0
+    sales_data = []
+    device_counts = {}
+
+    async for log in sales_logs:
+        quantity = abs(log.quantity_changed)
+        total_sales += quantity
+
+        unit_price = float(stock_prices.get(log.product_id, 0))
+        revenue = unit_price * quantity
+        total_revenue += revenue
+
+        device_id = log.device_id or 'unknown'
+        device_counts[device_id] = device_counts.get(device_id, 0) + 1
+
+        sales_data.append({
+            'date': log.timestamp.date(),
+            'product_name': log.product.name,
+            'barcode': log.product.barcode,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'revenue': revenue,
+            'device_id': log.device_id,
+        })
+
+    most_active = (
+        max(device_counts.items(), key=lambda x: x[1])[0]
+        if device_counts else 'none'
+    )
+
+    return _json({
+        'total_sales': total_sales,
+        'total_revenue': total_revenue,
+        'sales_count': len(sales_data),
+        'period_days': days,
+        'sales_data': sales_data,
+        'start_date': start_date.date(),
+        'most_active_source': most_active,
+    })
+
+
+@async_api_view
+@read_from_replica
+async def merchant_performance(request, merchant_profile):
+    """
+    Get merchant performance metrics (async)
+    """
+    stock_items = StockItem.objects.filter(merchant=merchant_profile)
+    total_products = await stock_items.acount()
+    low_stock_count = await stock_items.filter(
+        quantity__lte=merchant_profile.alert_threshold
+    ).acount()
+
+    recent_logs = await InventoryLog.objects.filter(
+        merchant=merchant_profile,
+        timestamp__gte=timezone.now() - timedelta(days=7)
+    ).acount()
+    valuation = await MerchantValuation.objects.filter(
+        merchant=merchant_profile
+    ).afirst()
+
+    return _json({
+        'total_products': total_products,
+        'low_stock_count': low_stock_count,
+        'recent_activity': recent_logs,
+        'health_score': max(0, 100 - (low_stock_count * 10)),
+        'inventory_valuation': valuation_dict(valuation),
+    })
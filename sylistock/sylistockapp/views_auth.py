@@ -9,6 +9,9 @@ from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from .models import MerchantPeerRank
+from .services.peer_ranking import peer_rank_dict
+from .valuation import get_valuation
 
 User = get_user_model()
 
@@ -145,6 +148,12 @@ def profile(request):
             'bankability_score': float(mp.bankability_score),
             'business_age': mp.business_age,
             'alert_threshold': mp.alert_threshold,
+            'inventory_valuation': get_valuation(mp.pk),
+            'peer_rank': peer_rank_dict(
+                MerchantPeerRank.objects.select_related('market').filter(
+                    merchant_id=mp.pk
+                ).first()
+            ),
         }
 
     return Response({
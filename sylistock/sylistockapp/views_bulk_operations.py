@@ -2,11 +2,16 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.db import transaction
 import csv
 import io
 from .models import StockItem, MerchantProfile, Product
+from .db_router import current_read_alias, read_from_replica
+from .valuation import valuation_batch
+from .services.export_service import (
+    LenderExportService, parse_export_date,
+)
 
 
 @api_view(['POST'])
@@ -39,7 +44,7 @@ def bulk_import_inventory(request):
         imported_count = 0
         errors = []
 
-        with transaction.atomic():
+        with transaction.atomic(), valuation_batch():
             for row_num, row in enumerate(reader, 1):
                 try:
                     barcode = row.get('barcode', '').strip()
@@ -158,6 +163,66 @@ def export_inventory(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
+def export_lender_data(request):
+    """
+    Stream inventory logs, stock and bankability snapshots as
+    gzip-compressed NDJSON for lenders. Merchants export their own
+    history; staff may pass merchant_id (repeatable) or omit it for
+    every merchant.
+    """
+    try:
+        if request.user.is_staff:
+            merchant_ids = [
+                int(pk) for pk in request.GET.getlist('merchant_id')
+            ] or None
+        else:
+            merchant_ids = [request.user.merchantprofile.pk]
+
+        start = parse_export_date(request.GET.get('start'))
+        end = parse_export_date(request.GET.get('end'), end_of_day=True)
+        chunk_days = int(request.GET.get('chunk_days', 30))
+        if chunk_days <= 0:
+            return Response(
+                {'error': 'chunk_days must be positive'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The stream is consumed after the view returns, outside the
+        # router's scope: pin it to the alias this request was given
+        service = LenderExportService(
+            chunk_days=chunk_days, using=current_read_alias()
+        )
+        response = StreamingHttpResponse(
+            service.iter_ndjson_gzip(
+                service.iter_records(merchant_ids, start, end)
+            ),
+            content_type='application/gzip',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename=sylistock-export.ndjson.gz'
+        )
+        return response
+
+    except MerchantProfile.DoesNotExist:
+        return Response(
+            {'error': 'Merchant profile not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def bulk_update_inventory(request):
@@ -177,7 +242,7 @@ def bulk_update_inventory(request):
         updated_count = 0
         errors = []
 
-        with transaction.atomic():
+        with transaction.atomic(), valuation_batch():
             for idx, update in enumerate(updates):
                 try:
                     item_id = update.get('id')
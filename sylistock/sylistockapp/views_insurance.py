@@ -4,7 +4,10 @@ Insurance API views for micro-insurance services
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from .services.insurance_service import InsuranceService
+from .services.insurance_service import (
+    InsuranceService, MAX_BULK_POLICIES,
+)
+from .db_router import read_from_replica
 
 
 @api_view(['POST'])
@@ -71,6 +74,8 @@ def create_insurance_policy(request):
         coverage_amount = request.data.get('coverage_amount')
         deductible_amount = request.data.get('deductible_amount')
         premium_amount = request.data.get('premium_amount')
+        term_months = request.data.get('term_months', 12)
+        payment_frequency = request.data.get('payment_frequency', 'monthly')
 
         if not all([merchant_id, policy_type, coverage_amount]):
             return Response({
@@ -79,10 +84,16 @@ def create_insurance_policy(request):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         insurance_service = InsuranceService()
-        result = insurance_service.create_policy(
-            merchant_id, policy_type, coverage_amount,
-            deductible_amount, premium_amount
-        )
+        try:
+            result = insurance_service.create_policy(
+                merchant_id, policy_type, coverage_amount,
+                deductible_amount, premium_amount, int(term_months),
+                payment_frequency,
+            )
+        except ValueError as e:
+            return Response({
+                'error': str(e),
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(result)
 
@@ -92,6 +103,47 @@ def create_insurance_policy(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def bulk_create_insurance_policies(request):
+    """
+    Enroll many merchants in one request.
+
+    Body: ``{"defaults": {...}, "policies": [{"merchant_id": 1, ...}]}``
+    where each entry takes the ``create-policy`` fields and falls back
+    to ``defaults``. Rows that fail validation are listed in ``errors``
+    and the rest are created.
+    """
+    try:
+        enrollments = request.data.get('policies')
+        defaults = request.data.get('defaults') or {}
+
+        if not isinstance(enrollments, list) or not enrollments:
+            return Response({
+                'error': 'policies must be a non-empty list',
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(enrollments) > MAX_BULK_POLICIES:
+            return Response({
+                'error': f'At most {MAX_BULK_POLICIES} policies '
+                         f'per request',
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        insurance_service = InsuranceService()
+        result = insurance_service.create_policies_bulk(
+            enrollments, defaults
+        )
+
+        return Response(result, status=(
+            status.HTTP_201_CREATED if result['created']
+            else status.HTTP_400_BAD_REQUEST
+        ))
+
+    except Exception as e:
+        return Response({
+            'error': str(e),
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def submit_claim(request):
@@ -112,10 +164,15 @@ def submit_claim(request):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         insurance_service = InsuranceService()
-        result = insurance_service.submit_claim(
-            policy_id, claim_type, description, estimated_loss,
-            incident_date, incident_location
-        )
+        try:
+            result = insurance_service.submit_claim(
+                policy_id, claim_type, description, estimated_loss,
+                incident_date, incident_location
+            )
+        except ValueError as e:
+            return Response({
+                'error': str(e),
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(result)
 
@@ -154,6 +211,7 @@ def process_claim(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_policy_details(request, policy_id):
     """Get insurance policy details"""
     try:
@@ -170,6 +228,7 @@ def get_policy_details(request, policy_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_merchant_policies(request, merchant_id):
     """Get merchant's insurance policies"""
     try:
@@ -190,6 +249,7 @@ def get_merchant_policies(request, merchant_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_policy_claims(request, policy_id):
     """Get policy claims"""
     try:
@@ -210,6 +270,7 @@ def get_policy_claims(request, policy_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_policy_premiums(request, policy_id):
     """Get policy premiums"""
     try:
@@ -230,6 +291,7 @@ def get_policy_premiums(request, policy_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_merchant_risk_assessment(request, merchant_id):
     """Get merchant risk assessment"""
     try:
@@ -242,3 +304,31 @@ def get_merchant_risk_assessment(request, merchant_id):
         return Response({
             'error': str(e),
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+@read_from_replica
+def get_premium_aging_report(request):
+    """
+    Overdue premium aging report (0-30, 31-60, 61-90, 90+ days).
+
+    Optional ``group_by``: ``policy_type`` or ``merchant``.
+    """
+    try:
+        insurance_service = InsuranceService()
+        try:
+            result = insurance_service.premium_aging_report(
+                group_by=request.query_params.get('group_by')
+            )
+        except ValueError as e:
+            return Response({
+                'error': str(e),
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result)
+
+    except Exception as e:
+        return Response({
+            'error': str(e),
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
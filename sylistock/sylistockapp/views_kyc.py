@@ -5,6 +5,7 @@ from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from .services.kyc_service import KYCService
+from .db_router import read_from_replica
 
 
 @api_view(['POST'])
@@ -47,11 +48,32 @@ def upload_kyc_document(request):
                 'required': ['kyc_id', 'document_type', 'file']
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        # Hand the UploadedFile to storage as-is so it is copied in
+        # chunks; validation runs in the background.
         kyc_service = KYCService()
         result = kyc_service.upload_document(kyc_id, document_type,
-                                             file_data.read(),
-                                             file_data.name)
+                                             file_data, file_data.name)
 
+        if not result.get('success', False):
+            return Response(result, status=status.HTTP_404_NOT_FOUND)
+        return Response(result, status=status.HTTP_202_ACCEPTED)
+
+    except Exception as e:
+        return Response({
+            'error': str(e),
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def get_kyc_document_status(request, document_id):
+    """Poll the processing status of an uploaded KYC document"""
+    try:
+        kyc_service = KYCService()
+        result = kyc_service.get_document_status(document_id)
+
+        if not result.get('success', False):
+            return Response(result, status=status.HTTP_404_NOT_FOUND)
         return Response(result)
 
     except Exception as e:
@@ -162,6 +184,7 @@ def evaluate_kyc_application(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_kyc_status(request, kyc_id):
     """Get KYC verification status"""
     try:
@@ -178,6 +201,7 @@ def get_kyc_status(request, kyc_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_kyc_documents(request, kyc_id):
     """Get KYC documents"""
     try:
@@ -194,6 +218,7 @@ def get_kyc_documents(request, kyc_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_bank_accounts(request, kyc_id):
     """Get bank accounts"""
     try:
@@ -210,6 +235,7 @@ def get_bank_accounts(request, kyc_id):
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
+@read_from_replica
 def get_compliance_checks(request, kyc_id):
     """Get compliance checks"""
     try:
@@ -224,6 +250,50 @@ def get_compliance_checks(request, kyc_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+@read_from_replica
+def get_kyc_review_queue(request):
+    """
+    Back-office review queue: a page of verifications with their
+    documents, masked bank accounts and latest compliance check.
+
+    Query params: ``status`` (repeatable, default pending/in_progress),
+    ``verification_level``, ``limit`` (max 200) and ``cursor`` (the
+    previous page's ``next_cursor``).
+    """
+    try:
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)),
+                            1), 200)
+        except ValueError:
+            return Response({
+                'error': 'limit must be an integer',
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        kyc_service = KYCService()
+        try:
+            result = kyc_service.get_review_queue(
+                statuses=request.query_params.getlist('status'),
+                verification_level=request.query_params.get(
+                    'verification_level'
+                ),
+                cursor=request.query_params.get('cursor'),
+                limit=limit,
+            )
+        except ValueError as e:
+            return Response({
+                'error': str(e),
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result)
+
+    except Exception as e:
+        return Response({
+            'error': str(e),
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def expire_kyc_verification(request):
@@ -0,0 +1,16 @@
+"""
+Operational metrics for administrators.
+"""
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from .metrics import database_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def runtime_metrics(request):
+    """Get runtime metrics for this worker process"""
+    return Response({
+        'databases': database_stats(),
+    })
@@ -3,8 +3,12 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import transaction
+from django.utils import timezone
 from django.db.models import Q
 from .models import StockItem, MerchantProfile, Product, InventoryLog
+from .db_router import read_from_replica
+from .services.dead_stock import order_stock_items
+from .services.stock_history import StockHistoryService, parse_as_of
 
 
 @api_view(['POST'])
@@ -121,6 +125,7 @@ def remove_stock_item(request, item_id):
 
         with transaction.atomic():
             stock_item.quantity -= quantity
+            stock_item.last_sold_at = timezone.now()
             stock_item.save()
 
             # Log the removal
@@ -226,6 +231,9 @@ def update_stock_item(request, item_id):
 def get_stock_items(request):
     """
     Get all stock items for merchant
+
+    ``sort``: newest (default), recently_sold, slow_movers,
+    recently_moved or idle
     """
     try:
         merchant_profile = request.user.merchantprofile
@@ -242,7 +250,16 @@ def get_stock_items(request):
                 Q(product__name__icontains=search)
             )
 
-        queryset = queryset.select_related('product').order_by('-pk')
+        try:
+            queryset = order_stock_items(
+                queryset.select_related('product'),
+                request.GET.get('sort', 'newest'),
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         # Pagination
         start = (page - 1) * page_size
@@ -258,6 +275,8 @@ def get_stock_items(request):
                 'quantity': item.quantity,
                 'price': item.sale_price,
                 'last_updated': item.updated_at,
+                'last_sold_at': item.last_sold_at,
+                'last_movement_at': item.last_movement_at,
             })
 
         return Response({
@@ -281,6 +300,7 @@ def get_stock_items(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@read_from_replica
 def inventory_history(request):
     """
     Get inventory change history
@@ -318,3 +338,45 @@ def inventory_history(request):
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
+def stock_as_of(request):
+    """
+    Reconstruct stock and stock value at a past moment.
+
+    ``at`` is an ISO datetime or a YYYY-MM-DD date (end of that day);
+    staff may pass ``merchant_id`` to query any merchant.
+    """
+    try:
+        try:
+            at = parse_as_of(request.GET.get('at', ''))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.user.is_staff and request.GET.get('merchant_id'):
+            merchant_id = MerchantProfile.objects.get(
+                pk=int(request.GET['merchant_id'])
+            ).pk
+        else:
+            merchant_id = request.user.merchantprofile.pk
+
+        return Response(
+            StockHistoryService().stock_as_of(merchant_id, at)
+        )
+
+    except MerchantProfile.DoesNotExist:
+        return Response(
+            {'error': 'Merchant profile not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
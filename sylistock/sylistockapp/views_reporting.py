@@ -1,14 +1,22 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
 from datetime import timedelta
-from .models import MerchantProfile, InventoryLog, StockItem
+from django.utils.dateparse import parse_date
+from .models import CreditMetrics, MerchantProfile, InventoryLog, StockItem
+from .db_router import read_from_replica
+from .services.credit_metrics import ENGINE_VERSION, credit_metrics_dict
+from .services.product_analytics import ProductAnalyticsService
+from .services.score_history import ScoreHistoryService
+from .services.stock_history import parse_as_of
+from .valuation import get_valuation
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@read_from_replica
 def sales_report(request):
     """
     Get sales report for specified period
@@ -95,6 +103,50 @@ def sales_report(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@read_from_replica
+def product_analytics(request):
+    """
+    Per-product analytics for the last ``days`` (default 30): the
+    ``top`` (default 10) sellers by units and by revenue, ABC classes by
+    revenue share, days of cover and turnover. Cached briefly per
+    merchant and period; staff may pass ``merchant_id``.
+    """
+    try:
+        if request.user.is_staff and request.GET.get('merchant_id'):
+            merchant_id = MerchantProfile.objects.get(
+                pk=int(request.GET['merchant_id'])
+            ).pk
+        else:
+            merchant_id = request.user.merchantprofile.pk
+
+        try:
+            service = ProductAnalyticsService(
+                merchant_id,
+                days=int(request.GET.get('days', 30)),
+                top=int(request.GET.get('top', 10)),
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(service.get())
+
+    except MerchantProfile.DoesNotExist:
+        return Response(
+            {'error': 'Merchant profile not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
 def merchant_performance(request):
     """
     Get merchant performance metrics
@@ -119,6 +171,7 @@ def merchant_performance(request):
             'low_stock_count': low_stock_count,
             'recent_activity': recent_logs,
             'health_score': max(0, 100 - (low_stock_count * 10)),
+            'inventory_valuation': get_valuation(merchant_profile.pk),
         })
 
     except MerchantProfile.DoesNotExist:
@@ -131,3 +184,151 @@ def merchant_performance(request):
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
+def credit_score(request):
+    """
+    Latest stored credit metrics (see ``compute_credit_metrics``).
+
+    Optional ``as_of`` (YYYY-MM-DD) returns the score as of that day and
+    ``engine_version`` a specific engine's; staff may pass
+    ``merchant_id`` to query any merchant.
+    """
+    try:
+        if request.user.is_staff and request.GET.get('merchant_id'):
+            merchant_id = MerchantProfile.objects.get(
+                pk=int(request.GET['merchant_id'])
+            ).pk
+        else:
+            merchant_id = request.user.merchantprofile.pk
+
+        metrics = CreditMetrics.objects.filter(
+            merchant_id=merchant_id,
+            engine_version=request.GET.get('engine_version',
+                                           ENGINE_VERSION),
+        )
+        if request.GET.get('as_of'):
+            as_of = parse_date(request.GET['as_of'])
+            if as_of is None:
+                return Response(
+                    {'error': 'as_of must be a YYYY-MM-DD date'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            metrics = metrics.filter(as_of__lte=as_of)
+
+        latest = metrics.order_by('-as_of').first()
+        if latest is None:
+            return Response(
+                {'error': 'No credit score computed yet'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(credit_metrics_dict(latest))
+
+    except MerchantProfile.DoesNotExist:
+        return Response(
+            {'error': 'Merchant profile not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+def _history_range(params):
+    """``start``/``end`` query params (dates or ISO datetimes) or None"""
+    start, end = params.get('start'), params.get('end')
+    return (
+        parse_as_of(start, end_of_day=False, name='start') if start
+        else None,
+        parse_as_of(end, name='end') if end else None,
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@read_from_replica
+def score_history(request):
+    """
+    Bankability score history as ``{'at', 'score'}`` points.
+
+    Optional ``start``/``end`` bound the range; the point in effect at
+    ``start`` is included. Staff may pass ``merchant_id``.
+    """
+    try:
+        try:
+            start, end = _history_range(request.GET)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.user.is_staff and request.GET.get('merchant_id'):
+            merchant = MerchantProfile.objects.get(
+                pk=int(request.GET['merchant_id'])
+            )
+        else:
+            merchant = request.user.merchantprofile
+
+        return Response({
+            'merchant_id': merchant.pk,
+            'current_score': float(merchant.bankability_score),
+            'points': ScoreHistoryService().series(merchant.pk, start,
+                                                   end),
+        })
+
+    except MerchantProfile.DoesNotExist:
+        return Response(
+            {'error': 'Merchant profile not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@read_from_replica
+def score_sparklines(request):
+    """
+    Score history for many merchants (``merchant_id`` repeated, up to
+    200) as sparkline-ready ``timestamps``/``scores`` arrays.
+    """
+    try:
+        try:
+            start, end = _history_range(request.GET)
+            merchant_ids = [
+                int(value) for value in request.GET.getlist('merchant_id')
+            ]
+            if not merchant_ids:
+                raise ValueError('merchant_id is required')
+            lines = ScoreHistoryService().sparklines(merchant_ids, start,
+                                                     end)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'start': start,
+            'end': end,
+            'merchants': {
+                str(merchant_id): line
+                for merchant_id, line in lines.items()
+            },
+        })
+
+    except Exception as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
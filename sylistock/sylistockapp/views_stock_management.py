@@ -2,8 +2,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import transaction
 from django.db.models import Q
 from .models import StockItem, MerchantProfile
+from .valuation import valuation_batch
 
 
 @api_view(['GET'])
@@ -119,31 +121,35 @@ def bulk_update_prices(request):
         updated_count = 0
         errors = []
 
-        for idx, update in enumerate(price_updates):
-            try:
-                item_id = update.get('id')
-                price = update.get('price')
-
-                if not item_id or price is None:
-                    errors.append(f'Update {idx}: Missing item ID or price')
-                    continue
-
+        # One valuation UPDATE for the whole batch, committed with it
+        with transaction.atomic(), valuation_batch():
+            for idx, update in enumerate(price_updates):
                 try:
-                    item = StockItem.objects.get(
-                        id=item_id,
-                        merchant=merchant_profile
-                    )
-                    item.sale_price = float(price)
-                    item.save()
-                    updated_count += 1
-
-                except StockItem.DoesNotExist:
-                    errors.append(f'Update {idx}: Item not found')
-                except ValueError:
-                    errors.append(f'Update {idx}: Invalid price')
-
-            except Exception as e:
-                errors.append(f'Update {idx}: {str(e)}')
+                    item_id = update.get('id')
+                    price = update.get('price')
+
+                    if not item_id or price is None:
+                        errors.append(
+                            f'Update {idx}: Missing item ID or price'
+                        )
+                        continue
+
+                    try:
+                        item = StockItem.objects.get(
+                            id=item_id,
+                            merchant=merchant_profile
+                        )
+                        item.sale_price = float(price)
+                        item.save()
+                        updated_count += 1
+
+                    except StockItem.DoesNotExist:
+                        errors.append(f'Update {idx}: Item not found')
+                    except ValueError:
+                        errors.append(f'Update {idx}: Invalid price')
+
+                except Exception as e:
+                    errors.append(f'Update {idx}: {str(e)}')
 
         return Response({
             'updated': updated_count,